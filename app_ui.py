@@ -2,16 +2,27 @@
 Tkinter UI logic for the sheet cutting app.
 """
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, Canvas, Frame, Scrollbar
+from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog, Canvas, Frame, Scrollbar
 from models.part import Part, Placement, Sheet
-from packing.engine import PackingEngine
-from visualization.visualizer import CuttingPlanVisualizer
-from export.google_sheets import GoogleSheetsExporter
-from config import DEFAULT_SHEET_SIZES
+from export.export_queue import ExportQueue
+from ui.parts_list import PartsListModel, PartsTreeview
+from packing.estimator import UtilizationEstimator
+from config import DEFAULT_SHEET_SIZES, PLAN_FILE_TYPES, SERVICE_ACCOUNT_FILE, IMPORT, IMPORT_FILE_TYPES, ESTIMATE, PLANNING_SERVICE
+import importlib
+import os
 import threading
 import queue
 import time
 
+# Modules that are slow to import (rectpack, the Google client stack) and
+# are not needed to draw the main window. They are imported in a background
+# thread once the window is up, or on first use if that comes sooner.
+PRELOAD_MODULES = (
+    "packing.engine",
+    "visualization.visualizer",
+    "export.google_sheets",
+)
+
 class SheetCuttingApp:
     def __init__(self, root):
         self.root = root
@@ -29,7 +40,8 @@ class SheetCuttingApp:
         # Create a combobox for sheet size selection
         self.sheet_size_var = tk.StringVar()
         self.sheet_size_combobox = ttk.Combobox(self.sheet_size_frame, textvariable=self.sheet_size_var)
-        self.sheet_size_combobox["values"] = list(DEFAULT_SHEET_SIZES.keys())
+        self.sheet_sizes = {f"{width}x{height}": (width, height) for width, height in DEFAULT_SHEET_SIZES}
+        self.sheet_size_combobox["values"] = list(self.sheet_sizes.keys())
         self.sheet_size_combobox.grid(row=0, column=0, padx=5, pady=5)
         self.sheet_size_combobox.bind("<<ComboboxSelected>>", self.on_sheet_size_selected)
 
@@ -84,6 +96,19 @@ class SheetCuttingApp:
         self.remove_part_button = ttk.Button(self.part_details_frame, text="Премахни част", command=self.remove_part)
         self.remove_part_button.grid(row=3, column=1, padx=5, pady=5)
 
+        self.update_part_button = ttk.Button(self.part_details_frame, text="Промени част", command=self.update_part)
+        self.update_part_button.grid(row=3, column=2, padx=5, pady=5)
+
+        self.undo_button = ttk.Button(self.part_details_frame, text="Отмени", command=self.undo_parts_edit)
+        self.undo_button.grid(row=3, column=3, padx=5, pady=5)
+
+        # Create buttons for bulk import of parts
+        self.import_file_button = ttk.Button(self.part_details_frame, text="Импорт от файл", command=self.import_parts_from_file)
+        self.import_file_button.grid(row=4, column=0, padx=5, pady=5)
+
+        self.import_sheets_button = ttk.Button(self.part_details_frame, text="Импорт от Google Sheets", command=self.import_parts_from_google_sheets)
+        self.import_sheets_button.grid(row=4, column=1, padx=5, pady=5)
+
         # Create a frame for the cutting plan visualization
         self.visualization_frame = ttk.LabelFrame(self.root, text="Визуализация на рязането")
         self.visualization_frame.grid(row=0, column=1, rowspan=3, sticky="nsew", padx=10, pady=10)
@@ -109,37 +134,124 @@ class SheetCuttingApp:
         self.export_button = ttk.Button(self.export_frame, text="Експортиране", command=self.export_to_google_sheets)
         self.export_button.grid(row=0, column=0, padx=5, pady=5)
 
+        # Create a button to open a previously saved cutting plan
+        self.open_plan_button = ttk.Button(self.export_frame, text="Отвори план", command=self.open_plan)
+        self.open_plan_button.grid(row=0, column=1, padx=5, pady=5)
+
+        # Create a button to calculate the cutting plan; sheets are shown as each group finishes
+        self.calculate_button = ttk.Button(self.export_frame, text="Изчисли план", command=self.calculate_plan)
+        self.calculate_button.grid(row=0, column=2, padx=5, pady=5)
+
+        # Create a button to compare plans that trade sheets, waste, cut length and time
+        self.variants_button = ttk.Button(self.export_frame, text="Варианти", command=self.calculate_plan_variants)
+        self.variants_button.grid(row=0, column=3, padx=5, pady=5)
+
+        # Create a button to show the statistics of past runs
+        self.history_button = ttk.Button(self.export_frame, text="История", command=self.show_history)
+        self.history_button.grid(row=0, column=4, padx=5, pady=5)
+
+        # Create a label showing the export queue status
+        self.export_status_label = ttk.Label(self.export_frame, text="")
+        self.export_status_label.grid(row=0, column=5, padx=5, pady=5, sticky="w")
+
         # Create a status bar
         self.status_bar = ttk.Label(self.root, text="Добре дошли в приложението за рязане на листове!", relief=tk.SUNKEN, anchor="w")
         self.status_bar.grid(row=4, column=0, columnspan=2, sticky="ew")
 
-        # Initialize the packing engine and visualizer
-        self.packing_engine = PackingEngine()
-        self.visualizer = CuttingPlanVisualizer(self.visualization_canvas)
+        # The packing engine is created on first use
+        self._packing_engine = None
 
         # Initialize the parts and sheet variables
-        self.parts = []
-        self.sheet = None
-
-        # Bind the treeview selection event
-        self.parts_treeview.bind("<<TreeviewSelect>>", self.on_part_selected)
+        self.parts_model = PartsListModel()
+        self.parts_view = PartsTreeview(self.parts_treeview, self.parts_scrollbar, self.parts_model,
+                                        lambda part: (part.width, part.height, part.qty))
+        self.sheet_size = None
+        self.plan_view = None
+
+        # The sheet count estimate follows every edit of the parts list; until a size is picked it
+        # assumes the largest sheet, the one the engine bounds against
+        self.estimator = UtilizationEstimator((max(width for width, _ in DEFAULT_SHEET_SIZES),
+                                               max(height for _, height in DEFAULT_SHEET_SIZES)))
+        self.estimate = None
+        self.estimate_job = None
+        self.estimate_running = False
+        self.estimate_pending = False
+        self.parts_model.add_listener(self.on_parts_changed)
+
+        # The export queue is started after the first paint, together with the preloading
+        self.export_queue = ExportQueue(SERVICE_ACCOUNT_FILE)
+        self.export_queue.add_listener(self.on_export_event)
+        self.root.after_idle(self.start_background_services)
+
+        # Bind the treeview selection event and the undo/redo shortcuts
+        self.parts_treeview.bind("<<TreeviewSelect>>", self.on_part_selected, add="+")
+        self.root.bind("<Control-z>", lambda event: self.undo_parts_edit())
+        self.root.bind("<Control-y>", lambda event: self.redo_parts_edit())
 
         # Update the UI elements
         self.update_sheet_size_combobox()
         self.update_parts_treeview()
         self.update_status_bar()
 
+    @property
+    def parts(self):
+        return list(self.parts_model)
+
+    @property
+    def packing_engine(self):
+        if self._packing_engine is None:
+            from packing.engine import PackingEngine
+            self._packing_engine = PackingEngine(list(self.sheet_sizes.values()))
+        return self._packing_engine
+
+    def start_background_services(self):
+        """
+        Start the work that is not needed for the first paint.
+        """
+        self.export_queue.start()
+        threading.Thread(target=self.preload_modules, daemon=True).start()
+
+    def preload_modules(self):
+        """
+        Import the heavy modules in the background and warm up the Sheets session.
+        """
+        for name in PRELOAD_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                print(f"Preloading {name} failed: {e}")
+        if os.path.exists(SERVICE_ACCOUNT_FILE):
+            from export.google_sheets import get_session
+            get_session(SERVICE_ACCOUNT_FILE).warm_up(background=False)
+
     def on_sheet_size_selected(self, event):
         """
         Event handler for sheet size selection.
         """
         selected_size = self.sheet_size_var.get()
-        if selected_size in DEFAULT_SHEET_SIZES:
-            width, height = DEFAULT_SHEET_SIZES[selected_size]
-            self.sheet = Sheet(width, height)
-            self.visualizer.set_sheet(self.sheet)
+        if selected_size in self.sheet_sizes:
+            width, height = self.sheet_sizes[selected_size]
+            self.estimator.set_sheet_size((width, height))
+            self.schedule_estimate()
+            self.sheet_size = (width, height)
+            self.draw_sheet_preview()
             self.update_status_bar()
 
+    def draw_sheet_preview(self):
+        """
+        Draw the outline of the selected sheet size on the main window canvas.
+        """
+        canvas = self.visualization_canvas
+        canvas.delete("all")
+        if not self.sheet_size:
+            return
+        width, height = self.sheet_size
+        canvas_w = max(canvas.winfo_width(), 200) - 20
+        canvas_h = max(canvas.winfo_height(), 200) - 40
+        scale = min(canvas_w / width, canvas_h / height)
+        canvas.create_rectangle(10, 10, 10 + width * scale, 10 + height * scale, outline="black", fill="white")
+        canvas.create_text(10, 20 + height * scale, text=f"{width:g} x {height:g} мм", anchor="nw")
+
     def add_sheet_size(self):
         """
         Add a new custom sheet size.
@@ -151,71 +263,392 @@ class SheetCuttingApp:
         # If the user provided a valid size, add it to the combobox and select it
         if dialog.result:
             size_name, (width, height) = dialog.result
-            DEFAULT_SHEET_SIZES[size_name] = (width, height)
-            self.sheet_size_combobox["values"] = list(DEFAULT_SHEET_SIZES.keys())
+            self.sheet_sizes[size_name] = (width, height)
+            # The engine packs against every size, so the next plan needs a new one
+            self._packing_engine = None
+            self.sheet_size_combobox["values"] = list(self.sheet_sizes.keys())
             self.sheet_size_var.set(size_name)
             self.on_sheet_size_selected(None)
 
+    def read_part_form(self, part_id, template=None):
+        """
+        Build a part from the detail entries, keeping the other fields of ``template``.
+        """
+        width = float(self.part_width_var.get())
+        height = float(self.part_height_var.get())
+        quantity = int(self.part_quantity_var.get())
+        if width <= 0 or height <= 0 or quantity <= 0:
+            raise ValueError("non-positive part dimensions")
+        if template is None:
+            ref = f"P{part_id}"
+            return Part(part_id, ref, ref, "", 0, width, height, quantity)
+        return Part(part_id, template.ref, template.name, template.material, template.thickness, width, height, quantity)
+
     def add_part(self):
         """
         Add a new part to the cutting plan.
         """
         try:
-            width = float(self.part_width_var.get())
-            height = float(self.part_height_var.get())
-            quantity = int(self.part_quantity_var.get())
-            part = Part(width, height, quantity)
-            self.parts.append(part)
-            self.update_parts_treeview()
-            self.update_status_bar()
+            part = self.read_part_form(self.parts_model.next_part_id())
         except ValueError:
             messagebox.showerror("Грешка", "Моля, въведете валидни стойности за частите.")
+            return
+        iid = self.parts_model.insert(part)
+        self.parts_view.see(iid)
+        self.update_status_bar()
+
+    def update_part(self):
+        """
+        Replace the selected part with the values from the detail entries.
+        """
+        selected = self.parts_view.selected()
+        if not selected:
+            return
+        old = self.parts_model.get(selected[0])
+        try:
+            part = self.read_part_form(old.id, old)
+        except ValueError:
+            messagebox.showerror("Грешка", "Моля, въведете валидни стойности за частите.")
+            return
+        self.parts_model.update(selected[0], part)
+        self.update_status_bar()
 
     def remove_part(self):
         """
-        Remove the selected part from the cutting plan.
+        Remove the selected parts from the cutting plan.
+        """
+        selected = self.parts_view.selected()
+        if selected:
+            self.parts_model.delete(selected)
+            self.update_status_bar()
+
+    def undo_parts_edit(self):
+        """
+        Undo the last add, change or removal of parts.
         """
-        selected_item = self.parts_treeview.selection()
-        if selected_item:
-            part_index = self.parts_treeview.index(selected_item)
-            del self.parts[part_index]
-            self.update_parts_treeview()
+        if self.parts_model.undo():
             self.update_status_bar()
 
+    def redo_parts_edit(self):
+        """
+        Redo the last undone edit of the parts list.
+        """
+        if self.parts_model.redo():
+            self.update_status_bar()
+
+    def on_parts_changed(self, event, index, iids):
+        """
+        Keep the estimator in step with the parts list.
+        """
+        for iid in iids:
+            if event == "delete":
+                self.estimator.remove(iid)
+            else:
+                self.estimator.add(iid, self.parts_model.get(iid))
+        self.schedule_estimate()
+
+    def schedule_estimate(self):
+        """
+        Recompute the estimate shortly after the last edit.
+        """
+        if self.estimate_job is not None:
+            self.root.after_cancel(self.estimate_job)
+        self.estimate_job = self.root.after(ESTIMATE['DEBOUNCE_MS'], self.start_estimate)
+
+    def start_estimate(self):
+        """
+        Run the estimator in a background thread, one run at a time.
+        """
+        self.estimate_job = None
+        if self.estimate_running:
+            self.estimate_pending = True
+            return
+        self.estimate_running = True
+
+        def run():
+            try:
+                summary = self.estimator.summary()
+            except Exception as e:
+                print(f"Estimate failed: {e}")
+                summary = None
+            self.root.after(0, self.finish_estimate, summary)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def finish_estimate(self, summary):
+        """
+        Show the estimate and start another run if the parts changed meanwhile.
+        """
+        self.estimate_running = False
+        if summary is not None:
+            self.estimate = summary
+            self.update_status_bar()
+        if self.estimate_pending:
+            self.estimate_pending = False
+            self.start_estimate()
+
     def on_part_selected(self, event):
         """
         Event handler for part selection in the treeview.
         """
-        selected_item = self.parts_treeview.selection()
-        if selected_item:
-            part_index = self.parts_treeview.index(selected_item)
-            part = self.parts[part_index]
+        selected = self.parts_view.selected()
+        if selected:
+            part = self.parts_model.get(selected[0])
             self.part_width_var.set(part.width)
             self.part_height_var.set(part.height)
-            self.part_quantity_var.set(part.quantity)
+            self.part_quantity_var.set(part.qty)
+
+    def import_parts_from_file(self):
+        """
+        Import parts from a CSV or XLSX file.
+        """
+        path = filedialog.askopenfilename(filetypes=IMPORT_FILE_TYPES)
+        if path:
+            from models.part_import import iter_file_rows
+            self.start_import(lambda: iter_file_rows(path), os.path.basename(path))
+
+    def import_parts_from_google_sheets(self):
+        """
+        Import parts from a Google Sheets tab given as "<spreadsheet ID or URL>[/<tab>]".
+        """
+        value = simpledialog.askstring(
+            "Импорт от Google Sheets",
+            "ID или адрес на таблицата (по избор /име на лист):",
+            parent=self.root
+        )
+        if not value:
+            return
+        value = value.strip()
+        if "/d/" in value:
+            value = value.split("/d/", 1)[1]
+        spreadsheet_id, _, tab = value.partition("/")
+        if tab.startswith("edit"):
+            tab = ""
+        from models.part_import import iter_google_sheet_rows
+        self.start_import(lambda: iter_google_sheet_rows(spreadsheet_id, tab or None), "Google Sheets")
+
+    def start_import(self, rows_factory, source_name):
+        """
+        Parse and validate rows in a background thread and feed them to the UI in batches.
+        """
+        if getattr(self, "import_thread", None) is not None and self.import_thread.is_alive():
+            messagebox.showwarning("Предупреждение", "Вече тече импорт.")
+            return
+        from models.part_import import iter_part_batches
+        first_id = self.parts_model.next_part_id()
+        self.import_queue = queue.Queue()
+        self.import_errors = []
+        self.import_count = 0
+        self.import_source = source_name
+
+        def run():
+            try:
+                for parts, errors in iter_part_batches(rows_factory(), first_id):
+                    self.import_queue.put(("batch", parts, errors))
+            except Exception as e:
+                self.import_queue.put(("error", [], [(0, str(e))]))
+            self.import_queue.put(("done", [], []))
+
+        self.import_file_button.config(state=tk.DISABLED)
+        self.import_sheets_button.config(state=tk.DISABLED)
+        self.import_thread = threading.Thread(target=run, daemon=True)
+        self.import_thread.start()
+        self.root.after(IMPORT['POLL_MS'], self.poll_import)
+
+    def poll_import(self):
+        """
+        Insert at most one batch of imported parts per tick so the UI stays responsive.
+        """
+        try:
+            kind, parts, errors = self.import_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(IMPORT['POLL_MS'], self.poll_import)
+            return
+        if parts:
+            self.parts_model.insert_many(parts, group=self.import_queue)
+        self.import_count += len(parts)
+        self.import_errors.extend(errors)
+        self.status_bar.config(text=f"Импорт от {self.import_source}: {self.import_count} части, {len(self.import_errors)} грешки")
+        if kind != "done":
+            self.root.after(1, self.poll_import)
+            return
+        self.import_file_button.config(state=tk.NORMAL)
+        self.import_sheets_button.config(state=tk.NORMAL)
+        if self.import_errors:
+            ImportErrorsDialog(self.root, self.import_errors)
 
     def export_to_google_sheets(self):
         """
-        Export the cutting plan to Google Sheets.
+        Export the plan shown last to Google Sheets.
         """
-        if not self.sheet or not self.parts:
-            messagebox.showwarning("Предупреждение", "Моля, добавете лист и части преди експортиране.")
+        if self.plan_view is None or not self.plan_view.vis_window.winfo_exists():
+            messagebox.showwarning("Предупреждение", "Моля, изчислете или отворете план преди експортиране.")
             return
+        self.plan_view.export_to_google_sheets()
 
-        # Create a new thread for the export process
-        export_thread = threading.Thread(target=self.run_export_to_google_sheets)
-        export_thread.start()
+    def on_export_event(self, event, job, status):
+        """
+        Called from the export queue threads whenever a job changes state.
+        """
+        self.root.after(0, self.update_export_status, status)
+        if event == "done":
+            self.show_export_success_message()
+        elif event == "failed":
+            self.show_export_error_message(job.error or "Неуспешно експортиране")
 
-    def run_export_to_google_sheets(self):
+    def update_export_status(self, status):
+        """
+        Update the export queue status label.
+        """
+        parts = []
+        if status['running']:
+            parts.append(f"{status['running']} в процес")
+        if status['pending']:
+            parts.append(f"{status['pending']} чакащи")
+        if status['failed']:
+            parts.append(f"{status['failed']} неуспешни")
+        if not status['online']:
+            parts.append("няма връзка - експортите са запазени локално")
+        self.export_status_label.config(text="Опашка: " + ", ".join(parts) if parts else "")
+
+    def calculate_plan(self):
         """
-        Run the export process in a separate thread.
+        Pack the parts and show the sheets of each material group as soon as it is packed.
         """
+        if not len(self.parts_model):
+            messagebox.showwarning("Предупреждение", "Моля, добавете части преди изчисляване.")
+            return
+        if PLANNING_SERVICE['URL']:
+            self.calculate_plan_remote()
+            return
+        parts = self.parts
+        engine = self.packing_engine
+        group_stats = {}
+        stream = engine.iter_plan(parts, self.on_plan_progress, group_stats=group_stats)
+        self.show_plan(self.record_history(stream, parts, engine.sheet_sizes, group_stats))
+
+    def record_history(self, stream, parts, sheet_sizes, group_stats):
+        """
+        Pass the sheets of a plan through and store the run in the history once it is complete.
+        """
+        start = time.time()
+        sheets = []
+        for sheet in stream:
+            sheets.append(sheet)
+            yield sheet
         try:
-            exporter = GoogleSheetsExporter()
-            exporter.export_cutting_plan(self.sheet, self.parts)
-            self.show_export_success_message()
+            from models.history import HistoryStore
+            HistoryStore().record_run(parts, sheets, time.time() - start, sheet_sizes, group_stats)
+        except Exception as e:
+            print(f"Recording the run failed: {e}")
+
+    def calculate_plan_remote(self):
+        """
+        Submit the parts to the shared planning service and poll for the plan in a background thread.
+        """
+        from packing.service import PlanningClient
+        client = PlanningClient(PLANNING_SERVICE['URL'])
+        parts = self.parts
+        sheet_sizes = list(self.sheet_sizes.values())
+        states = {"queued": "в опашка", "running": "изчислява се", "done": "готов"}
+
+        def show_state(state):
+            text = f"План от услугата: {states.get(state, state)}"
+            self.root.after(0, lambda: self.status_bar.config(text=text))
+
+        def run():
+            start = time.time()
+            try:
+                job_id = client.submit(parts, sheet_sizes)
+                sheets = client.wait(job_id, on_state=show_state)
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "Грешка", f"Планът не беше изчислен от услугата: {e}")
+                return
+            self.root.after(0, self.show_plan, sheets)
+            try:
+                from models.history import HistoryStore
+                HistoryStore().record_run(parts, sheets, time.time() - start, sheet_sizes, source="service")
+            except Exception as e:
+                print(f"Recording the run failed: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def calculate_plan_variants(self):
+        """
+        Pack the parts in the multi-objective mode and offer the non-dominated plans side by side.
+        """
+        if not len(self.parts_model):
+            messagebox.showwarning("Предупреждение", "Моля, добавете части преди изчисляване.")
+            return
+        parts = self.parts
+        engine = self.packing_engine
+
+        def run():
+            from packing.pareto import pareto_plan
+            start = time.time()
+            try:
+                plans = pareto_plan(parts, engine.sheet_sizes, self.on_plan_progress, engine)
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "Грешка", f"Вариантите не можаха да бъдат изчислени: {e}")
+                return
+            self.root.after(0, self.show_plan_variants, plans, parts, engine.sheet_sizes, time.time() - start)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_plan_variants(self, plans, parts, sheet_sizes, duration):
+        """
+        Show the candidate plans side by side and store the one the operator picks in the history.
+        """
+        from visualization.visualizer import PlanCandidatesWindow
+
+        def record(plan):
+            try:
+                from models.history import HistoryStore
+                HistoryStore().record_run(parts, plan.sheets, duration, sheet_sizes, source="pareto")
+            except Exception as e:
+                print(f"Recording the run failed: {e}")
+
+        PlanCandidatesWindow(self.root, plans, on_pick=record, show_plan=self.show_plan)
+
+    def show_plan(self, sheets):
+        """
+        Show a cutting plan (a list or a stream of sheets) in the visualizer; it becomes the plan to export.
+        """
+        from visualization.visualizer import CuttingPlanVisualizer
+        self.plan_view = CuttingPlanVisualizer(self.root, sheets, self.export_queue)
+        return self.plan_view
+
+    def on_plan_progress(self, progress):
+        """
+        Called from the packing thread with (message, percent).
+        """
+        message, value = progress
+        self.root.after(0, lambda: self.status_bar.config(text=f"{message} ({value:.0f}%)"))
+
+    def show_history(self):
+        """
+        Show waste per material and algorithm results from the run history.
+        """
+        from models.history import HistoryStore
+        try:
+            HistoryDialog(self.root, HistoryStore())
+        except Exception as e:
+            messagebox.showerror("Грешка", f"Историята не можа да бъде отворена: {e}")
+
+    def open_plan(self):
+        """
+        Load a saved cutting plan and show it in the visualizer.
+        """
+        path = filedialog.askopenfilename(filetypes=PLAN_FILE_TYPES)
+        if not path:
+            return
+        from models.plan_file import load_plan
+        try:
+            sheets = load_plan(path)
         except Exception as e:
-            self.show_export_error_message(str(e))
+            messagebox.showerror("Грешка", f"Планът не можа да бъде зареден: {e}")
+            return
+        self.show_plan(sheets)
 
     def show_export_success_message(self):
         """
@@ -233,27 +666,99 @@ class SheetCuttingApp:
         """
         Update the sheet size combobox values.
         """
-        self.sheet_size_combobox["values"] = list(DEFAULT_SHEET_SIZES.keys())
-        if self.sheet:
-            size_name = next((name for name, dims in DEFAULT_SHEET_SIZES.items() if dims == (self.sheet.width, self.sheet.height)), None)
+        self.sheet_size_combobox["values"] = list(self.sheet_sizes.keys())
+        if self.sheet_size:
+            size_name = next((name for name, dims in self.sheet_sizes.items() if dims == self.sheet_size), None)
             self.sheet_size_var.set(size_name)
 
     def update_parts_treeview(self):
         """
         Update the parts treeview with the current parts list.
         """
-        self.parts_treeview.delete(*self.parts_treeview.get_children())
-        for part in self.parts:
-            self.parts_treeview.insert("", "end", values=(part.width, part.height, part.quantity))
+        self.parts_view.refresh()
 
     def update_status_bar(self):
         """
         Update the status bar text.
         """
-        if self.sheet:
-            self.status_bar.config(text=f"Лист: {self.sheet.width}x{self.sheet.height} мм")
+        if self.sheet_size:
+            text = f"Лист: {self.sheet_size[0]:g}x{self.sheet_size[1]:g} мм"
         else:
-            self.status_bar.config(text="Добре дошли в приложението за рязане на листове!")
+            text = "Добре дошли в приложението за рязане на листове!"
+        estimate = self.estimate
+        if estimate and estimate['groups'] and len(self.parts_model):
+            width, height = estimate['sheet_size']
+            text += (f" | Оценка за {width:g}x{height:g}: {estimate['sheets']} листа (минимум {estimate['lower_bound']}),"
+                     f" оползотворяване ~{estimate['utilization']:.0%}")
+            if estimate['oversized']:
+                text += f", {estimate['oversized']} части не се побират в листа"
+        self.status_bar.config(text=text)
+
+# Dialog listing the rows that failed validation during a bulk import
+class ImportErrorsDialog:
+    def __init__(self, parent, errors):
+        self.top = tk.Toplevel(parent)
+        self.top.title(f"Грешки при импорт ({len(errors)})")
+        self.top.geometry("500x300")
+
+        text = scrolledtext.ScrolledText(self.top, wrap=tk.WORD)
+        text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        text.insert(tk.END, "\n".join(f"Ред {row}: {message}" if row else message for row, message in errors))
+        text.config(state=tk.DISABLED)
+
+        ttk.Button(self.top, text="OK", command=self.top.destroy).pack(pady=5)
+
+class HistoryDialog:
+    PERIODS = {"Последните 7 дни": 7, "Последните 30 дни": 30, "Последната година": 365, "Всички": None}
+
+    def __init__(self, parent, store):
+        self.store = store
+        self.top = tk.Toplevel(parent)
+        self.top.title("История на изчисленията")
+        self.top.geometry("800x520")
+
+        filter_frame = ttk.Frame(self.top)
+        filter_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(filter_frame, text="Период:").pack(side=tk.LEFT)
+        self.period_var = tk.StringVar(value="Последните 30 дни")
+        period = ttk.Combobox(filter_frame, textvariable=self.period_var, values=list(self.PERIODS), state="readonly")
+        period.pack(side=tk.LEFT, padx=5)
+        period.bind("<<ComboboxSelected>>", lambda event: self.refresh())
+        self.runs_label = ttk.Label(filter_frame, text="")
+        self.runs_label.pack(side=tk.LEFT, padx=10)
+
+        self.materials = self.create_table("Отпадък по материал",
+                                           ("Материал", "Дебелина", "Листове", "Използване", "Отпадък (m²)"))
+        self.algorithms = self.create_table("Резултати по алгоритъм",
+                                            ("Алгоритъм", "Сортиране", "Изчисления", "Листове", "Използване"))
+        ttk.Button(self.top, text="Затвори", command=self.top.destroy).pack(pady=5)
+        self.refresh()
+
+    def create_table(self, title, columns):
+        frame = ttk.LabelFrame(self.top, text=title)
+        frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        table = ttk.Treeview(frame, columns=columns, show="headings", height=6)
+        for column in columns:
+            table.heading(column, text=column)
+            table.column(column, width=120)
+        table.pack(fill=tk.BOTH, expand=True)
+        return table
+
+    def refresh(self):
+        days = self.PERIODS.get(self.period_var.get())
+        since = time.time() - days * 86400 if days else None
+        self.materials.delete(*self.materials.get_children())
+        for row in self.store.waste_by_material(since=since):
+            self.materials.insert("", "end", values=(row['material'], row['thickness'], row['sheets'],
+                                                     f"{(row['utilization'] or 0) * 100:.1f}%", f"{row['waste_m2']:.2f}"))
+        self.algorithms.delete(*self.algorithms.get_children())
+        for row in self.store.algorithm_wins(since=since):
+            self.algorithms.insert("", "end", values=(row['algorithm'], row['sort_method'], row['runs'], row['sheets'],
+                                                      f"{(row['utilization'] or 0) * 100:.1f}%"))
+        runs = self.store.run_times(since=since)
+        count = sum(row['runs'] for row in runs)
+        average = sum(row['avg_seconds'] * row['runs'] for row in runs) / count if count else 0
+        self.runs_label.config(text=f"Изчисления: {count}, средно време: {average:.1f} с")
 
 # Custom dialog class for adding a new sheet size
 class CustomSheetSizeDialog:
@@ -0,0 +1,58 @@
+"""
+Startup benchmark for the sheet cutting app.
+
+Measures the time from interpreter start to the first paint of
+SheetCuttingApp in a fresh process per run, so every run pays the full
+import cost, and reports which heavy modules were already loaded when the
+window appeared.
+
+Usage:
+    python bench_startup.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+import os
+
+SNIPPET = r'''
+import time
+start = time.perf_counter()
+import sys
+import tkinter as tk
+from ui.app_ui import SheetCuttingApp
+root = tk.Tk()
+app = SheetCuttingApp(root)
+root.wait_visibility(root)
+root.update()
+elapsed = time.perf_counter() - start
+heavy = [name for name in ("rectpack", "googleapiclient", "google.oauth2") if name in sys.modules]
+print(f"{elapsed:.6f} {','.join(heavy)}")
+root.destroy()
+'''
+
+def run_once() -> tuple:
+    result = subprocess.run(
+        [sys.executable, "-c", SNIPPET],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    line = result.stdout.strip().splitlines()[-1]
+    elapsed, _, heavy = line.partition(" ")
+    return float(elapsed), heavy
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    timings = []
+    heavy = ""
+    for _ in range(runs):
+        elapsed, heavy = run_once()
+        timings.append(elapsed)
+    print(f"Time to first paint over {runs} runs: "
+          f"median {statistics.median(timings) * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms")
+    print(f"Heavy modules loaded at first paint: {heavy or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Lower bounds on the number of sheets needed by a group of pieces.
+
+Pieces and bins are given as (width, height) with spacing and borders
+already applied, and pieces may be rotated by 90 degrees. A plan whose
+sheet count equals the bound is optimal, so the search can stop there.
+"""
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import List, Tuple, Dict, Optional
+import math
+
+def continuous_bound(pieces: List[Tuple[float, float]], bin_width: float, bin_height: float) -> int:
+    bin_area = bin_width * bin_height
+    if not pieces or bin_area <= 0:
+        return 0
+    return math.ceil(sum(w * h for w, h in pieces) / bin_area - 1e-9)
+
+def l2_bound_1d(sizes: List[float], capacity: float) -> int:
+    """
+    Martello–Toth L2 bound for one-dimensional bin packing.
+
+    For every threshold K <= C/2 the items above C - K need a bin each,
+    items in (C/2, C - K] need a bin each as well, and items in [K, C/2]
+    can only use the room those bins leave free before opening new ones.
+    """
+    sizes = sorted(size for size in sizes if size > 0)
+    if not sizes:
+        return 0
+    prefix = [0.0] + list(accumulate(sizes))
+    half = capacity / 2
+    best = 0
+    candidates = {0.0}
+    candidates.update(size for size in sizes if size <= half)
+    for k in candidates:
+        # J3 = [k, C/2], J2 = (C/2, C - k], J1 = (C - k, C]
+        j3_start = bisect_left(sizes, k)
+        j2_start = bisect_right(sizes, half)
+        j1_start = bisect_right(sizes, capacity - k)
+        j1 = len(sizes) - j1_start
+        j2 = j1_start - j2_start
+        j2_free = j2 * capacity - (prefix[j1_start] - prefix[j2_start])
+        j3_sum = prefix[j2_start] - prefix[j3_start]
+        bound = j1 + j2 + max(0, math.ceil((j3_sum - j2_free) / capacity - 1e-9))
+        best = max(best, bound)
+    return best
+
+def l2_bound(pieces: List[Tuple[float, float]], bin_width: float, bin_height: float) -> int:
+    """
+    L2 applied to the pieces that cannot stand side by side.
+
+    Two pieces wider than half the sheet overlap horizontally, so they must
+    be stacked and their heights add up to at most the sheet height. With
+    rotation a piece only counts if it is that wide in every orientation
+    that fits, using its smallest such height. Tall pieces are treated the
+    same way along the other axis.
+    """
+    heights = []
+    widths = []
+    for w, h in pieces:
+        orientations = [(a, b) for a, b in ((w, h), (h, w)) if a <= bin_width and b <= bin_height]
+        if not orientations:
+            continue
+        if all(a > bin_width / 2 for a, _ in orientations):
+            heights.append(min(b for _, b in orientations))
+        if all(b > bin_height / 2 for _, b in orientations):
+            widths.append(min(a for a, _ in orientations))
+    return max(l2_bound_1d(heights, bin_height), l2_bound_1d(widths, bin_width))
+
+def lower_bound(pieces: List[Tuple[float, float]], bin_width: float, bin_height: float) -> int:
+    return max(continuous_bound(pieces, bin_width, bin_height), l2_bound(pieces, bin_width, bin_height))
+
+def group_bounds(pieces: List[Tuple[float, float]], bin_width: float, bin_height: float) -> Dict[str, int]:
+    continuous = continuous_bound(pieces, bin_width, bin_height)
+    l2 = l2_bound(pieces, bin_width, bin_height)
+    return {
+        'continuous': continuous,
+        'l2': l2,
+        'lower_bound': max(continuous, l2)
+    }
+
+def optimality_gap(sheet_count: int, bound: int) -> Optional[float]:
+    """
+    Relative gap between a plan and the bound, 0.0 when provably optimal.
+    """
+    if sheet_count <= 0:
+        return None
+    return max(0.0, (sheet_count - bound) / sheet_count)
@@ -1,6 +1,7 @@
 """
 Configuration and constants for the sheet cutting app.
 """
+import os
 
 DEFAULT_SHEET_SIZES = [(2000, 1000), (2500, 1250), (3000, 1500)]
 COLORS = {
@@ -14,3 +15,104 @@ MARGINS = {
     'SIDE': 10,
     'SPACING': 5
 }
+THUMBNAIL = {
+    'WIDTH': 200,
+    'HEIGHT': 120,
+    'COLUMNS': 4,
+    'PADDING': 15,
+    'BACKGROUND': "#ffffff",
+    'BORDER': "#000000"
+}
+PLAN_FILE_TYPES = [("План за рязане", "*.dsplan"), ("Всички файлове", "*.*")]
+SERVICE_ACCOUNT_FILE = os.environ.get("GOOGLE_SERVICE_ACCOUNT_FILE", "ss_service_account.json")
+EXPORT = {
+    'CHUNK_ROWS': 5000,
+    'CHUNK_BYTES': 2 * 1024 * 1024,
+    'MAX_RETRIES': 6,
+    'BACKOFF_BASE': 1.0,
+    'BACKOFF_MAX': 64.0
+}
+GOOGLE_SHEET_ID = os.environ.get("GOOGLE_SHEET_ID")
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".digital_saw")
+SHEET_METADATA_CACHE = os.path.join(CACHE_DIR, "sheet_metadata.json")
+EXPORT_SPOOL_DIR = os.path.join(CACHE_DIR, "spool")
+HISTORY_DB = os.path.join(CACHE_DIR, "history.sqlite3")
+EXPORT_QUEUE = {
+    'WORKERS': 2,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30.0,
+    'PROBE_HOST': "sheets.googleapis.com",
+    'PROBE_INTERVAL': 5.0,
+    'PROBE_INTERVAL_MAX': 120.0
+}
+IMPORT = {
+    'BATCH_SIZE': 500,
+    'SHEETS_BLOCK_ROWS': 1000,
+    'POLL_MS': 20
+}
+IMPORT_FILE_TYPES = [("Таблици", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx"), ("Всички файлове", "*.*")]
+PARTS_LIST = {
+    'VIRTUAL_THRESHOLD': 2000,
+    'ROW_HEIGHT': 20,
+    'DEFAULT_PAGE': 20,
+    'UNDO_LIMIT': 200
+}
+ESTIMATE = {
+    'DEBOUNCE_MS': 150
+}
+EXACT = {
+    'MAX_PIECES': 30,
+    'MAX_GAP': 1,
+    'MAX_SEARCH_SIZE': 200000,
+    'TIME_LIMIT': 1.0,
+    'TOTAL_TIME': 3.0,
+    'SHEET_NODES': 5000
+}
+PATTERNS = {
+    'MIN_QTY': 20,
+    'MIN_REPEAT': 2
+}
+CLUSTER = {
+    'MIN_PIECES': 50,
+    'SMALL_RATIO': 0.02,
+    'BLOCK_RATIO': 0.25
+}
+WHAT_IF = {
+    'PRICE_PER_M2': 25.0
+}
+PLANNING_SERVICE = {
+    'URL': os.environ.get("PLANNING_SERVICE_URL"),
+    'HOST': "127.0.0.1",
+    'PORT': 8765,
+    'MAX_BODY': 16 * 1024 * 1024,
+    'KEEP_JOBS': 500,
+    'CACHE_SIZE': 100,
+    'POLL_SECONDS': 0.5,
+    'TIMEOUT': 5.0
+}
+CUTS = {
+    'CUT_SPEED': 25.0,
+    'TRAVEL_SPEED': 250.0,
+    'ROTATE_SECONDS': 4.0,
+    'MERGE_GAP': 20.0,
+    'TIME_LIMIT': 0.1
+}
+FILE_EXPORT = {
+    'PARALLEL_MIN_SHEETS': 20,
+    'SHEETS_AHEAD': 2,
+    'DXF_SHEET_GAP': 200.0,
+    'GCODE_SAFE_Z': 5.0,
+    'GCODE_OVERCUT': 0.5,
+    'GCODE_FEED': 1500,
+    'GCODE_PLUNGE': 300,
+    'GCODE_SPINDLE': 18000
+}
+EXPORT_FILE_TYPES = [("DXF", "*.dxf"), ("CSV списък за рязане", "*.csv"), ("G-code", "*.nc *.gcode")]
+PARETO = {
+    'MAX_GROUP_FRONT': 6,
+    'MAX_CANDIDATES': 8,
+    'WASTE_TOLERANCE': 10000.0,
+    'CUT_TOLERANCE': 100.0,
+    'TIME_TOLERANCE': 0.05,
+    'RELATIVE_TOLERANCE': 0.01
+}
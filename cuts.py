@@ -0,0 +1,204 @@
+"""
+Cut sequencing for placed sheets.
+
+Every part edge is a straight cut. Edges on the same line that are at most
+CUTS['MERGE_GAP'] apart are cut in one pass, as long as the pass does not
+run through another part. The cuts are then ordered to keep head travel
+and changes between horizontal and vertical cutting low: nearest neighbour
+first, then 2-opt moves until CUTS['TIME_LIMIT'] runs out.
+"""
+from typing import List, Tuple, Dict, Optional, Union
+from models.part import Placement, PlacementBatch
+from config import CUTS
+from bisect import bisect_left
+from itertools import accumulate
+import heapq
+import math
+import time
+
+class Cut:
+    __slots__ = ('x1', 'y1', 'x2', 'y2')
+
+    def __init__(self, x1: float, y1: float, x2: float, y2: float):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+
+    @property
+    def horizontal(self) -> bool:
+        return self.y1 == self.y2
+
+    @property
+    def length(self) -> float:
+        return abs(self.x2 - self.x1) + abs(self.y2 - self.y1)
+
+    def reversed(self) -> "Cut":
+        return Cut(self.x2, self.y2, self.x1, self.y1)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'x1': self.x1, 'y1': self.y1, 'x2': self.x2, 'y2': self.y2}
+
+def part_rects(placements: Union[PlacementBatch, List[Placement]]) -> List[Tuple[float, float, float, float]]:
+    if not isinstance(placements, PlacementBatch):
+        placements = PlacementBatch.from_placements(placements)
+    rects = []
+    for x, y, w, h, rotated in zip(placements.xs, placements.ys, placements.widths, placements.heights,
+                                   placements.rotated):
+        rects.append((x, y, h, w) if rotated else (x, y, w, h))
+    return rects
+
+def _merge_line(segments: List[Tuple[float, float]], crosses) -> List[Tuple[float, float]]:
+    segments.sort()
+    merged = [list(segments[0])]
+    for start, end in segments[1:]:
+        last = merged[-1]
+        if start <= last[1] or (start - last[1] <= CUTS['MERGE_GAP'] and not crosses(last[1], start)):
+            last[1] = max(last[1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+def derive_cuts(placements: Union[PlacementBatch, List[Placement]]) -> List[Cut]:
+    return rect_cuts(part_rects(placements))
+
+def _merge_lines(lines: Dict[float, List[Tuple[float, float]]],
+                 rects: List[Tuple[float, float, float, float]]) -> Dict[float, List[Tuple[float, float]]]:
+    """
+    _merge_line for every line, sweeping the lines in order.
+
+    rects are (low, high, start, end); a line runs through a rect when
+    low < line < high, and a bridge must not pass through its start..end.
+    The sweep keeps the rects open at the current line, so a bridge check
+    is a bisect instead of a scan over every rect on the sheet.
+    """
+    pending = sorted(rects)
+    index = 0
+    open_rects: Dict[int, Tuple[float, float]] = {}
+    closing: List[Tuple[float, int]] = []
+    merged = {}
+    for line in sorted(lines):
+        while index < len(pending) and pending[index][0] < line:
+            low, high, start, end = pending[index]
+            open_rects[index] = (start, end)
+            heapq.heappush(closing, (high, index))
+            index += 1
+        while closing and closing[0][0] <= line:
+            del open_rects[heapq.heappop(closing)[1]]
+        # Built on the first bridge check only; most lines have none
+        spans = []
+
+        def crosses(a, b):
+            if not spans:
+                ordered = sorted(open_rects.values())
+                spans.append([start for start, _ in ordered])
+                spans.append(list(accumulate((end for _, end in ordered), max)))
+            k = bisect_left(spans[0], b) - 1
+            return k >= 0 and spans[1][k] > a
+        merged[line] = _merge_line(lines[line], crosses)
+    return merged
+
+def rect_cuts(rects: List[Tuple[float, float, float, float]]) -> List[Cut]:
+    """
+    The merged cuts along the edges of (x, y, width, height) rects.
+    """
+    rows: Dict[float, List[Tuple[float, float]]] = {}
+    columns: Dict[float, List[Tuple[float, float]]] = {}
+    for x, y, w, h in rects:
+        for line in (y, y + h):
+            rows.setdefault(round(line, 2), []).append((x, x + w))
+        for line in (x, x + w):
+            columns.setdefault(round(line, 2), []).append((y, y + h))
+    merged_rows = _merge_lines(rows, [(y, y + h, x, x + w) for x, y, w, h in rects])
+    merged_columns = _merge_lines(columns, [(x, x + w, y, y + h) for x, y, w, h in rects])
+    cuts = []
+    for y in rows:
+        cuts.extend(Cut(start, y, end, y) for start, end in merged_rows[y])
+    for x in columns:
+        cuts.extend(Cut(x, start, x, end) for start, end in merged_columns[x])
+    return cuts
+
+def _link_cost(x: float, y: float, horizontal: bool, cut: Cut) -> float:
+    cost = math.hypot(cut.x1 - x, cut.y1 - y) / CUTS['TRAVEL_SPEED']
+    if cut.horizontal != horizontal:
+        cost += CUTS['ROTATE_SECONDS']
+    return cost
+
+def sequence_cuts(cuts: List[Cut], start: Tuple[float, float] = (0.0, 0.0),
+                  time_limit: float = CUTS['TIME_LIMIT']) -> List[Cut]:
+    """
+    Order and orient the cuts so the head moves and turns as little as possible.
+    """
+    deadline = time.perf_counter() + time_limit
+    remaining = list(cuts)
+    order: List[Cut] = []
+    x, y = start
+    horizontal = True
+    while remaining:
+        best_index = 0
+        best_cut = None
+        best_cost = float('inf')
+        for index, cut in enumerate(remaining):
+            for candidate in (cut, cut.reversed()):
+                cost = _link_cost(x, y, horizontal, candidate)
+                if cost < best_cost:
+                    best_index, best_cut, best_cost = index, candidate, cost
+        remaining[best_index] = remaining[-1]
+        remaining.pop()
+        order.append(best_cut)
+        x, y, horizontal = best_cut.x2, best_cut.y2, best_cut.horizontal
+    # 2-opt: reversing order[i..j] also flips every cut in it, so only the two outer links change
+    n = len(order)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 1):
+            if time.perf_counter() > deadline:
+                break
+            if i == 0:
+                px, py, ph = start[0], start[1], True
+            else:
+                prev = order[i - 1]
+                px, py, ph = prev.x2, prev.y2, prev.horizontal
+            first = order[i]
+            before = _link_cost(px, py, ph, first)
+            for j in range(i + 1, n):
+                last = order[j]
+                after_old = before
+                after_new = _link_cost(px, py, ph, last.reversed())
+                if j + 1 < n:
+                    following = order[j + 1]
+                    after_old += _link_cost(last.x2, last.y2, last.horizontal, following)
+                    after_new += _link_cost(first.x1, first.y1, first.horizontal, following)
+                if after_new < after_old - 1e-9:
+                    order[i:j + 1] = [cut.reversed() for cut in reversed(order[i:j + 1])]
+                    improved = True
+                    break
+    return order
+
+def cut_stats(order: List[Cut], start: Tuple[float, float] = (0.0, 0.0)) -> Dict[str, float]:
+    cut_length = 0.0
+    travel = 0.0
+    rotations = 0
+    x, y = start
+    horizontal = True
+    for cut in order:
+        travel += math.hypot(cut.x1 - x, cut.y1 - y)
+        if cut.horizontal != horizontal:
+            rotations += 1
+        cut_length += cut.length
+        x, y, horizontal = cut.x2, cut.y2, cut.horizontal
+    return {
+        'cut_count': len(order),
+        'cut_length': cut_length,
+        'travel_length': travel,
+        'rotations': rotations,
+        'machine_time': (cut_length / CUTS['CUT_SPEED'] + travel / CUTS['TRAVEL_SPEED'] +
+                         rotations * CUTS['ROTATE_SECONDS'])
+    }
+
+def plan_cuts(placements: Union[PlacementBatch, List[Placement]],
+              time_limit: Optional[float] = None) -> Tuple[List[Cut], Dict[str, float]]:
+    order = sequence_cuts(derive_cuts(placements),
+                          time_limit=CUTS['TIME_LIMIT'] if time_limit is None else time_limit)
+    return order, cut_stats(order)
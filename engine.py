@@ -2,12 +2,18 @@
 Packing engine and optimization logic for the sheet cutting app.
 """
 from rectpack import newPacker
+import math
+import time
 from rectpack.maxrects import MaxRectsBaf, MaxRectsBl
 from rectpack.skyline import SkylineMwf, SkylineBlWm
 from rectpack.guillotine import GuillotineBafSas
-from typing import List, Callable, Dict, Any
-from models.part import Part, Placement, Sheet
-from config import DEFAULT_SHEET_SIZES
+from typing import List, Callable, Dict, Any, Iterator, Optional, Tuple
+from models.part import Part, PlacementBatch, Sheet
+from packing.bounds import group_bounds, optimality_gap
+from packing.exact import solve_exact, search_size
+from packing.cuts import plan_cuts, rect_cuts
+from packing.pareto import Candidate, ParetoFront, sheet_values
+from config import DEFAULT_SHEET_SIZES, EXACT, PATTERNS, CLUSTER, PARETO
 
 ALGORITHMS = [
     (MaxRectsBaf, "MaxRects Best-Area-Fit"),
@@ -17,206 +23,530 @@ ALGORITHMS = [
     (GuillotineBafSas, "Guillotine Best-Area-Fit Split-Axis-Short")
 ]
 
+class PackingError(Exception):
+    pass
+
 class PackingEngine:
     def __init__(self, sheet_sizes: List[tuple]):
         self.sheet_sizes = sheet_sizes
         self.algorithms = ALGORITHMS
 
-    def calculate_plan(self, parts: List[Part], progress_callback: Callable):
+    def calculate_plan(self, parts: List[Part], progress_callback: Callable,
+                       group_stats: Optional[Dict[Tuple[str, float], Dict[str, Any]]] = None):
         try:
-            sheets = []
-            groups = {}
-            for part in parts:
-                key = (part.material, part.thickness)
-                if key not in groups:
-                    groups[key] = []
-                groups[key].append(part)
-            total_parts = sum(p.qty for p in parts)
-            processed_parts = 0
-            progress_callback(("Започва изчислението...", 0))
-            import math
-            import time
-            start_time = time.time()
-            for group_key, group_parts in groups.items():
-                material, thickness = group_key
-                all_pieces = []
-                for part in group_parts:
-                    for _ in range(part.qty):
-                        all_pieces.append({
-                            'width': part.width,
-                            'height': part.height,
-                            'ref': part.ref,
-                            'part_id': part.id,
-                            'original_width': part.width,
-                            'original_height': part.height
-                        })
-                best_utilization = 0
-                best_solution = None
-                best_algorithm = None
-                best_time = float('inf')
-                best_sort = ""
-                for attempt in range(4):
-                    if attempt == 0:
-                        sorted_pieces = sorted(all_pieces, key=lambda p: p['width'] * p['height'], reverse=True)
-                        sort_name = "Площ (намаляващ)"
-                    elif attempt == 1:
-                        sorted_pieces = sorted(all_pieces, key=lambda p: max(p['width'], p['height']), reverse=True)
-                        sort_name = "Макс размер (намаляващ)"
-                    elif attempt == 2:
-                        sorted_pieces = sorted(all_pieces, key=lambda p: 2*(p['width'] + p['height']), reverse=True)
-                        sort_name = "Периметър (намаляващ)"
-                    else:
-                        sorted_pieces = sorted(all_pieces, 
-                                             key=lambda p: (p['width'] * p['height'], 
-                                                            max(p['width'], p['height']) / min(p['width'], p['height'])), 
-                                             reverse=True)
-                        sort_name = "Хибридно сортиране"
-                    for algo, algo_name in self.algorithms:
-                        algo_start_time = time.time()
-                        if time.time() - start_time > 300:
-                            progress_callback(("Грешка: Изчислението отне твърде много време", 100))
-                            return None
-                        try:
-                            packer = newPacker(rotation=True, pack_algo=algo)
-                            total_piece_area = sum(p['width'] * p['height'] for p in sorted_pieces)
+            return list(self.iter_plan(parts, progress_callback, group_stats=group_stats))
+        except PackingError as e:
+            progress_callback((f"Грешка: {e}", 100))
+            return None
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            progress_callback((f"Грешка: {str(e)}", 100))
+            return None
+
+    def iter_plan(self, parts: List[Part], progress_callback: Callable,
+                  fronts: Optional[Dict[Tuple[str, float], List[Candidate]]] = None,
+                  group_stats: Optional[Dict[Tuple[str, float], Dict[str, Any]]] = None) -> Iterator[Sheet]:
+        """
+        Yield the finished sheets of each (material, thickness) group as soon as the group is done.
+
+        group_stats, if given, gets the bounds, sheet count, optimality gap,
+        winning algorithm and time of every group as it finishes. The engine
+        keeps no state between calls, so one engine can run several plans at
+        once.
+
+        With fronts, every candidate is kept that no other beats on sheets,
+        waste, cut length and time, and fronts[(material, thickness)] gets
+        the built candidates of the group (see packing.pareto). The yielded
+        sheets are the same as without it.
+
+        Raises PackingError when a group cannot be packed or the time limit is hit.
+        """
+        groups = {}
+        for part in parts:
+            key = (part.material, part.thickness)
+            if key not in groups:
+                groups[key] = []
+            groups[key].append(part)
+        total_parts = sum(p.qty for p in parts)
+        processed_parts = 0
+        progress_callback(("Започва изчислението...", 0))
+        start_time = time.time()
+        group_stats = {} if group_stats is None else group_stats
+        exact_seconds = 0.0
+        # Every sheet size fits in this one, so its bound holds for any mix of sizes
+        bound_width = max(size[0] for size in self.sheet_sizes) - 20
+        bound_height = max(size[1] for size in self.sheet_sizes) - 20
+        # Small groups first, so their sheets are out while the big ones are still packing
+        for group_key, group_parts in sorted(groups.items(), key=lambda item: sum(part.qty for part in item[1])):
+            material, thickness = group_key
+            group_start = time.time()
+            group_pieces = sum(part.qty for part in group_parts)
+            bounds = group_bounds([(part.width + 10, part.height + 10) for part in group_parts for _ in range(part.qty)],
+                                  bound_width, bound_height)
+            # Full sheets of one part are packed once and repeated; only the rest is packed piece by piece
+            pattern_sheets, remaining = self.repeated_patterns(group_parts, material, thickness)
+            pattern_count = sum(sheet.repeat for sheet in pattern_sheets)
+            all_pieces = []
+            for part in group_parts:
+                for _ in range(remaining[part.id]):
+                    all_pieces.append({
+                        'width': part.width,
+                        'height': part.height,
+                        'ref': part.ref,
+                        'part_id': part.id,
+                        'original_width': part.width,
+                        'original_height': part.height,
+                        'area': part.width * part.height
+                    })
+            # Small pieces are packed into composite blocks first, so every rectpack run sees fewer rects
+            pack_items = self.cluster_small_pieces(all_pieces)
+            # Multi-objective mode keeps searching past the lower bound for shorter cuts
+            group_front = ParetoFront(PARETO['MAX_GROUP_FRONT']) if fronts is not None else None
+            pareto_seconds = 0.0
+            best_utilization = 0
+            best_solution = None
+            best_algorithm = None
+            best_time = float('inf')
+            best_sort = ""
+            at_bound = False
+            for attempt in range(4 if all_pieces else 0):
+                if at_bound and group_front is None:
+                    break
+                if attempt == 0:
+                    sorted_pieces = sorted(pack_items, key=lambda p: p['width'] * p['height'], reverse=True)
+                    sort_name = "Площ (намаляващ)"
+                elif attempt == 1:
+                    sorted_pieces = sorted(pack_items, key=lambda p: max(p['width'], p['height']), reverse=True)
+                    sort_name = "Макс размер (намаляващ)"
+                elif attempt == 2:
+                    sorted_pieces = sorted(pack_items, key=lambda p: 2*(p['width'] + p['height']), reverse=True)
+                    sort_name = "Периметър (намаляващ)"
+                else:
+                    sorted_pieces = sorted(pack_items, 
+                                         key=lambda p: (p['width'] * p['height'], 
+                                                        max(p['width'], p['height']) / min(p['width'], p['height'])), 
+                                         reverse=True)
+                    sort_name = "Хибридно сортиране"
+                piece_areas = [p['area'] for p in sorted_pieces]
+                total_piece_area = sum(p['width'] * p['height'] for p in sorted_pieces)
+                for algo, algo_name in self.algorithms:
+                    algo_start_time = time.time()
+                    if time.time() - start_time > 300:
+                        raise PackingError("Изчислението отне твърде много време")
+                    try:
+                        packer = newPacker(rotation=True, pack_algo=algo)
+                        for sheet_size in self.sheet_sizes:
+                            eff_width = sheet_size[0] - 20
+                            eff_height = sheet_size[1] - 20
+                            sheet_area = eff_width * eff_height
+                            min_for_size = max(1, math.ceil(total_piece_area / sheet_area))
+                            for _ in range(min_for_size):
+                                packer.add_bin(eff_width, eff_height, bid=sheet_size)
+                        for idx, piece in enumerate(sorted_pieces):
+                            packer.add_rect(piece['width'] + 10, piece['height'] + 10, rid=idx)
+                        packer.pack()
+                        if packer.rect_list() and len(packer.rect_list()) < len(sorted_pieces):
+                            unpacked_count = len(sorted_pieces) - len(packer.rect_list())
+                            additional_bins = max(1, math.ceil(unpacked_count / 5))
                             for sheet_size in self.sheet_sizes:
                                 eff_width = sheet_size[0] - 20
                                 eff_height = sheet_size[1] - 20
-                                sheet_area = eff_width * eff_height
-                                min_for_size = max(1, math.ceil(total_piece_area / sheet_area))
-                                for _ in range(min_for_size):
+                                for _ in range(additional_bins):
                                     packer.add_bin(eff_width, eff_height, bid=sheet_size)
-                            for idx, piece in enumerate(sorted_pieces):
-                                packer.add_rect(piece['width'] + 10, piece['height'] + 10, rid=idx)
                             packer.pack()
-                            if packer.rect_list() and len(packer.rect_list()) < len(sorted_pieces):
-                                unpacked_count = len(sorted_pieces) - len(packer.rect_list())
-                                additional_bins = max(1, math.ceil(unpacked_count / 5))
-                                for sheet_size in self.sheet_sizes:
-                                    eff_width = sheet_size[0] - 20
-                                    eff_height = sheet_size[1] - 20
-                                    for _ in range(additional_bins):
-                                        packer.add_bin(eff_width, eff_height, bid=sheet_size)
-                                packer.pack()
-                            total_sheet_area = 0
-                            used_area = 0
-                            placements_by_bin = {}
-                            for rect in packer.rect_list():
-                                b, x, y, w, h, rid = rect
-                                piece = sorted_pieces[rid]
-                                sheet_size = packer[b].bid
-                                if b not in placements_by_bin:
-                                    placements_by_bin[b] = {
-                                        'sheet_size': sheet_size,
-                                        'placements': [],
-                                        'used_area': 0
-                                    }
-                                    total_sheet_area += sheet_size[0] * sheet_size[1]
-                                rotated = False
-                                if (math.isclose(w, piece['width'] + 10, abs_tol=0.1) and 
-                                    math.isclose(h, piece['height'] + 10, abs_tol=0.1)):
-                                    pass
-                                elif (math.isclose(h, piece['width'] + 10, abs_tol=0.1) and 
-                                      math.isclose(w, piece['height'] + 10, abs_tol=0.1)):
-                                    rotated = True
-                                else:
-                                    rotated = not (w == piece['original_width'] + 10)
-                                part_x = 10 + x + 5
-                                part_y = 10 + y + 5
-                                placement = Placement(
-                                    part_id=piece['part_id'],
-                                    ref=piece['ref'],
-                                    x=part_x,
-                                    y=part_y,
-                                    rotated=rotated,
-                                    width=piece.get('original_width', piece['width']),
-                                    height=piece.get('original_height', piece['height']),
-                                    spacing={
-                                        'x': 10 + x,
-                                        'y': 10 + y,
-                                        'width': w,
-                                        'height': h
-                                    }
-                                )
-                                placements_by_bin[b]['placements'].append(placement)
-                                placements_by_bin[b]['used_area'] += piece['original_width'] * piece['original_height']
-                                used_area += piece['original_width'] * piece['original_height']
-                            if total_sheet_area == 0:
-                                continue
-                            utilization = used_area / total_sheet_area
-                            algo_time = time.time() - algo_start_time
-                            if utilization > best_utilization or (utilization == best_utilization and algo_time < best_time):
-                                best_utilization = utilization
-                                best_solution = placements_by_bin
-                                best_algorithm = algo_name
-                                best_time = algo_time
-                                best_sort = sort_name
-                        except Exception as e:
-                            print(f"Algorithm {algo_name} failed: {e}")
+                        # Candidates are scored from the raw rects; placements are only built for the winner
+                        rects = packer.rect_list()
+                        bin_sizes = {}
+                        used_area = 0
+                        for b, _, _, _, _, rid in rects:
+                            if b not in bin_sizes:
+                                bin_sizes[b] = packer[b].bid
+                            used_area += piece_areas[rid]
+                        total_sheet_area = sum(size[0] * size[1] for size in bin_sizes.values())
+                        if total_sheet_area == 0:
                             continue
-                if best_solution is None:
-                    progress_callback(("Грешка: Неуспешно опаковане на частите", 100))
-                    return None
-                if best_solution:
-                    optimized_solution = {}
-                    for bin_id, sheet_data in best_solution.items():
-                        placements = sheet_data['placements']
-                        used_area = sum(p.width * p.height for p in placements)
-                        sheet_w, sheet_h = sheet_data['sheet_size']
-                        sheet_area = sheet_w * sheet_h
-                        waste_percent = (sheet_area - used_area) / sheet_area * 100
-                        if waste_percent > 15:
-                            placements_dicts = [p.to_dict() if hasattr(p, 'to_dict') else p for p in placements]
-                            optimized_placements = self.optimize_sheet(
-                                placements_dicts,
-                                sheet_w,
-                                sheet_h
-                            )
-                            if optimized_placements:
-                                placements = [
-                                    Placement(
-                                        placement['part_id'],
-                                        placement['ref'],
-                                        placement['x'],
-                                        placement['y'],
-                                        placement['rotated'],
-                                        placement['width'],
-                                        placement['height'],
-                                        {}) for placement in optimized_placements
-                                ]
-                                used_area = sum(p['width'] * p['height'] for p in optimized_placements)
-                                waste_percent = (sheet_area - used_area) / sheet_area * 100
-                        sheet_data['placements'] = placements
-                        sheet_data['used_area'] = used_area
-                        optimized_solution[bin_id] = sheet_data
-                    best_solution = optimized_solution
-                for bin_id, sheet_data in best_solution.items():
-                    sheet_size = sheet_data['sheet_size']
-                    placements = sheet_data['placements']
-                    used_area = sheet_data['used_area']
-                    sheet_area = sheet_size[0] * sheet_size[1]
-                    utilization = used_area / sheet_area if sheet_area > 0 else 0
-                    efficiency = self.calculate_sheet_efficiency(sheet_size, placements)
-                    sheets.append(Sheet(
-                        size=sheet_size,
-                        material=material,
-                        thickness=thickness,
-                        placements=placements,
-                        algorithm=best_algorithm,
-                        sort_method=best_sort,
-                        utilization=utilization,
-                        efficiency=efficiency
-                    ))
-                processed_parts += len(all_pieces)
-                progress_value = processed_parts / total_parts * 100
-                progress_callback((f"Опаковани {len(all_pieces)} части (Алгоритъм: {best_algorithm}, Сортиране: {best_sort})", progress_value))
-            sheets = self.global_optimization(sheets)
-            return sheets
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            progress_callback((f"Грешка: {str(e)}", 100))
-            return None
+                        utilization = used_area / total_sheet_area
+                        algo_time = time.time() - algo_start_time
+                        if at_bound:
+                            # Only the multi-objective mode gets here; its extra search is not the plan's time
+                            pareto_seconds += algo_time
+                        # A complete plan on as many sheets as the lower bound cannot be beaten
+                        complete = len(rects) == len(sorted_pieces)
+                        reached = complete and pattern_count + len(bin_sizes) <= bounds['lower_bound']
+                        if not at_bound and (reached or utilization > best_utilization or
+                                             (utilization == best_utilization and algo_time < best_time)):
+                            best_utilization = utilization
+                            best_solution = (rects, bin_sizes, sorted_pieces)
+                            best_algorithm = algo_name
+                            best_time = algo_time
+                            best_sort = sort_name
+                        at_bound = at_bound or reached
+                        if group_front is not None and complete:
+                            # Scored from the raw rects; only the survivors are built into sheets
+                            estimate_start = time.time()
+                            group_front.add(Candidate(
+                                (pattern_count + len(bin_sizes), total_sheet_area - used_area,
+                                 self.estimate_cut_length(rects), algo_time),
+                                solution=(rects, bin_sizes, sorted_pieces), algorithm=algo_name, sort_method=sort_name))
+                            pareto_seconds += time.time() - estimate_start
+                        if at_bound and group_front is None:
+                            break
+                    except Exception as e:
+                        print(f"Algorithm {algo_name} failed: {e}")
+                        continue
+            if best_solution is None and all_pieces:
+                raise PackingError("Неуспешно опаковане на частите")
+            if not all_pieces:
+                at_bound = True
+                best_algorithm = "Repeated Pattern"
+                best_sort = ""
+            group_sheets = self.build_sheets(best_solution, material, thickness, best_algorithm, best_sort)
+            if not at_bound:
+                # The global pass only replaces the plan if it places every piece on no more sheets
+                optimized = self.global_optimization(group_sheets)
+                if (len(optimized) <= len(group_sheets) and
+                        sum(len(sheet.batch) for sheet in optimized) == sum(len(sheet.batch) for sheet in group_sheets)):
+                    group_sheets = optimized
+            # The exact search only runs where a proof is plausible: one sheet above the bound, few
+            # distinct sheet contents, and some of the exact-solver budget of this call left
+            if (not at_bound and len(all_pieces) <= EXACT['MAX_PIECES'] and
+                    pattern_count + len(group_sheets) - bounds['lower_bound'] <= EXACT['MAX_GAP'] and
+                    search_size([(p['width'] + 10, p['height'] + 10) for p in all_pieces]) <= EXACT['MAX_SEARCH_SIZE']):
+                time_left = min(300 - (time.time() - start_time), EXACT['TOTAL_TIME'] - exact_seconds)
+                if time_left > 0:
+                    exact_start = time.time()
+                    progress_callback((f"Търсене на точно решение за {len(all_pieces)} части...",
+                                       processed_parts / total_parts * 100))
+                    group_sheets, exact_bounds = self.exact_plan(all_pieces, group_sheets, bounds, material, thickness,
+                                                                 min(EXACT['TIME_LIMIT'], time_left))
+                    exact_seconds += time.time() - exact_start
+                    # A proof for the leftover pieces says nothing about the repeated patterns
+                    if not pattern_sheets:
+                        bounds = exact_bounds
+            group_sheets = pattern_sheets + self.merge_repeated(group_sheets)
+            self.add_cut_stats(group_sheets)
+            group_count = sum(sheet.repeat for sheet in group_sheets)
+            gap = optimality_gap(group_count, bounds['lower_bound'])
+            group_stats[group_key] = dict(bounds, sheets=group_count, patterns=len(group_sheets),
+                                          optimality_gap=gap, algorithm=best_algorithm, sort_method=best_sort,
+                                          seconds=time.time() - group_start)
+            for sheet in group_sheets:
+                sheet.efficiency['lower_bound'] = bounds['lower_bound']
+                sheet.efficiency['optimality_gap'] = gap
+            if group_front is not None:
+                fronts[group_key] = self.pareto_front(group_front, best_solution, group_sheets, pattern_sheets,
+                                                      material, thickness,
+                                                      time.time() - group_start - pareto_seconds,
+                                                      bounds['lower_bound'])
+            processed_parts += group_pieces
+            progress_value = processed_parts / total_parts * 100
+            gap_text = "оптимално" if gap == 0 else f"до {gap:.0%} над минимума"
+            progress_callback((f"Опаковани {group_pieces} части (Алгоритъм: {best_algorithm}, Сортиране: {best_sort}, "
+                               f"{group_count} листа, {gap_text})", progress_value))
+            yield from group_sheets
+
+    def build_sheets(self, solution, material, thickness, algorithm, sort_method) -> List[Sheet]:
+        sheets = []
+        placements_by_bin = self.materialize(*solution) if solution else {}
+        for bin_id, sheet_data in placements_by_bin.items():
+            sheet_size = sheet_data['sheet_size']
+            placements = sheet_data['placements']
+            used_area = sheet_data['used_area']
+            sheet_area = sheet_size[0] * sheet_size[1]
+            utilization = used_area / sheet_area if sheet_area > 0 else 0
+            efficiency = self.calculate_sheet_efficiency(sheet_size, placements)
+            sheets.append(Sheet(
+                size=sheet_size,
+                material=material,
+                thickness=thickness,
+                placements=placements,
+                algorithm=algorithm,
+                sort_method=sort_method,
+                utilization=utilization,
+                efficiency=efficiency
+            ))
+        return sheets
+
+    def estimate_cut_length(self, rects) -> float:
+        # Cut length of the spaced rects per bin; blocks count as one rect, which is the same for every candidate
+        by_bin = {}
+        for b, x, y, w, h, _ in rects:
+            by_bin.setdefault(b, []).append((x, y, w, h))
+        return sum(cut.length for bin_rects in by_bin.values() for cut in rect_cuts(bin_rects))
+
+    def pareto_front(self, front, best_solution, group_sheets, pattern_sheets, material, thickness, seconds,
+                     lower_bound) -> List[Candidate]:
+        """
+        Build the sheets of the candidates on a group front and prune them again on the real values.
+
+        The finished plan of the group is always kept, marked default.
+        """
+        default = Candidate(sheet_values(group_sheets, seconds), sheets=group_sheets,
+                            algorithm=group_sheets[0].algorithm if group_sheets else "",
+                            sort_method=group_sheets[0].sort_method if group_sheets else "")
+        default.default = True
+        result = ParetoFront(PARETO['MAX_GROUP_FRONT'])
+        result.add(default)
+        for candidate in front:
+            if best_solution is not None and candidate.solution[0] is best_solution[0]:
+                continue
+            sheets = self.merge_repeated(self.build_sheets(candidate.solution, material, thickness,
+                                                           candidate.algorithm, candidate.sort_method))
+            self.add_cut_stats(sheets)
+            count = sum(sheet.repeat for sheet in pattern_sheets + sheets)
+            for sheet in sheets:
+                sheet.efficiency['lower_bound'] = lower_bound
+                sheet.efficiency['optimality_gap'] = optimality_gap(count, lower_bound)
+            candidate.sheets = pattern_sheets + sheets
+            candidate.values = sheet_values(candidate.sheets, candidate.seconds)
+            candidate.solution = None
+            result.add(candidate)
+        return result.sorted()
+
+    def cluster_small_pieces(self, pieces):
+        """
+        Replace small pieces by shelf-packed composite blocks.
+
+        A block is a piece dict whose size already includes the spacing of
+        its members, less the 10 mm the packer adds to every rect; its
+        ``members`` hold each piece with its offset and orientation inside
+        the block. Large pieces are returned unchanged.
+        """
+        if len(pieces) < CLUSTER['MIN_PIECES']:
+            return pieces
+        min_width = min(size[0] for size in self.sheet_sizes) - 20
+        min_height = min(size[1] for size in self.sheet_sizes) - 20
+        small_area = min_width * min_height * CLUSTER['SMALL_RATIO']
+        block_width = min_width * CLUSTER['BLOCK_RATIO']
+        block_height = min_height * CLUSTER['BLOCK_RATIO']
+        items = []
+        small = []
+        for piece in pieces:
+            pw, ph = piece['width'] + 10, piece['height'] + 10
+            if pw * ph <= small_area and max(pw, ph) <= block_width and min(pw, ph) <= block_height:
+                small.append(piece)
+            else:
+                items.append(piece)
+        if len(small) < 2:
+            return pieces
+        # Laid flat (long side along the shelf), tallest shelves first
+        small.sort(key=lambda p: (min(p['width'], p['height']), max(p['width'], p['height'])), reverse=True)
+        members = []
+        shelf_x = shelf_y = shelf_height = used_width = 0
+
+        def close_block():
+            if len(members) == 1:
+                items.append(members[0][0])
+            elif members:
+                width, height = used_width, shelf_y + shelf_height
+                items.append({
+                    'width': width - 10,
+                    'height': height - 10,
+                    'ref': None,
+                    'part_id': None,
+                    'original_width': width - 10,
+                    'original_height': height - 10,
+                    'area': sum(member[0]['area'] for member in members),
+                    'members': list(members)
+                })
+            members.clear()
+
+        for piece in small:
+            rotated = piece['width'] < piece['height']
+            pw = max(piece['width'], piece['height']) + 10
+            ph = min(piece['width'], piece['height']) + 10
+            if shelf_x + pw > block_width:
+                shelf_y += shelf_height
+                shelf_x = shelf_height = 0
+            if shelf_y + ph > block_height:
+                close_block()
+                shelf_x = shelf_y = shelf_height = used_width = 0
+            members.append((piece, shelf_x, shelf_y, rotated))
+            shelf_x += pw
+            shelf_height = max(shelf_height, ph)
+            used_width = max(used_width, shelf_x)
+        close_block()
+        return items
+
+    def materialize(self, rects, bin_sizes, pieces):
+        placements_by_bin = {}
+        for b, x, y, w, h, rid in rects:
+            piece = pieces[rid]
+            if b not in placements_by_bin:
+                placements_by_bin[b] = {
+                    'sheet_size': bin_sizes[b],
+                    'placements': PlacementBatch(),
+                    'used_area': 0
+                }
+            rotated = False
+            if (math.isclose(w, piece['width'] + 10, abs_tol=0.1) and
+                math.isclose(h, piece['height'] + 10, abs_tol=0.1)):
+                pass
+            elif (math.isclose(h, piece['width'] + 10, abs_tol=0.1) and
+                  math.isclose(w, piece['height'] + 10, abs_tol=0.1)):
+                rotated = True
+            else:
+                rotated = not (w == piece['original_width'] + 10)
+            if 'members' in piece:
+                self.expand_block(placements_by_bin[b], piece, x, y, rotated)
+                continue
+            placements_by_bin[b]['placements'].append(
+                piece['part_id'],
+                piece['ref'],
+                10 + x + 5,
+                10 + y + 5,
+                rotated,
+                piece['original_width'],
+                piece['original_height'],
+                10 + x,
+                10 + y,
+                w,
+                h
+            )
+            placements_by_bin[b]['used_area'] += piece['original_width'] * piece['original_height']
+        return placements_by_bin
+
+    def expand_block(self, sheet_data, block, x, y, rotated):
+        # A rotated block is the block transposed, which keeps its members apart
+        for piece, dx, dy, member_rotated in block['members']:
+            pw = (piece['height'] if member_rotated else piece['width']) + 10
+            ph = (piece['width'] if member_rotated else piece['height']) + 10
+            if rotated:
+                dx, dy, pw, ph = dy, dx, ph, pw
+            sheet_data['placements'].append(
+                piece['part_id'], piece['ref'], 10 + x + dx + 5, 10 + y + dy + 5, member_rotated != rotated,
+                piece['original_width'], piece['original_height'], 10 + x + dx, 10 + y + dy, pw, ph
+            )
+            sheet_data['used_area'] += piece['area']
+
+    def repeated_patterns(self, group_parts: List[Part], material: str, thickness: float):
+        """
+        Sheets filled with a single part, each repeated as often as the quantity allows.
+
+        Returns the pattern sheets and the quantity of every part that is
+        left for the regular packing.
+        """
+        remaining = {part.id: 0 for part in group_parts}
+        pattern_sheets = []
+        for part in group_parts:
+            remaining[part.id] += part.qty
+            if part.qty < PATTERNS['MIN_QTY']:
+                continue
+            pattern = self.single_part_pattern(part)
+            if pattern is None:
+                continue
+            sheet_size, placements = pattern
+            per_sheet = len(placements)
+            repeat = remaining[part.id] // per_sheet
+            if repeat < PATTERNS['MIN_REPEAT']:
+                continue
+            remaining[part.id] -= repeat * per_sheet
+            sheet_area = sheet_size[0] * sheet_size[1]
+            pattern_sheets.append(Sheet(
+                size=sheet_size,
+                material=material,
+                thickness=thickness,
+                placements=placements,
+                algorithm="Repeated Pattern",
+                sort_method="",
+                utilization=placements.used_area() / sheet_area,
+                efficiency=self.calculate_sheet_efficiency(sheet_size, placements),
+                repeat=repeat
+            ))
+        return pattern_sheets, remaining
+
+    def single_part_pattern(self, part: Part):
+        # The sheet size and algorithm that fit the most copies per unit of sheet area win
+        best = None
+        best_density = 0
+        piece_w, piece_h = part.width + 10, part.height + 10
+        for sheet_size in self.sheet_sizes:
+            eff_width = sheet_size[0] - 20
+            eff_height = sheet_size[1] - 20
+            capacity = int(eff_width * eff_height // (piece_w * piece_h))
+            if capacity < 1:
+                continue
+            for algo, algo_name in self.algorithms:
+                packer = newPacker(rotation=True, pack_algo=algo)
+                packer.add_bin(eff_width, eff_height, bid=sheet_size)
+                for idx in range(capacity):
+                    packer.add_rect(piece_w, piece_h, rid=idx)
+                packer.pack()
+                rects = packer.rect_list()
+                density = len(rects) / (sheet_size[0] * sheet_size[1])
+                if rects and density > best_density:
+                    best_density = density
+                    placements = PlacementBatch()
+                    for _, x, y, w, h, _ in rects:
+                        rotated = not math.isclose(w, piece_w, abs_tol=0.1) or not math.isclose(h, piece_h, abs_tol=0.1)
+                        placements.append(part.id, part.ref, 10 + x + 5, 10 + y + 5, rotated,
+                                          part.width, part.height, 10 + x, 10 + y, w, h)
+                    best = (sheet_size, placements)
+        return best
+
+    def merge_repeated(self, sheets: List[Sheet]) -> List[Sheet]:
+        # Sheets with the same size and the same parts in the same places become one pattern
+        merged = {}
+        for sheet in sheets:
+            batch = sheet.batch
+            key = (sheet.size, tuple(sorted(zip(batch.part_ids, batch.xs, batch.ys, batch.rotated))))
+            if key in merged:
+                merged[key].repeat += sheet.repeat
+            else:
+                merged[key] = sheet
+        return list(merged.values())
+
+    def exact_plan(self, pieces, group_sheets, bounds, material, thickness, time_limit):
+        # Each sheet size is tried on its own for a plan with less total sheet
+        # area than the current one; smaller sizes first
+        padded = [(p['width'] + 10, p['height'] + 10) for p in pieces]
+        best_area = sum(sheet.size[0] * sheet.size[1] for sheet in group_sheets)
+        deadline = time.time() + time_limit
+        proven = True
+        for sheet_size in sorted(self.sheet_sizes, key=lambda size: size[0] * size[1]):
+            time_left = deadline - time.time()
+            if time_left <= 0:
+                proven = False
+                break
+            bin_width, bin_height = sheet_size[0] - 20, sheet_size[1] - 20
+            sheet_area = sheet_size[0] * sheet_size[1]
+            upper = math.ceil(best_area / sheet_area)
+            lower = group_bounds(padded, bin_width, bin_height)['lower_bound']
+            if lower >= upper:
+                continue
+            solution, size_proven = solve_exact(padded, bin_width, bin_height, lower, upper, time_left,
+                                                EXACT['SHEET_NODES'])
+            proven = proven and size_proven
+            if solution is None:
+                continue
+            best_area = len(solution) * sheet_area
+            group_sheets = []
+            for layout in solution:
+                placements = PlacementBatch()
+                for index, x, y, rotated in layout:
+                    piece = pieces[index]
+                    w, h = padded[index]
+                    if rotated:
+                        w, h = h, w
+                    placements.append(
+                        piece['part_id'], piece['ref'], 10 + x + 5, 10 + y + 5, rotated,
+                        piece['original_width'], piece['original_height'], 10 + x, 10 + y, w, h
+                    )
+                group_sheets.append(Sheet(
+                    size=sheet_size,
+                    material=material,
+                    thickness=thickness,
+                    placements=placements,
+                    algorithm="Exact Branch-and-Bound",
+                    sort_method="Площ (намаляващ)",
+                    utilization=placements.used_area() / sheet_area,
+                    efficiency=self.calculate_sheet_efficiency(sheet_size, placements)
+                ))
+        # With a single sheet size a finished search proves the sheet count optimal
+        if proven and len(self.sheet_sizes) == 1:
+            bounds = dict(bounds, lower_bound=len(group_sheets), exact=len(group_sheets))
+        return group_sheets, bounds
 
     def global_optimization(self, sheets: List[Sheet]):
         if not sheets:
@@ -224,13 +554,14 @@ class PackingEngine:
         import math
         all_parts = []
         for sheet in sheets:
-            all_parts.extend(sheet.placements)
-        all_parts.sort(key=lambda p: p.width * p.height, reverse=True)
+            batch = sheet.batch
+            all_parts.extend(zip(batch.part_ids, batch.refs, batch.widths, batch.heights, batch.rotated))
+        all_parts.sort(key=lambda p: p[2] * p[3], reverse=True)
         material = sheets[0].material
         thickness = sheets[0].thickness
         optimized_sheets = []
         packer = newPacker(rotation=True, pack_algo=MaxRectsBaf)
-        total_piece_area = sum(p.width * p.height for p in all_parts)
+        total_piece_area = sum(p[2] * p[3] for p in all_parts)
         for sheet_size in self.sheet_sizes:
             eff_width = sheet_size[0] - 20
             eff_height = sheet_size[1] - 20
@@ -239,47 +570,33 @@ class PackingEngine:
             for _ in range(min_for_size):
                 packer.add_bin(eff_width, eff_height, bid=sheet_size)
         for idx, part in enumerate(all_parts):
-            packer.add_rect(part.width + 10, part.height + 10, rid=idx)
+            packer.add_rect(part[2] + 10, part[3] + 10, rid=idx)
         packer.pack()
         placements_by_bin = {}
         for rect in packer.rect_list():
             b, x, y, w, h, rid = rect
-            piece = all_parts[rid]
+            part_id, ref, width, height, piece_rotated = all_parts[rid]
             sheet_size = packer[b].bid
             if b not in placements_by_bin:
                 placements_by_bin[b] = {
                     'sheet_size': sheet_size,
-                    'placements': [],
+                    'placements': PlacementBatch(),
                     'used_area': 0
                 }
             rotated = False
-            if (math.isclose(w, piece.width + 10, abs_tol=0.1) and 
-                math.isclose(h, piece.height + 10, abs_tol=0.1)):
+            if (math.isclose(w, width + 10, abs_tol=0.1) and 
+                math.isclose(h, height + 10, abs_tol=0.1)):
                 pass
-            elif (math.isclose(h, piece.width + 10, abs_tol=0.1) and 
-                  math.isclose(w, piece.height + 10, abs_tol=0.1)):
+            elif (math.isclose(h, width + 10, abs_tol=0.1) and 
+                  math.isclose(w, height + 10, abs_tol=0.1)):
                 rotated = True
             else:
-                rotated = piece.rotated
-            part_x = 10 + x + 5
-            part_y = 10 + y + 5
-            placement = Placement(
-                part_id=piece.part_id,
-                ref=piece.ref,
-                x=part_x,
-                y=part_y,
-                rotated=rotated,
-                width=piece.width,
-                height=piece.height,
-                spacing={
-                    'x': 10 + x,
-                    'y': 10 + y,
-                    'width': w,
-                    'height': h
-                }
+                rotated = bool(piece_rotated)
+            placements_by_bin[b]['placements'].append(
+                part_id, ref, 10 + x + 5, 10 + y + 5, rotated, width, height,
+                10 + x, 10 + y, w, h
             )
-            placements_by_bin[b]['placements'].append(placement)
-            placements_by_bin[b]['used_area'] += piece.width * piece.height
+            placements_by_bin[b]['used_area'] += width * height
         for bin_id, sheet_data in placements_by_bin.items():
             sheet_size = sheet_data['sheet_size']
             placements = sheet_data['placements']
@@ -299,97 +616,13 @@ class PackingEngine:
             ))
         return optimized_sheets
 
-    def optimize_sheet(self, placements, sheet_w, sheet_h):
-        try:
-            parts = []
-            for p in placements:
-                parts.append({
-                    'part_id': p['part_id'],
-                    'width': p['width'],
-                    'height': p['height'],
-                    'ref': p['ref'],
-                    'rotated': p['rotated'],
-                    'x': p.get('x', 0),
-                    'y': p.get('y', 0)
-                })
-            parts.sort(key=lambda p: p['width'] * p['height'], reverse=True)
-            optimized_placements = []
-            placed_positions = []
-            for part in parts:
-                placed = False
-                for x in range(0, sheet_w - int(part['width']), 10):
-                    for y in range(0, sheet_h - int(part['height']), 10):
-                        if self.can_place(part, x, y, placed_positions):
-                            optimized_placements.append({
-                                'part_id': part['part_id'],
-                                'ref': part['ref'],
-                                'x': x,
-                                'y': y,
-                                'width': part['width'],
-                                'height': part['height'],
-                                'rotated': False
-                            })
-                            placed_positions.append((x, y, x + part['width'], y + part['height']))
-                            placed = True
-                            break
-                    if placed:
-                        break
-                if not placed and part['width'] != part['height']:
-                    for x in range(0, sheet_w - int(part['height']), 10):
-                        for y in range(0, sheet_h - int(part['width']), 10):
-                            if self.can_place(part, x, y, placed_positions, rotated=True):
-                                optimized_placements.append({
-                                    'part_id': part['part_id'],
-                                    'ref': part['ref'],
-                                    'x': x,
-                                    'y': y,
-                                    'width': part['height'],
-                                    'height': part['width'],
-                                    'rotated': True
-                                })
-                                placed_positions.append((x, y, x + part['height'], y + part['width']))
-                                placed = True
-                                break
-                        if placed:
-                            break
-                if not placed:
-                    optimized_placements.append({
-                        'part_id': part['part_id'],
-                        'ref': part['ref'],
-                        'x': part['x'],
-                        'y': part['y'],
-                        'width': part['width'],
-                        'height': part['height'],
-                        'rotated': part['rotated']
-                    })
-            return optimized_placements
-        except Exception as e:
-            print(f"Optimization failed: {e}")
-            return None
-
-    def can_place(self, part, x, y, placed_positions, rotated=False):
-        if rotated:
-            w, h = part['height'], part['width']
-        else:
-            w, h = part['width'], part['height']
-        new_rect = (x, y, x + w, y + h)
-        for rect in placed_positions:
-            if self.rect_overlap(new_rect, rect):
-                return False
-        if x < 0 or y < 0 or (x + w) > 2000 or (y + h) > 1000:
-            return False
-        return True
-
-    def rect_overlap(self, r1, r2):
-        return not (r1[2] < r2[0] or 
-                   r1[0] > r2[2] or 
-                   r1[3] < r2[1] or 
-                   r1[1] > r2[3])
-
     def calculate_sheet_efficiency(self, sheet_size, placements):
         w, h = sheet_size
         sheet_area = w * h
-        used_area = sum(p.width * p.height for p in placements)
+        if isinstance(placements, PlacementBatch):
+            used_area = placements.used_area()
+        else:
+            used_area = sum(p.width * p.height for p in placements)
         waste_area = sheet_area - used_area
         waste_percent = waste_area / sheet_area
         coverage = used_area / sheet_area
@@ -403,3 +636,11 @@ class PackingEngine:
             'density': density,
             'efficiency': efficiency
         }
+
+    def add_cut_stats(self, sheets: List[Sheet]):
+        # Cut count, cut and travel length, rotations and the estimated machine time in seconds.
+        # Sequencing is the costly part, so it only runs for sheets that are kept, once per pattern.
+        for sheet in sheets:
+            if 'machine_time' not in sheet.efficiency:
+                _, cut_stats = plan_cuts(sheet.batch)
+                sheet.efficiency.update(cut_stats)
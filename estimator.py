@@ -0,0 +1,214 @@
+"""
+Fast sheet-count estimate for the sheet cutting app.
+
+The estimator keeps running totals per (material, thickness) group, so the
+lower bounds are updated in constant time as parts are added or removed.
+The L2 bound and a quick shelf pack, which gives an achievable sheet count,
+are only re-run for groups that changed since the last estimate. The geometry matches
+PackingEngine: a 10 mm border around the usable area and 10 mm of spacing
+added to every piece.
+"""
+from typing import List, Dict, Tuple, Optional, Hashable
+from models.part import Part
+from packing.bounds import l2_bound
+import math
+import threading
+
+class GroupEstimate:
+    __slots__ = ('material', 'thickness', 'pieces', 'part_area', 'area_bound', 'large_bound', 'l2_bound',
+                 'heuristic_sheets', 'oversized')
+
+    def __init__(self, material: str, thickness: float, pieces: int, part_area: float, area_bound: int,
+                 large_bound: int, l2_bound: int, heuristic_sheets: int, oversized: int):
+        self.material = material
+        self.thickness = thickness
+        self.pieces = pieces
+        self.part_area = part_area
+        self.area_bound = area_bound
+        self.large_bound = large_bound
+        self.l2_bound = l2_bound
+        self.heuristic_sheets = heuristic_sheets
+        self.oversized = oversized
+
+    @property
+    def lower_bound(self) -> int:
+        return max(self.area_bound, self.large_bound, self.l2_bound)
+
+class _Group:
+    __slots__ = ('parts', 'padded_area', 'part_area', 'large', 'oversized', 'pieces', 'result', 'l2', 'version')
+
+    def __init__(self):
+        self.parts: Dict[Hashable, Part] = {}
+        self.padded_area = 0.0
+        self.part_area = 0.0
+        self.large = 0
+        self.oversized = 0
+        self.pieces = 0
+        self.result: Optional[int] = None
+        self.l2 = 0
+        self.version = 0
+
+def shelf_pack(pieces: List[Tuple[float, float]], bin_width: float, bin_height: float) -> int:
+    """
+    First-fit decreasing height shelf packing; returns the number of bins used.
+
+    Each piece is laid flat (shorter side as height) when it fits that way.
+    Pieces that fit in no orientation are skipped.
+    """
+    oriented = []
+    for w, h in pieces:
+        if max(w, h) <= bin_width and min(w, h) <= bin_height:
+            oriented.append((max(w, h), min(w, h)))
+        elif w <= bin_width and h <= bin_height:
+            oriented.append((w, h))
+        elif h <= bin_width and w <= bin_height:
+            oriented.append((h, w))
+    oriented.sort(key=lambda piece: piece[1], reverse=True)
+    # shelves: [bin index, remaining width]; bins: remaining height
+    shelves: List[List[float]] = []
+    bins: List[float] = []
+    for w, h in oriented:
+        for shelf in shelves:
+            if shelf[1] >= w:
+                shelf[1] -= w
+                break
+        else:
+            for index, remaining in enumerate(bins):
+                if remaining >= h:
+                    bins[index] -= h
+                    shelves.append([index, bin_width - w])
+                    break
+            else:
+                bins.append(bin_height - h)
+                shelves.append([len(bins) - 1, bin_width - w])
+    return len(bins)
+
+class UtilizationEstimator:
+    def __init__(self, sheet_size: Tuple[float, float]):
+        self.groups: Dict[Tuple[str, float], _Group] = {}
+        self.keys: Dict[Hashable, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.set_sheet_size(sheet_size)
+
+    def set_sheet_size(self, sheet_size: Tuple[float, float]):
+        with self._lock:
+            self.sheet_size = sheet_size
+            self.bin_width = sheet_size[0] - 20
+            self.bin_height = sheet_size[1] - 20
+            parts = [(key, group.parts[key]) for group in self.groups.values() for key in group.parts]
+            self.groups.clear()
+            self.keys.clear()
+            for key, part in parts:
+                self._add(key, part)
+
+    def _classify(self, part: Part) -> Tuple[bool, bool]:
+        w, h = part.width + 10, part.height + 10
+        W, H = self.bin_width, self.bin_height
+        orientations = [(a, b) for a, b in ((w, h), (h, w)) if a <= W and b <= H]
+        if not orientations:
+            return False, True
+        # Two pieces that are more than half the sheet in both directions in
+        # every orientation can never share a sheet
+        large = all(a > W / 2 and b > H / 2 for a, b in orientations)
+        return large, False
+
+    def _add(self, key: Hashable, part: Part):
+        group_key = (part.material, part.thickness)
+        group = self.groups.get(group_key)
+        if group is None:
+            group = self.groups[group_key] = _Group()
+        large, oversized = self._classify(part)
+        group.parts[key] = part
+        group.pieces += part.qty
+        group.part_area += part.width * part.height * part.qty
+        if oversized:
+            group.oversized += part.qty
+        else:
+            group.padded_area += (part.width + 10) * (part.height + 10) * part.qty
+            if large:
+                group.large += part.qty
+        group.result = None
+        group.version += 1
+        self.keys[key] = group_key
+
+    def _remove(self, key: Hashable):
+        group_key = self.keys.pop(key, None)
+        if group_key is None:
+            return
+        group = self.groups[group_key]
+        part = group.parts.pop(key)
+        if not group.parts:
+            del self.groups[group_key]
+            return
+        large, oversized = self._classify(part)
+        group.pieces -= part.qty
+        group.part_area -= part.width * part.height * part.qty
+        if oversized:
+            group.oversized -= part.qty
+        else:
+            group.padded_area -= (part.width + 10) * (part.height + 10) * part.qty
+            if large:
+                group.large -= part.qty
+        group.result = None
+        group.version += 1
+
+    def add(self, key: Hashable, part: Part):
+        with self._lock:
+            self._remove(key)
+            self._add(key, part)
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.groups.clear()
+            self.keys.clear()
+
+    def estimate(self) -> List[GroupEstimate]:
+        """
+        Bounds and heuristic sheet count for every group.
+
+        Only groups changed since the last call are re-packed; the pack runs
+        outside the lock so edits are never blocked by it.
+        """
+        with self._lock:
+            size = (self.bin_width, self.bin_height)
+            dirty = [
+                (group, group.version, [(p.width + 10, p.height + 10) for p in group.parts.values() for _ in range(p.qty)])
+                for group in self.groups.values() if group.result is None
+            ]
+        for group, version, pieces in dirty:
+            result = shelf_pack(pieces, *size)
+            l2 = l2_bound(pieces, *size)
+            with self._lock:
+                # Discard the result if the group was edited while packing
+                if group.version == version:
+                    group.result = result
+                    group.l2 = l2
+        with self._lock:
+            bin_area = self.bin_width * self.bin_height
+            estimates = []
+            for (material, thickness), group in self.groups.items():
+                area_bound = math.ceil(group.padded_area / bin_area - 1e-9) if bin_area > 0 else 0
+                heuristic = group.result if group.result is not None else max(area_bound, group.large, group.l2)
+                estimates.append(GroupEstimate(material, thickness, group.pieces, group.part_area, area_bound,
+                                               group.large, group.l2, heuristic, group.oversized))
+            return estimates
+
+    def summary(self) -> Dict[str, float]:
+        estimates = self.estimate()
+        sheet_area = self.sheet_size[0] * self.sheet_size[1]
+        lower = sum(e.lower_bound for e in estimates)
+        sheets = sum(max(e.heuristic_sheets, e.lower_bound) for e in estimates)
+        part_area = sum(e.part_area for e in estimates)
+        return {
+            'sheet_size': self.sheet_size,
+            'groups': len(estimates),
+            'lower_bound': lower,
+            'sheets': sheets,
+            'utilization': part_area / (sheets * sheet_area) if sheets and sheet_area else 0.0,
+            'max_utilization': part_area / (lower * sheet_area) if lower and sheet_area else 0.0,
+            'oversized': sum(e.oversized for e in estimates)
+        }
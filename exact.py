@@ -0,0 +1,326 @@
+"""
+Exact sheet-count minimization for small groups of pieces.
+
+Pieces are assigned to sheets by branch-and-bound; every partial sheet is
+checked with an exact single-sheet search that places pieces only at the
+corner points of the envelope of the pieces already placed (Martello–Vigo).
+Both levels break symmetry by treating identical pieces and identical
+sheets as interchangeable, and memoize the subproblems they have solved.
+Pieces and bins are given as (width, height) with spacing and borders
+already applied; pieces may be rotated by 90 degrees.
+"""
+from typing import List, Tuple, Dict, Optional
+from packing.bounds import l2_bound
+import time
+
+class SolverTimeout(Exception):
+    pass
+
+class _Undecided(Exception):
+    pass
+
+# (x, y, rotated) for each piece placed on a sheet, by type index
+Layout = List[Tuple[int, float, float, bool]]
+
+class _SheetPacker:
+    def __init__(self, types: List[Tuple[float, float]], bin_width: float, bin_height: float, deadline: float,
+                 node_limit: int):
+        self.types = types
+        self.min_sides = [min(w, h) for w, h in types]
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.deadline = deadline
+        self.layouts: Dict[Tuple[int, ...], Optional[Layout]] = {}
+        self.failed = set()
+        self.nodes = 0
+        self.node_limit = node_limit
+        self.search_nodes = 0
+        # Set once a sheet was given up on, so infeasibility is no longer proven
+        self.incomplete = False
+
+    def check_time(self):
+        self.nodes += 1
+        if self.nodes & 0x3ff == 0 and time.monotonic() > self.deadline:
+            raise SolverTimeout()
+
+    def layout(self, counts: Tuple[int, ...], parent: Optional[Tuple[int, ...]] = None) -> Optional[Layout]:
+        """
+        Layout of one sheet holding ``counts`` pieces of each type, or None.
+
+        ``parent`` is the same sheet with one piece fewer; its layout is
+        extended first, which settles most feasible sheets without a search.
+        """
+        if counts not in self.layouts:
+            area = sum(self.types[t][0] * self.types[t][1] * n for t, n in enumerate(counts))
+            pieces = [self.types[t] for t, n in enumerate(counts) for _ in range(n)]
+            if area > self.bin_width * self.bin_height or l2_bound(pieces, self.bin_width, self.bin_height) > 1:
+                self.layouts[counts] = None
+            else:
+                layout = self.extend(parent, counts) or self.greedy(counts)
+                if layout is None:
+                    self.search_nodes = 0
+                    try:
+                        layout = self.search((), counts, area)
+                    except _Undecided:
+                        # Treated as infeasible; the plan stays valid but is no longer proven optimal
+                        self.incomplete = True
+                self.layouts[counts] = layout
+        return self.layouts[counts]
+
+    def extend(self, parent: Optional[Tuple[int, ...]], counts: Tuple[int, ...]) -> Optional[Layout]:
+        base = self.layouts.get(parent) if parent is not None else None
+        if base is None:
+            return None
+        t = next(t for t, (a, b) in enumerate(zip(counts, parent)) if a != b)
+        envelope = ()
+        for placed, x, y, rotated in base:
+            w, h = self.types[placed]
+            if rotated:
+                w, h = h, w
+            envelope = self.add(envelope, x + w, y + h)
+        w, h = self.types[t]
+        for x, y in self.corner_points(envelope):
+            for rotated, (pw, ph) in ((False, (w, h)), (True, (h, w))):
+                if x + pw <= self.bin_width + 1e-6 and y + ph <= self.bin_height + 1e-6:
+                    return base + [(t, x, y, rotated)]
+        return None
+
+    def greedy(self, counts: Tuple[int, ...]) -> Optional[Layout]:
+        # Quick corner-point fills in a few piece orders before the exhaustive search
+        pieces = [t for t, n in enumerate(counts) for _ in range(n)]
+        orders = (
+            pieces,
+            sorted(pieces, key=lambda t: max(self.types[t]), reverse=True),
+            sorted(pieces, key=lambda t: self.min_sides[t], reverse=True)
+        )
+        for order in orders:
+            for point_key in (lambda p: (p[1], p[0]), lambda p: (p[0], p[1])):
+                envelope = ()
+                layout = []
+                for t in order:
+                    w, h = self.types[t]
+                    for x, y in sorted(self.corner_points(envelope), key=point_key):
+                        fitting = [(rotated, pw, ph) for rotated, (pw, ph) in ((False, (w, h)), (True, (h, w)))
+                                   if x + pw <= self.bin_width + 1e-6 and y + ph <= self.bin_height + 1e-6]
+                        if fitting:
+                            rotated, pw, ph = fitting[0]
+                            layout.append((t, x, y, rotated))
+                            envelope = self.add(envelope, x + pw, y + ph)
+                            break
+                    else:
+                        break
+                else:
+                    return layout
+        return None
+
+    def search(self, envelope: Tuple[Tuple[float, float], ...], counts: Tuple[int, ...], remaining_area: float) -> Optional[Layout]:
+        if remaining_area <= 0:
+            return []
+        key = (envelope, counts)
+        if key in self.failed:
+            return None
+        self.check_time()
+        self.search_nodes += 1
+        if self.search_nodes > self.node_limit:
+            raise _Undecided()
+        if remaining_area > self.bin_width * self.bin_height - self.lost_area(envelope, counts) + 1e-6:
+            self.failed.add(key)
+            return None
+        points = self.corner_points(envelope)
+        for t, n in enumerate(counts):
+            if not n:
+                continue
+            w, h = self.types[t]
+            for x, y in points:
+                for rotated, (pw, ph) in ((False, (w, h)), (True, (h, w))):
+                    if rotated and w == h:
+                        continue
+                    if x + pw > self.bin_width + 1e-6 or y + ph > self.bin_height + 1e-6:
+                        continue
+                    rest = counts[:t] + (n - 1,) + counts[t + 1:]
+                    result = self.search(self.add(envelope, x + pw, y + ph), rest, remaining_area - w * h)
+                    if result is not None:
+                        return [(t, x, y, rotated)] + result
+        self.failed.add(key)
+        return None
+
+    def lost_area(self, envelope: Tuple[Tuple[float, float], ...], counts: Tuple[int, ...]) -> float:
+        """
+        Area under the envelope plus free area no remaining piece can reach.
+
+        A piece covering free space in the band between two steps has to
+        start right of the lower step, so a band narrower than every
+        remaining piece is waste; the same holds for the column strips above
+        the steps. The bands and the strips overlap, so only the larger
+        waste of the two is counted.
+        """
+        smallest = min(side for side, n in zip(self.min_sides, counts) if n)
+        covered = 0.0
+        band_waste = 0.0
+        strip_waste = 0.0
+        previous_right = 0.0
+        for index, (right, top) in enumerate(envelope):
+            covered += (right - previous_right) * top
+            lower = envelope[index + 1][1] if index + 1 < len(envelope) else 0.0
+            if self.bin_width - right < smallest:
+                band_waste += (self.bin_width - right) * (top - lower)
+            if self.bin_height - top < smallest:
+                strip_waste += (right - previous_right) * (self.bin_height - top)
+            previous_right = right
+        return covered + max(band_waste, strip_waste)
+
+    @staticmethod
+    def corner_points(envelope: Tuple[Tuple[float, float], ...]) -> List[Tuple[float, float]]:
+        if not envelope:
+            return [(0.0, 0.0)]
+        points = [(0.0, envelope[0][1])]
+        for (right, _), (_, top) in zip(envelope, envelope[1:]):
+            points.append((right, top))
+        points.append((envelope[-1][0], 0.0))
+        return points
+
+    @staticmethod
+    def add(envelope: Tuple[Tuple[float, float], ...], right: float, top: float) -> Tuple[Tuple[float, float], ...]:
+        # The envelope is the staircase of (right edge, top edge) pairs with
+        # rights increasing and tops decreasing
+        steps = sorted(envelope + ((right, top),), key=lambda step: (-step[1], -step[0]))
+        staircase = []
+        reach = 0.0
+        for step_right, step_top in steps:
+            if step_right > reach:
+                staircase.append((step_right, step_top))
+                reach = step_right
+        return tuple(staircase)
+
+class ExactSolver:
+    def __init__(self, pieces: List[Tuple[float, float]], bin_width: float, bin_height: float, time_limit: float,
+                 node_limit: int = 20000):
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.deadline = time.monotonic() + time_limit
+        self.widths = [w for w, _ in pieces]
+        types = {}
+        self.type_pieces: List[List[int]] = []
+        for index, (w, h) in enumerate(pieces):
+            key = (max(w, h), min(w, h))
+            if key not in types:
+                types[key] = len(types)
+                self.type_pieces.append([])
+            self.type_pieces[types[key]].append(index)
+        # Types are numbered largest first, so both searches try big pieces first
+        order = sorted(types, key=lambda key: key[0] * key[1], reverse=True)
+        self.type_pieces = [self.type_pieces[types[key]] for key in order]
+        self.types = order
+        self.sequence = [t for t, indices in enumerate(self.type_pieces) for _ in indices]
+        self.packer = _SheetPacker(self.types, bin_width, bin_height, self.deadline, node_limit)
+
+    def fits(self) -> bool:
+        return all(
+            (w <= self.bin_width and h <= self.bin_height) or (h <= self.bin_width and w <= self.bin_height)
+            for w, h in self.types)
+
+    def solve(self, lower: int, upper: int) -> Tuple[Optional[List[List[Tuple[int, float, float, bool]]]], bool]:
+        """
+        Look for a plan on fewer than ``upper`` sheets, from ``upper - 1`` down to ``lower``.
+
+        Returns ``(sheets, proven)``. ``sheets`` lists (piece index, x, y,
+        rotated) per sheet for the smallest count found, or is None if none
+        below ``upper`` was found. ``proven`` is True when that count (or
+        ``upper``) is shown to be optimal, and False when the time limit ran
+        out first or a sheet exceeded the node limit of the single-sheet
+        search.
+        """
+        if not self.fits():
+            return None, False
+        best = None
+        try:
+            for count in range(upper - 1, max(1, lower) - 1, -1):
+                bins = self.assign(count)
+                if bins is None:
+                    break
+                best = bins
+        except SolverTimeout:
+            return (self.expand(best) if best is not None else None), False
+        return (self.expand(best) if best is not None else None), not self.packer.incomplete
+
+    def assign(self, count: int) -> Optional[List[Tuple[int, ...]]]:
+        empty = (0,) * len(self.types)
+        remaining_area = [0.0] * (len(self.sequence) + 1)
+        for position in range(len(self.sequence) - 1, -1, -1):
+            w, h = self.types[self.sequence[position]]
+            remaining_area[position] = remaining_area[position + 1] + w * h
+        capacity = self.bin_width * self.bin_height
+        failed = set()
+
+        def search(position: int, bins: List[Tuple[int, ...]]) -> Optional[List[Tuple[int, ...]]]:
+            if position == len(self.sequence):
+                return list(bins)
+            # Sheets are interchangeable, so the state is the multiset of their
+            # contents; this also merges the orders of identical pieces
+            key = (position, tuple(sorted(bins)))
+            if key in failed:
+                return None
+            self.packer.check_time()
+            if remaining_area[position] > capacity * count - sum(
+                    sum(self.types[t][0] * self.types[t][1] * n for t, n in enumerate(b)) for b in bins) + 1e-6:
+                failed.add(key)
+                return None
+            t = self.sequence[position]
+            tried = set()
+            # Only one empty sheet is ever tried, and sheets with equal contents only once
+            for b in range(min(len(bins) + 1, count)):
+                counts = bins[b] if b < len(bins) else empty
+                if counts in tried:
+                    continue
+                tried.add(counts)
+                new_counts = counts[:t] + (counts[t] + 1,) + counts[t + 1:]
+                opened = b == len(bins)
+                if self.packer.layout(new_counts, None if opened else counts) is None:
+                    continue
+                if opened:
+                    bins.append(new_counts)
+                else:
+                    bins[b] = new_counts
+                result = search(position + 1, bins)
+                if result is not None:
+                    return result
+                if opened:
+                    bins.pop()
+                else:
+                    bins[b] = counts
+            failed.add(key)
+            return None
+
+        return search(0, [])
+
+    def expand(self, bins: List[Tuple[int, ...]]) -> List[List[Tuple[int, float, float, bool]]]:
+        queues = [list(indices) for indices in self.type_pieces]
+        sheets = []
+        for counts in bins:
+            sheet = []
+            for t, x, y, rotated in self.packer.layout(counts):
+                index = queues[t].pop(0)
+                w, h = self.types[t]
+                # Types are stored long side first; report rotation against the piece itself
+                piece_rotated = rotated != (self.widths[index] != w)
+                sheet.append((index, x, y, piece_rotated))
+            sheets.append(sheet)
+        return sheets
+
+def search_size(pieces: List[Tuple[float, float]]) -> int:
+    """
+    Number of distinct sheet contents the search can meet: the product of
+    (count + 1) over the piece types. A cheap guess at how hard a proof is.
+    """
+    counts: Dict[Tuple[float, float], int] = {}
+    for w, h in pieces:
+        key = (max(w, h), min(w, h))
+        counts[key] = counts.get(key, 0) + 1
+    size = 1
+    for count in counts.values():
+        size *= count + 1
+    return size
+
+def solve_exact(pieces: List[Tuple[float, float]], bin_width: float, bin_height: float, lower: int, upper: int,
+                time_limit: float, node_limit: int = 20000) -> Tuple[Optional[List[List[Tuple[int, float, float, bool]]]], bool]:
+    return ExactSolver(pieces, bin_width, bin_height, time_limit, node_limit).solve(lower, upper)
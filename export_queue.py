@@ -0,0 +1,276 @@
+"""
+Background export queue with offline spooling for the sheet cutting app.
+
+Every submitted export is written to a spool directory before it is queued,
+so pending exports survive network outages and application restarts. A
+fixed pool of worker threads drains the queue; while the Sheets API is
+unreachable the jobs stay spooled and a monitor thread re-queues them as
+soon as connectivity returns.
+"""
+from typing import List, Dict, Any, Optional, Callable, Iterable
+from models.part import Sheet
+from models.plan_file import save_plan, load_plan
+from config import EXPORT_QUEUE, EXPORT_SPOOL_DIR
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+
+def check_connectivity(host: str = EXPORT_QUEUE['PROBE_HOST'], port: int = 443, timeout: float = 3.0) -> bool:
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+class ExportJob:
+    def __init__(self, job_id: str, key: str, filename: Optional[str] = None, checkpoint: Optional[Dict[str, Any]] = None,
+                 attempts: int = 0, state: str = "pending", error: Optional[str] = None, created: Optional[float] = None):
+        self.id = job_id
+        self.key = key
+        self.filename = filename
+        self.checkpoint = checkpoint
+        self.attempts = attempts
+        self.state = state
+        self.error = error
+        self.created = created or time.time()
+        self.result = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'key': self.key,
+            'filename': self.filename,
+            'checkpoint': self.checkpoint,
+            'attempts': self.attempts,
+            'state': self.state,
+            'error': self.error,
+            'created': self.created
+        }
+
+class ExportQueue:
+    def __init__(self, service_account_file: str, spool_dir: str = EXPORT_SPOOL_DIR,
+                 workers: int = EXPORT_QUEUE['WORKERS'],
+                 exporter_factory: Optional[Callable[[], "GoogleSheetsExporter"]] = None,
+                 probe: Optional[Callable[[], bool]] = None):
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.service_account_file = service_account_file
+        self.exporter_factory = exporter_factory or self.default_exporter
+        self.probe = probe or check_connectivity
+        self.jobs: Dict[str, ExportJob] = {}
+        self.keys: Dict[str, str] = {}
+        self.listeners: List[Callable[[str, Optional[ExportJob], Dict[str, Any]], None]] = []
+        self.online = True
+        self.queue = queue.Queue()
+        self.threads: List[threading.Thread] = []
+        self._lock = threading.RLock()
+        self._offline = threading.Event()
+        self._stopped = threading.Event()
+
+    def default_exporter(self) -> "GoogleSheetsExporter":
+        # Imported here so the Google client stack is not loaded at start-up
+        from export.google_sheets import GoogleSheetsExporter
+        return GoogleSheetsExporter(self.service_account_file)
+
+    def start(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.load_spool()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.worker, name=f"export-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        monitor = threading.Thread(target=self.monitor, name="export-monitor", daemon=True)
+        monitor.start()
+        self.threads.append(monitor)
+
+    def stop(self):
+        self._stopped.set()
+        self._offline.set()
+        for _ in range(self.workers):
+            self.queue.put(None)
+
+    def add_listener(self, callback: Callable[[str, Optional[ExportJob], Dict[str, Any]], None]):
+        self.listeners.append(callback)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            states = [job.state for job in self.jobs.values()]
+        return {
+            'pending': states.count("pending"),
+            'running': states.count("running"),
+            'failed': states.count("failed"),
+            'online': self.online
+        }
+
+    def notify(self, event: str, job: Optional[ExportJob] = None):
+        status = self.status()
+        for callback in list(self.listeners):
+            try:
+                callback(event, job, status)
+            except Exception as e:
+                print(f"Export queue listener failed: {e}")
+
+    def plan_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.dsplan")
+
+    def meta_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.json")
+
+    def save_job(self, job: ExportJob):
+        tmp_path = self.meta_path(job.id) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path(job.id))
+
+    def remove_job(self, job: ExportJob):
+        with self._lock:
+            self.jobs.pop(job.id, None)
+            if self.keys.get(job.key) == job.id:
+                del self.keys[job.key]
+        for path in (self.plan_path(job.id), self.meta_path(job.id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def load_spool(self):
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, name), 'r', encoding='utf-8') as f:
+                    job = ExportJob(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Skipping unreadable spooled export {name}: {e}")
+                continue
+            if not os.path.exists(self.plan_path(job.id)):
+                continue
+            if job.state == "running":
+                job.state = "pending"
+            with self._lock:
+                self.jobs[job.id] = job
+                self.keys[job.key] = job.id
+            if job.state == "pending":
+                self.queue.put(job.id)
+        self.notify("loaded")
+
+    def submit(self, sheets: Iterable[Sheet], filename: Optional[str] = None) -> ExportJob:
+        """
+        Spool the plan and queue it for export.
+
+        ``sheets`` may be a stream such as PackingEngine.iter_plan; each sheet
+        is written to the spool file as soon as it arrives.
+
+        Submitting a plan that is already pending or running returns the
+        existing job instead of exporting it twice.
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        plan_path = self.plan_path(job_id)
+        try:
+            save_plan(plan_path, sheets)
+        except Exception:
+            # A stream that fails half way must not leave a partial plan in the spool
+            with contextlib.suppress(OSError):
+                os.remove(plan_path)
+            raise
+        digest = hashlib.sha256((filename or "").encode('utf-8'))
+        with open(plan_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        key = digest.hexdigest()
+        with self._lock:
+            existing = self.jobs.get(self.keys.get(key))
+            if existing is not None:
+                os.remove(plan_path)
+                if existing.state == "failed":
+                    existing.state = "pending"
+                    existing.attempts = 0
+                    self.save_job(existing)
+                    self.queue.put(existing.id)
+                self.notify("merged", existing)
+                return existing
+            job = ExportJob(job_id, key, filename)
+            self.jobs[job_id] = job
+            self.keys[key] = job_id
+            self.save_job(job)
+        self.notify("queued", job)
+        self.queue.put(job_id)
+        return job
+
+    def worker(self):
+        while not self._stopped.is_set():
+            job_id = self.queue.get()
+            if job_id is None:
+                break
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.state != "pending" or not self.online:
+                    continue
+                job.state = "running"
+            self.notify("started", job)
+            try:
+                sheets = load_plan(self.plan_path(job.id))
+                exporter = self.exporter_factory()
+                result = exporter.export_cutting_plan(sheets, job.filename, resume=job.checkpoint)
+                error = exporter.last_error
+                checkpoint = exporter.last_checkpoint
+            except Exception as e:
+                result, error, checkpoint = False, str(e), job.checkpoint
+            if result:
+                job.state = "done"
+                job.result = result
+                self.remove_job(job)
+                self.notify("done", job)
+                continue
+            job.checkpoint = checkpoint
+            job.error = error
+            if not self.probe():
+                job.state = "pending"
+                self.save_job(job)
+                self.go_offline()
+                continue
+            job.attempts += 1
+            if job.attempts >= EXPORT_QUEUE['MAX_ATTEMPTS']:
+                job.state = "failed"
+                self.save_job(job)
+                self.notify("failed", job)
+            else:
+                job.state = "pending"
+                self.save_job(job)
+                timer = threading.Timer(EXPORT_QUEUE['RETRY_DELAY'] * job.attempts, self.queue.put, args=(job.id,))
+                timer.daemon = True
+                timer.start()
+                self.notify("retry", job)
+
+    def go_offline(self):
+        with self._lock:
+            if not self.online:
+                return
+            self.online = False
+        self._offline.set()
+        self.notify("offline")
+
+    def monitor(self):
+        while not self._stopped.is_set():
+            self._offline.wait()
+            interval = EXPORT_QUEUE['PROBE_INTERVAL']
+            while not self._stopped.is_set() and not self.probe():
+                self._stopped.wait(interval)
+                interval = min(interval * 2, EXPORT_QUEUE['PROBE_INTERVAL_MAX'])
+            if self._stopped.is_set():
+                break
+            with self._lock:
+                self.online = True
+                self._offline.clear()
+                pending = [job.id for job in sorted(self.jobs.values(), key=lambda j: j.created)
+                           if job.state == "pending"]
+            self.notify("online")
+            for job_id in pending:
+                self.queue.put(job_id)
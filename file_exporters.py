@@ -0,0 +1,241 @@
+"""
+Local file exporters for the sheet cutting app: DXF drawings, CSV cut lists
+and G-code for the saws and CNC routers.
+
+Every exporter writes a header, then one block of text per sheet, then a
+footer. Sheets are taken from any iterable (a plan, a PlanReader or
+PackingEngine.iter_plan) and written as they come, so memory use does not
+grow with the plan. For large plans the per-sheet text is rendered in a
+process pool, a few sheets ahead of the writer, and written in order.
+
+Usage:
+    python -m export.file_exporters plan.dsplan plan.dxf
+"""
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import List, Dict, Iterable, Iterator, Optional, Any, Type
+from models.part import Sheet
+from config import FILE_EXPORT
+import csv
+import io
+import os
+
+class SheetExporter:
+    """
+    Base class of the file exporters.
+
+    Subclasses render a sheet with render_sheet, which must only depend on
+    its arguments so it can run in another process. Anything that depends
+    on earlier sheets (e.g. where the sheet goes in a drawing) is worked
+    out in layout, which runs in order in the writing process.
+    """
+    extension = ""
+    newline = "\n"
+
+    def header(self) -> str:
+        return ""
+
+    def footer(self) -> str:
+        return ""
+
+    def layout(self, index: int, sheet: Sheet) -> Any:
+        return None
+
+    def render_sheet(self, index: int, sheet: Sheet, layout: Any) -> str:
+        raise NotImplementedError
+
+    def export(self, sheets: Iterable[Sheet], path: str, workers: Optional[int] = None) -> int:
+        """
+        Write the sheets to path and return the number of sheets written.
+
+        With workers=1 everything runs in this process; the default uses
+        all cores once the plan has more than FILE_EXPORT['PARALLEL_MIN_SHEETS'] sheets.
+        """
+        with open(path, 'w', encoding='utf-8', newline=self.newline) as f:
+            f.write(self.header())
+            count = 0
+            for text in self.render(sheets, workers):
+                f.write(text)
+                count += 1
+            f.write(self.footer())
+        return count
+
+    def render(self, sheets: Iterable[Sheet], workers: Optional[int] = None) -> Iterator[str]:
+        jobs = ((index, sheet, self.layout(index, sheet)) for index, sheet in enumerate(sheets, 1))
+        if workers == 1:
+            for job in jobs:
+                yield self.render_sheet(*job)
+            return
+        # Render the first sheets here; only start the pool if the plan turns out to be large
+        pending: deque = deque()
+        for job in jobs:
+            pending.append(job)
+            if len(pending) > FILE_EXPORT['PARALLEL_MIN_SHEETS']:
+                break
+        if len(pending) <= FILE_EXPORT['PARALLEL_MIN_SHEETS']:
+            for job in pending:
+                yield self.render_sheet(*job)
+            return
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures: deque = deque(pool.submit(self.render_sheet, *job) for job in pending)
+            for job in jobs:
+                # Keep a bounded window of sheets in flight so memory stays flat
+                while len(futures) >= workers * FILE_EXPORT['SHEETS_AHEAD']:
+                    yield futures.popleft().result()
+                futures.append(pool.submit(self.render_sheet, *job))
+            while futures:
+                yield futures.popleft().result()
+
+class CsvCutListExporter(SheetExporter):
+    extension = ".csv"
+    newline = ""
+    columns = ["Лист #", "Размер (mm)", "Материал", "Дебелина (mm)", "Брой листове", "Part Ref", "Part ID",
+               "X (mm)", "Y (mm)", "Широчина (mm)", "Височина (mm)", "Ориентация", "Поръчка"]
+
+    def header(self) -> str:
+        return self.rows([self.columns])
+
+    def rows(self, rows: List[List[Any]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def render_sheet(self, index: int, sheet: Sheet, layout: Any) -> str:
+        batch = sheet.batch
+        size = f"{sheet.size[0]:g}x{sheet.size[1]:g}"
+        return self.rows([
+            [index, size, sheet.material, sheet.thickness, sheet.repeat, ref, part_id, f"{x:g}", f"{y:g}",
+             f"{height if rotated else width:g}", f"{width if rotated else height:g}",
+             "Rotated" if rotated else "Normal", order_id]
+            for part_id, ref, x, y, width, height, rotated, order_id in zip(
+                batch.part_ids, batch.refs, batch.xs, batch.ys, batch.widths, batch.heights, batch.rotated,
+                batch.order_ids)
+        ])
+
+def dxf_text(value: str) -> str:
+    # R12 files are read in the ANSI code page; anything else goes in as a \U+XXXX escape
+    return "".join(char if ord(char) < 128 else f"\\U+{ord(char):04X}" for char in str(value))
+
+class DxfExporter(SheetExporter):
+    """
+    AutoCAD R12 ASCII DXF with the sheets side by side, each on its own layer.
+
+    Layers are created by the entities that use them, so the file can be
+    written without knowing the number of sheets in advance.
+    """
+    extension = ".dxf"
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def header(self) -> str:
+        return "0\nSECTION\n2\nENTITIES\n"
+
+    def footer(self) -> str:
+        return "0\nENDSEC\n0\nEOF\n"
+
+    def layout(self, index: int, sheet: Sheet) -> float:
+        offset = self.offset
+        self.offset += sheet.size[0] + FILE_EXPORT['DXF_SHEET_GAP']
+        return offset
+
+    @staticmethod
+    def line(layer: str, x1: float, y1: float, x2: float, y2: float) -> str:
+        return f"0\nLINE\n8\n{layer}\n10\n{x1:.3f}\n20\n{y1:.3f}\n30\n0.0\n11\n{x2:.3f}\n21\n{y2:.3f}\n31\n0.0\n"
+
+    def rectangle(self, layer: str, x: float, y: float, width: float, height: float) -> List[str]:
+        return [
+            self.line(layer, x, y, x + width, y),
+            self.line(layer, x + width, y, x + width, y + height),
+            self.line(layer, x + width, y + height, x, y + height),
+            self.line(layer, x, y + height, x, y)
+        ]
+
+    def render_sheet(self, index: int, sheet: Sheet, layout: float) -> str:
+        layer = f"SHEET_{index}"
+        sheet_w, sheet_h = sheet.size
+        # DXF has y pointing up; the plan has it pointing down from the top edge
+        entities = self.rectangle(layer, layout, 0.0, sheet_w, sheet_h)
+        entities.append(f"0\nTEXT\n8\n{layer}\n10\n{layout:.3f}\n20\n{sheet_h + 20:.3f}\n30\n0.0\n40\n30.0\n"
+                        f"1\n{dxf_text(f'Sheet {index} {sheet.material} {sheet.thickness:g}mm x{sheet.repeat}')}\n")
+        batch = sheet.batch
+        for ref, x, y, width, height, rotated in zip(batch.refs, batch.xs, batch.ys, batch.widths, batch.heights,
+                                                     batch.rotated):
+            if rotated:
+                width, height = height, width
+            bottom = sheet_h - y - height
+            entities.extend(self.rectangle(layer, layout + x, bottom, width, height))
+            text_height = min(20.0, height / 3)
+            entities.append(f"0\nTEXT\n8\n{layer}\n10\n{layout + x + 2:.3f}\n20\n{bottom + 2:.3f}\n30\n0.0\n"
+                            f"40\n{text_height:.3f}\n1\n{dxf_text(ref)}\n")
+        return "".join(entities)
+
+def gcode_comment(value: str) -> str:
+    # A parenthesis would end the comment early
+    return str(value).replace("(", "[").replace(")", "]")
+
+class GcodeExporter(SheetExporter):
+    """
+    Simple G-code: one program with a pause before every sheet and the cuts
+    in the order of packing.cuts, each cut through the full thickness. The
+    origin is the bottom left corner of the sheet.
+    """
+    extension = ".nc"
+
+    def header(self) -> str:
+        return "(Digital Saw cutting program)\nG21\nG90\nG17\n"
+
+    def footer(self) -> str:
+        return f"G0 Z{FILE_EXPORT['GCODE_SAFE_Z']:.3f}\nM5\nM30\n"
+
+    def render_sheet(self, index: int, sheet: Sheet, layout: Any) -> str:
+        from packing.cuts import plan_cuts
+        cuts, stats = plan_cuts(sheet.batch)
+        safe_z = FILE_EXPORT['GCODE_SAFE_Z']
+        depth = -(float(sheet.thickness) + FILE_EXPORT['GCODE_OVERCUT'])
+        lines = [
+            f"(Sheet {index}: {sheet.size[0]:g}x{sheet.size[1]:g} {gcode_comment(sheet.material)} {sheet.thickness:g}mm, "
+            f"x{sheet.repeat}, {stats['cut_count']} cuts)",
+            "M5",
+            f"G0 Z{safe_z:.3f}",
+            "M0 (Load sheet)",
+            f"M3 S{FILE_EXPORT['GCODE_SPINDLE']}"
+        ]
+        sheet_h = sheet.size[1]
+        for cut in cuts:
+            lines.append(f"G0 X{cut.x1:.3f} Y{sheet_h - cut.y1:.3f}")
+            lines.append(f"G1 Z{depth:.3f} F{FILE_EXPORT['GCODE_PLUNGE']}")
+            lines.append(f"G1 X{cut.x2:.3f} Y{sheet_h - cut.y2:.3f} F{FILE_EXPORT['GCODE_FEED']}")
+            lines.append(f"G0 Z{safe_z:.3f}")
+        return "\n".join(lines) + "\n"
+
+EXPORTERS: Dict[str, Type[SheetExporter]] = {
+    exporter.extension: exporter for exporter in (CsvCutListExporter, DxfExporter, GcodeExporter)
+}
+
+def exporter_for(path: str) -> SheetExporter:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gcode":
+        extension = ".nc"
+    if extension not in EXPORTERS:
+        raise ValueError(f"Неподдържан формат: {extension or path}")
+    return EXPORTERS[extension]()
+
+def export_file(sheets: Iterable[Sheet], path: str, workers: Optional[int] = None) -> int:
+    return exporter_for(path).export(sheets, path, workers)
+
+def main():
+    import argparse
+    from models.plan_file import PlanReader
+    parser = argparse.ArgumentParser(description="Експорт на план за рязане към DXF, CSV или G-code")
+    parser.add_argument("plan", help="Запазен план (.dsplan)")
+    parser.add_argument("output", help="Изходен файл (.dxf, .csv, .nc или .gcode)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    with PlanReader(args.plan) as reader:
+        count = export_file(reader, args.output, args.workers)
+    print(f"{count} листа записани в {args.output}")
+
+if __name__ == "__main__":
+    main()
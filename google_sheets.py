@@ -3,168 +3,486 @@ Google Sheets export logic for the sheet cutting app.
 """
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from typing import List, Optional
+from googleapiclient.errors import HttpError
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Optional, Callable, Dict, Iterable, Iterator, Any
 from models.part import Sheet
+from config import EXPORT, GOOGLE_SHEET_ID, SHEET_METADATA_CACHE
+import google_auth_httplib2
+import httplib2
+import json
+import random
+import socket
+import threading
 import time
 import os
 
+SCOPES = ['https://www.googleapis.com/auth/drive',
+          'https://www.googleapis.com/auth/spreadsheets']
+SHEET_HEADER = ["Лист#", "Dimensions (mm)", "Материал", "Дебелина (mm)",
+                "Ефективност", "Отпадък %", "Брой части", "Алгоритъм", "Брой листове"]
+PLACEMENT_HEADER = ["Лист #", "Part Ref", "Широчина (mm)", "Височина (mm)", "Ориентация",
+                    "X Position", "Y Position", "Материал", "Дебелина (mm)"]
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class ExportError(Exception):
+    def __init__(self, message: str, checkpoint: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.checkpoint = checkpoint
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(EXPORT['BACKOFF_MAX'], float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(EXPORT['BACKOFF_MAX'], EXPORT['BACKOFF_BASE'] * 2 ** attempt))
+
+def chunk_rows(rows: Iterable[List[str]], max_rows: Optional[int] = None,
+               max_bytes: Optional[int] = None) -> Iterator[List[List[str]]]:
+    # Read the limits on every call so changes to EXPORT take effect at runtime
+    max_rows = max_rows or EXPORT['CHUNK_ROWS']
+    max_bytes = max_bytes or EXPORT['CHUNK_BYTES']
+    chunk = []
+    size = 0
+    for row in rows:
+        row_size = sum(len(cell) + 3 for cell in row) + 2
+        if chunk and (len(chunk) >= max_rows or size + row_size > max_bytes):
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append(row)
+        size += row_size
+    if chunk:
+        yield chunk
+
+class SheetsSession:
+    """
+    Long-lived API client shared by all exports.
+
+    Credentials are loaded once and only refreshed when the token expires,
+    the discovery-based services are built once, and every thread keeps its
+    own authorized connection so keep-alive sockets are reused between
+    calls. ``http_factory`` creates the underlying transport and can be
+    replaced with a local stand-in.
+    """
+    def __init__(self, service_account_file: str, http_factory: Optional[Callable[[], httplib2.Http]] = None):
+        self.service_account_file = service_account_file
+        self.http_factory = http_factory or httplib2.Http
+        self.credentials = None
+        self.services: Dict[tuple, object] = {}
+        self.warmup_thread = None
+        self.request_count = 0
+        self.max_retries = EXPORT['MAX_RETRIES']
+        self.sleep = time.sleep
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def get_credentials(self):
+        with self._lock:
+            if self.credentials is None:
+                self.credentials = service_account.Credentials.from_service_account_file(
+                    self.service_account_file,
+                    scopes=SCOPES
+                )
+            if not self.credentials.valid:
+                self.credentials.refresh(google_auth_httplib2.Request(self.http_factory()))
+            return self.credentials
+
+    def http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.get_credentials(), http=self.http_factory())
+            self._local.http = http
+        return http
+
+    def service(self, name: str, version: str):
+        with self._lock:
+            key = (name, version)
+            if key not in self.services:
+                self.services[key] = build(name, version, http=self.http(), cache_discovery=False)
+            return self.services[key]
+
+    def sheets(self):
+        return self.service('sheets', 'v4')
+
+    def drive(self):
+        return self.service('drive', 'v3')
+
+    def execute(self, request):
+        attempt = 0
+        while True:
+            with self._lock:
+                self.request_count += 1
+            try:
+                return request.execute(http=self.http())
+            except HttpError as e:
+                if e.resp.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, e.resp.get('retry-after'))
+            except (socket.timeout, ConnectionError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._local.http = None
+                delay = backoff_delay(attempt)
+            attempt += 1
+            self.sleep(delay)
+
+    def warm_up(self, background: bool = True):
+        def run():
+            try:
+                self.sheets()
+                self.drive()
+            except Exception as e:
+                print(f"Sheets session warm-up failed: {e}")
+        if not background:
+            run()
+            return None
+        with self._lock:
+            if self.warmup_thread is None or not self.warmup_thread.is_alive():
+                self.warmup_thread = threading.Thread(target=run, daemon=True)
+                self.warmup_thread.start()
+            return self.warmup_thread
+
+    def reset(self):
+        with self._lock:
+            self.credentials = None
+            self.services.clear()
+            self._local = threading.local()
+
+_sessions: Dict[str, SheetsSession] = {}
+_sessions_lock = threading.Lock()
+
+def get_session(service_account_file: str) -> SheetsSession:
+    with _sessions_lock:
+        key = os.path.abspath(service_account_file)
+        if key not in _sessions:
+            _sessions[key] = SheetsSession(service_account_file)
+        return _sessions[key]
+
+class SheetMetadataCache:
+    """
+    Local copy of the tab titles and sheet IDs of target spreadsheets.
+
+    Appending a tab only needs to know which titles and IDs are taken, so
+    keeping them on disk saves a full spreadsheet fetch per export.
+    """
+    def __init__(self, path: str = SHEET_METADATA_CACHE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, int]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, int]]:
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, spreadsheet_id: str) -> Optional[Dict[str, int]]:
+        with self._lock:
+            tabs = self._load().get(spreadsheet_id)
+            return dict(tabs) if tabs is not None else None
+
+    def put(self, spreadsheet_id: str, tabs: Dict[str, int]):
+        with self._lock:
+            self._load()[spreadsheet_id] = dict(tabs)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Failed to save sheet metadata cache: {e}")
+
+    def invalidate(self, spreadsheet_id: str):
+        with self._lock:
+            self._load().pop(spreadsheet_id, None)
+
+_metadata_cache = SheetMetadataCache()
+
 class GoogleSheetsExporter:
-    def __init__(self, service_account_file: str):
+    def __init__(self, service_account_file: str, session: Optional[SheetsSession] = None,
+                 spreadsheet_id: Optional[str] = GOOGLE_SHEET_ID, metadata_cache: Optional[SheetMetadataCache] = None):
         self.service_account_file = service_account_file
+        self.session = session or get_session(service_account_file)
+        self.spreadsheet_id = spreadsheet_id
+        self.metadata_cache = metadata_cache or _metadata_cache
         self.credentials = None
         self.service = None
+        self.last_error = None
+        self.last_checkpoint = None
 
     def authenticate(self) -> bool:
         try:
-            self.credentials = service_account.Credentials.from_service_account_file(
-                self.service_account_file,
-                scopes=['https://www.googleapis.com/auth/drive',
-                        'https://www.googleapis.com/auth/spreadsheets']
-            )
-            self.service = build('sheets', 'v4', credentials=self.credentials)
+            self.credentials = self.session.get_credentials()
+            self.service = self.session.sheets()
             return True
         except Exception as e:
             print(f"Authentication failed: {e}")
             return False
 
-    def export_cutting_plan(self, sheets: List[Sheet], filename: Optional[str] = None):
+    def export_cutting_plan(self, sheets: List[Sheet], filename: Optional[str] = None,
+                            resume: Optional[Dict[str, Any]] = None):
+        """
+        Export the plan in size-bounded chunks and return the spreadsheet ID.
+
+        When the exporter has a ``spreadsheet_id`` the plan goes to a new tab
+        of that spreadsheet, otherwise a new spreadsheet is created. On failure ``last_error`` holds the reason and ``last_checkpoint``
+        records the last committed chunk; passing it back as ``resume``
+        continues the same spreadsheet from there.
+        """
+        self.last_error = None
+        self.last_checkpoint = resume
         if not self.authenticate():
+            self.last_error = "Authentication failed"
             return False
         try:
-            if filename is None:
-                filename = "Cutting_Plan_" + time.strftime("%d-%m-%Y")
-            spreadsheet = {
-                'properties': {
-                    'title': filename
-                }
-            }
-            spreadsheet = self.service.spreadsheets().create(body=spreadsheet).execute()
-            spreadsheet_id = spreadsheet['spreadsheetId']
-            first_sheet_id = spreadsheet['sheets'][0]['properties']['sheetId']
-            current_date = time.strftime("%d-%m-%Y")
-            requests = [
+            if resume:
+                checkpoint = dict(resume)
+            elif self.spreadsheet_id:
+                checkpoint = self.add_tab(sheets, self.spreadsheet_id)
+            else:
+                checkpoint = self.create_spreadsheet(sheets, filename)
+            self.last_checkpoint = checkpoint
+            self.write_plan(sheets, checkpoint)
+            return checkpoint['spreadsheet_id']
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+    def create_spreadsheet(self, sheets: List[Sheet], filename: Optional[str] = None) -> Dict[str, Any]:
+        if filename is None:
+            filename = "Cutting_Plan_" + time.strftime("%d-%m-%Y")
+        current_date = time.strftime("%d-%m-%Y")
+        total_rows = len(sheets) + 3 + sum(len(sheet.batch) for sheet in sheets)
+        spreadsheet = {
+            'properties': {
+                'title': filename
+            },
+            'sheets': [
                 {
-                    "updateSheetProperties": {
-                        "properties": {
-                            "sheetId": first_sheet_id,
-                            "title": current_date
-                        },
-                        "fields": "title"
+                    'properties': {
+                        'title': current_date,
+                        'gridProperties': {
+                            'rowCount': max(1000, total_rows),
+                            'columnCount': max(len(SHEET_HEADER), len(PLACEMENT_HEADER))
+                        }
                     }
                 }
             ]
-            self.service.spreadsheets().batchUpdate(
-                spreadsheetId=spreadsheet_id,
-                body={'requests': requests}
-            ).execute()
-            sheet_details = []
-            for i, sheet in enumerate(sheets, 1):
-                sheet_details.append([
-                    f"Sheet {i}", 
-                    f"{sheet.size[0]}x{sheet.size[1]}",  
-                    sheet.material,
-                    str(sheet.thickness),
-                    f"{sheet.utilization*100:.2f}%",
-                    f"{sheet.efficiency['waste_percent']*100:.2f}%",
-                    str(len(sheet.placements)),
-                    sheet.algorithm
-                ])
-            placement_details = []
-            for sheet_index, sheet in enumerate(sheets, 1):
-                for placement in sheet.placements:
-                    placement_details.append([
-                        f"Sheet {sheet_index}",
-                        placement.ref,
-                        str(placement.width),
-                        str(placement.height),
-                        "Rotated" if placement.rotated else "Normal",
-                        str(placement.x),
-                        str(placement.y),
-                        sheet.material,
-                        str(sheet.thickness)
-                    ])
-            sheet_body = {
-                'values': [
-                    ["Лист#", "Dimensions (mm)", "Материал", "Дебелина (mm)", 
-                     "Ефективност", "Отпадък %", "Брой части", "Алгоритъм"],
-                    *sheet_details
-                ]
-            }
-            self.service.spreadsheets().values().update(
-                spreadsheetId=spreadsheet_id,
-                range=f"'{current_date}'!A1",
-                valueInputOption="RAW",
-                body=sheet_body
-            ).execute()
-            placement_body = {
-                'values': [
-                    ["Лист #", "Part Ref", "Широчина (mm)", "Височина (mm)", "Ориентация", 
-                     "X Position", "Y Position", "Материал", "Дебелина (mm)"],
-                    *placement_details
-                ]
-            }
-            self.service.spreadsheets().values().update(
+        }
+        spreadsheet = self.session.execute(self.service.spreadsheets().create(
+            body=spreadsheet,
+            fields='spreadsheetId,sheets.properties.sheetId'
+        ))
+        return {
+            'spreadsheet_id': spreadsheet['spreadsheetId'],
+            'sheet_id': spreadsheet['sheets'][0]['properties']['sheetId'],
+            'tab': current_date,
+            'rows_written': 0,
+            'chunks_written': 0,
+            'shared': False,
+            'formatted': False
+        }
+
+    def sheet_tabs(self, spreadsheet_id: str, refresh: bool = False) -> Dict[str, int]:
+        tabs = None if refresh else self.metadata_cache.get(spreadsheet_id)
+        if tabs is None:
+            spreadsheet = self.session.execute(self.service.spreadsheets().get(
                 spreadsheetId=spreadsheet_id,
-                range=f"'{current_date}'!A{len(sheet_details) + 3}",
-                valueInputOption="RAW",
-                body=placement_body
-            ).execute()
-            header_format = {
-                "textFormat": {"bold": True},
-                "backgroundColor": {"red": 0.9, "green": 0.9, "blue": 0.9}
+                fields='sheets.properties(sheetId,title)'
+            ))
+            tabs = {
+                sheet['properties']['title']: sheet['properties']['sheetId']
+                for sheet in spreadsheet.get('sheets', [])
             }
-            format_request = {
-                "requests": [
-                    {
-                        "repeatCell": {
-                            "range": {
-                                "sheetId": first_sheet_id,
-                                "startRowIndex": 0,
-                                "endRowIndex": 1
-                            },
-                            "cell": {"userEnteredFormat": header_format},
-                            "fields": "userEnteredFormat"
-                        }
-                    },
-                    {
-                        "repeatCell": {
-                            "range": {
-                                "sheetId": first_sheet_id,
-                                "startRowIndex": len(sheet_details) + 2,
-                                "endRowIndex": len(sheet_details) + 3
-                            },
-                            "cell": {"userEnteredFormat": header_format},
-                            "fields": "userEnteredFormat"
-                        }
-                    },
-                    {
-                        "autoResizeDimensions": {
-                            "dimensions": {
-                                "dimension": "COLUMNS",
-                                "sheetId": first_sheet_id
+            self.metadata_cache.put(spreadsheet_id, tabs)
+        return tabs
+
+    def add_tab(self, sheets: List[Sheet], spreadsheet_id: str, title: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Add a tab to an existing spreadsheet and fill it in one batchUpdate.
+
+        The new sheetId and a free title are picked from the cached metadata,
+        so addSheet, the first chunk of cells and the formatting can all go
+        in the same request. A rejected request usually means the cache is
+        stale, so the metadata is refetched and the request retried once.
+        """
+        base_title = title or time.strftime("%d-%m-%Y")
+        placement_start = len(sheets) + 3
+        total_rows = placement_start + sum(len(sheet.batch) for sheet in sheets)
+        first_chunk = next(chunk_rows(self.placement_rows(sheets)), [])
+        rows = [SHEET_HEADER, *self.sheet_rows(sheets), [], PLACEMENT_HEADER, *first_chunk]
+        for attempt in range(2):
+            tabs = self.sheet_tabs(spreadsheet_id, refresh=attempt > 0)
+            tab = base_title
+            suffix = 2
+            while tab in tabs:
+                tab = f"{base_title} ({suffix})"
+                suffix += 1
+            sheet_id = max(tabs.values(), default=0) + 1
+            requests = [
+                {
+                    'addSheet': {
+                        'properties': {
+                            'sheetId': sheet_id,
+                            'title': tab,
+                            'gridProperties': {
+                                'rowCount': max(1000, total_rows),
+                                'columnCount': max(len(SHEET_HEADER), len(PLACEMENT_HEADER))
                             }
                         }
                     }
-                ]
-            }
-            self.service.spreadsheets().batchUpdate(
-                spreadsheetId=spreadsheet_id,
-                body=format_request
-            ).execute()
+                },
+                {
+                    'updateCells': {
+                        'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': 0},
+                        'rows': [
+                            {'values': [{'userEnteredValue': {'stringValue': value}} for value in row]}
+                            for row in rows
+                        ],
+                        'fields': 'userEnteredValue'
+                    }
+                },
+                *self.format_requests(sheet_id, [0, placement_start - 1])
+            ]
             try:
-                drive_service = build('drive', 'v3', credentials=self.credentials)
-                permission = {
-                    'type': 'anyone',
-                    'role': 'writer',
+                self.session.execute(self.service.spreadsheets().batchUpdate(
+                    spreadsheetId=spreadsheet_id,
+                    body={'requests': requests}
+                ))
+                break
+            except HttpError as e:
+                if e.resp.status != 400 or attempt > 0:
+                    raise
+                self.metadata_cache.invalidate(spreadsheet_id)
+        tabs[tab] = sheet_id
+        self.metadata_cache.put(spreadsheet_id, tabs)
+        return {
+            'spreadsheet_id': spreadsheet_id,
+            'sheet_id': sheet_id,
+            'tab': tab,
+            'rows_written': len(first_chunk),
+            'chunks_written': 1,
+            'shared': True,
+            'formatted': True
+        }
+
+    def write_plan(self, sheets: List[Sheet], checkpoint: Dict[str, Any]):
+        tab = checkpoint['tab']
+        placement_start = len(sheets) + 3
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            permission = None
+            if not checkpoint['shared']:
+                permission = pool.submit(self.share_publicly, checkpoint['spreadsheet_id'])
+                permission.add_done_callback(lambda f: checkpoint.update(shared=f.result()))
+            rows = islice(self.placement_rows(sheets), checkpoint['rows_written'], None)
+            chunks = chunk_rows(rows)
+            if checkpoint['chunks_written'] == 0:
+                chunk = next(chunks, [])
+                self.write_values(checkpoint, [
+                    {'range': f"'{tab}'!A1", 'values': [SHEET_HEADER, *self.sheet_rows(sheets)]},
+                    {'range': f"'{tab}'!A{placement_start}", 'values': [PLACEMENT_HEADER, *chunk]}
+                ], len(chunk))
+            for chunk in chunks:
+                self.write_values(checkpoint, [
+                    {'range': f"'{tab}'!A{placement_start + 1 + checkpoint['rows_written']}", 'values': chunk}
+                ], len(chunk))
+            if not checkpoint['formatted']:
+                self.session.execute(self.service.spreadsheets().batchUpdate(
+                    spreadsheetId=checkpoint['spreadsheet_id'],
+                    body={'requests': self.format_requests(checkpoint['sheet_id'], [0, placement_start - 1])}
+                ))
+                checkpoint['formatted'] = True
+            if permission is not None:
+                permission.result()
+
+    def write_values(self, checkpoint: Dict[str, Any], data: List[dict], row_count: int):
+        self.session.execute(self.service.spreadsheets().values().batchUpdate(
+            spreadsheetId=checkpoint['spreadsheet_id'],
+            body={'valueInputOption': "RAW", 'data': data}
+        ))
+        checkpoint['rows_written'] += row_count
+        checkpoint['chunks_written'] += 1
+
+    def sheet_rows(self, sheets: List[Sheet]) -> List[List[str]]:
+        sheet_details = []
+        for i, sheet in enumerate(sheets, 1):
+            sheet_details.append([
+                f"Sheet {i}", 
+                f"{sheet.size[0]}x{sheet.size[1]}",  
+                sheet.material,
+                str(sheet.thickness),
+                f"{sheet.utilization*100:.2f}%",
+                f"{sheet.efficiency['waste_percent']*100:.2f}%",
+                str(len(sheet.batch)),
+                sheet.algorithm,
+                str(sheet.repeat)
+            ])
+        return sheet_details
+
+    def placement_rows(self, sheets: List[Sheet]) -> Iterator[List[str]]:
+        for sheet_index, sheet in enumerate(sheets, 1):
+            batch = sheet.batch
+            for ref, width, height, rotated, x, y in zip(batch.refs, batch.widths, batch.heights,
+                                                         batch.rotated, batch.xs, batch.ys):
+                yield [
+                    f"Sheet {sheet_index}",
+                    ref,
+                    str(width),
+                    str(height),
+                    "Rotated" if rotated else "Normal",
+                    str(x),
+                    str(y),
+                    sheet.material,
+                    str(sheet.thickness)
+                ]
+
+    def format_requests(self, sheet_id: int, header_rows: List[int]) -> List[dict]:
+        header_format = {
+            "textFormat": {"bold": True},
+            "backgroundColor": {"red": 0.9, "green": 0.9, "blue": 0.9}
+        }
+        requests = [
+            {
+                "repeatCell": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "startRowIndex": row,
+                        "endRowIndex": row + 1
+                    },
+                    "cell": {"userEnteredFormat": header_format},
+                    "fields": "userEnteredFormat"
                 }
-                drive_service.permissions().create(
-                    fileId=spreadsheet_id,
-                    body=permission,
-                    fields='id',
-                ).execute()
-            except Exception as e:
-                print(f"Failed to set public permission: {e}")
-            return spreadsheet_id
+            } for row in header_rows
+        ]
+        requests.append({
+            "autoResizeDimensions": {
+                "dimensions": {
+                    "dimension": "COLUMNS",
+                    "sheetId": sheet_id
+                }
+            }
+        })
+        return requests
+
+    def share_publicly(self, spreadsheet_id: str) -> bool:
+        try:
+            permission = {
+                'type': 'anyone',
+                'role': 'writer',
+            }
+            self.session.execute(self.session.drive().permissions().create(
+                fileId=spreadsheet_id,
+                body=permission,
+                fields='id',
+            ))
+            return True
         except Exception as e:
-            print(f"Export failed: {e}")
+            print(f"Failed to set public permission: {e}")
             return False
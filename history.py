@@ -0,0 +1,187 @@
+"""
+Local history of cutting plan runs for the sheet cutting app.
+
+Every run is stored in SQLite with its parts, its sheets and the engine
+timings per (material, thickness) group. Sheets carry their run's date,
+so the waste and algorithm queries are answered from one indexed table
+without joins. Each call opens its own connection, so the store can be
+used from any thread.
+"""
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from models.part import Part, Sheet
+from config import HISTORY_DB
+import json
+import os
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    source TEXT NOT NULL,
+    sheet_sizes TEXT NOT NULL,
+    part_count INTEGER NOT NULL,
+    piece_count INTEGER NOT NULL,
+    sheet_count INTEGER NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_parts (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    part_id INTEGER NOT NULL,
+    ref TEXT NOT NULL,
+    name TEXT NOT NULL,
+    material TEXT NOT NULL,
+    thickness REAL NOT NULL,
+    width REAL NOT NULL,
+    height REAL NOT NULL,
+    qty INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheets (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    created REAL NOT NULL,
+    material TEXT NOT NULL,
+    thickness REAL NOT NULL,
+    width REAL NOT NULL,
+    height REAL NOT NULL,
+    repeat INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    sort_method TEXT NOT NULL,
+    utilization REAL NOT NULL,
+    used_area REAL NOT NULL,
+    waste_area REAL NOT NULL,
+    placements INTEGER NOT NULL,
+    machine_time REAL,
+    optimality_gap REAL
+);
+CREATE TABLE IF NOT EXISTS group_timings (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    material TEXT NOT NULL,
+    thickness REAL NOT NULL,
+    seconds REAL,
+    sheets INTEGER,
+    lower_bound INTEGER,
+    algorithm TEXT,
+    sort_method TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_created ON runs(created);
+CREATE INDEX IF NOT EXISTS run_parts_run ON run_parts(run_id);
+CREATE INDEX IF NOT EXISTS run_parts_material ON run_parts(material, thickness);
+CREATE INDEX IF NOT EXISTS sheets_run ON sheets(run_id);
+CREATE INDEX IF NOT EXISTS sheets_created ON sheets(created);
+CREATE INDEX IF NOT EXISTS sheets_material ON sheets(material, thickness, created);
+CREATE INDEX IF NOT EXISTS sheets_algorithm ON sheets(algorithm, sort_method, created);
+CREATE INDEX IF NOT EXISTS group_timings_run ON group_timings(run_id);
+CREATE INDEX IF NOT EXISTS group_timings_material ON group_timings(material, thickness);
+"""
+
+class HistoryStore:
+    def __init__(self, path: str = HISTORY_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as db:
+            db.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA foreign_keys = ON")
+        return db
+
+    def record_run(self, parts: List[Part], sheets: List[Sheet], duration: float, sheet_sizes: Iterable[tuple] = (),
+                   group_stats: Optional[Dict[Tuple[str, float], Dict[str, Any]]] = None, source: str = "local",
+                   created: Optional[float] = None) -> int:
+        created = time.time() if created is None else created
+        db = self.connect()
+        try:
+            with db:
+                run_id = db.execute(
+                    "INSERT INTO runs (created, source, sheet_sizes, part_count, piece_count, sheet_count, duration) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (created, source, json.dumps([list(size) for size in sheet_sizes]), len(parts),
+                     sum(part.qty for part in parts), sum(sheet.repeat for sheet in sheets), duration)
+                ).lastrowid
+                db.executemany(
+                    "INSERT INTO run_parts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((run_id, part.id, part.ref, part.name, part.material, part.thickness, part.width, part.height,
+                      part.qty) for part in parts)
+                )
+                db.executemany(
+                    "INSERT INTO sheets (run_id, created, material, thickness, width, height, repeat, algorithm, "
+                    "sort_method, utilization, used_area, waste_area, placements, machine_time, optimality_gap) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((run_id, created, sheet.material, sheet.thickness, sheet.size[0], sheet.size[1], sheet.repeat,
+                      sheet.algorithm or "", sheet.sort_method or "", sheet.utilization,
+                      sheet.efficiency.get('used_area', 0.0), sheet.efficiency.get('waste_area', 0.0),
+                      len(sheet.batch), sheet.efficiency.get('machine_time'), sheet.efficiency.get('optimality_gap'))
+                     for sheet in sheets)
+                )
+                db.executemany(
+                    "INSERT INTO group_timings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((run_id, material, thickness, stats.get('seconds'), stats.get('sheets'), stats.get('lower_bound'),
+                      stats.get('algorithm'), stats.get('sort_method'))
+                     for (material, thickness), stats in (group_stats or {}).items())
+                )
+            return run_id
+        finally:
+            db.close()
+
+    def query(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        db = self.connect()
+        try:
+            return [dict(row) for row in db.execute(sql, tuple(params))]
+        finally:
+            db.close()
+
+    @staticmethod
+    def filters(since: Optional[float] = None, until: Optional[float] = None, material: Optional[str] = None,
+                thickness: Optional[float] = None, algorithm: Optional[str] = None) -> Tuple[str, List[Any]]:
+        clauses = []
+        params: List[Any] = []
+        for column, op, value in (("material", "=", material), ("thickness", "=", thickness),
+                                  ("algorithm", "=", algorithm), ("created", ">=", since), ("created", "<", until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def waste_by_material(self, **filters) -> List[Dict[str, Any]]:
+        """
+        Sheets, utilization and waste per material and thickness; repeated sheets count once per copy.
+        """
+        where, params = self.filters(**filters)
+        return self.query(
+            "SELECT material, thickness, SUM(repeat) AS sheets, "
+            "SUM(used_area * repeat) / SUM(width * height * repeat) AS utilization, "
+            "SUM(waste_area * repeat) / 1000000.0 AS waste_m2 "
+            f"FROM sheets{where} GROUP BY material, thickness ORDER BY waste_m2 DESC", params)
+
+    def algorithm_wins(self, **filters) -> List[Dict[str, Any]]:
+        """
+        How often each algorithm and sort produced the chosen plan, and how well it used the sheets.
+        """
+        where, params = self.filters(**filters)
+        return self.query(
+            "SELECT algorithm, sort_method, COUNT(DISTINCT run_id) AS runs, SUM(repeat) AS sheets, "
+            "SUM(used_area * repeat) / SUM(width * height * repeat) AS utilization "
+            f"FROM sheets{where} GROUP BY algorithm, sort_method ORDER BY sheets DESC", params)
+
+    def daily_trend(self, **filters) -> List[Dict[str, Any]]:
+        where, params = self.filters(**filters)
+        return self.query(
+            "SELECT date(created, 'unixepoch', 'localtime') AS day, SUM(repeat) AS sheets, "
+            "SUM(used_area * repeat) / SUM(width * height * repeat) AS utilization "
+            f"FROM sheets{where} GROUP BY day ORDER BY day", params)
+
+    def run_times(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
+        where, params = self.filters(since=since, until=until)
+        return self.query(
+            "SELECT source, COUNT(*) AS runs, AVG(duration) AS avg_seconds, MAX(duration) AS max_seconds, "
+            "AVG(piece_count) AS avg_pieces "
+            f"FROM runs{where} GROUP BY source ORDER BY runs DESC", params)
+
+    def recent_runs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return self.query("SELECT * FROM runs ORDER BY created DESC LIMIT ?", (limit,))
@@ -0,0 +1,148 @@
+"""
+Multi-order nesting for the sheet cutting app.
+
+Orders of the same material and thickness are packed together, so their
+part-filled last sheets are shared instead of wasted once per order. Part
+ids are made unique across orders for the engine and mapped back
+afterwards. Every placement keeps its order id. The (material, thickness)
+groups are independent and are packed in parallel. Sheets are then put in
+due date order, so the earliest order is finished first.
+
+Usage:
+    python -m packing.nesting orders/*.csv --due 1043=2026-11-02 --output week.dsplan
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import List, Dict, Tuple, Optional, Any, Callable, Iterator
+from models.part import Part, Sheet
+from config import DEFAULT_SHEET_SIZES
+import os
+
+class Order:
+    def __init__(self, order_id: str, parts: List[Part], due_date: Optional[date] = None):
+        self.order_id = order_id
+        self.parts = parts
+        self.due_date = due_date
+
+def _due_key(due_date: Optional[date]) -> Tuple[int, date]:
+    # Orders without a due date go last
+    return (1, date.max) if due_date is None else (0, due_date)
+
+def _pack_group(sheet_sizes: List[Tuple[int, int]], parts: List[Part]) -> List[Sheet]:
+    from packing.engine import PackingEngine
+    return list(PackingEngine(sheet_sizes).iter_plan(parts, lambda progress: None))
+
+def nest_orders(orders: List[Order], sheet_sizes: List[Tuple[int, int]] = DEFAULT_SHEET_SIZES,
+                workers: Optional[int] = None,
+                progress_callback: Optional[Callable[[Tuple[str, float]], None]] = None) -> Tuple[List[Sheet], List[Dict[str, Any]]]:
+    """
+    Pack all orders together and return the sheets and a summary per order.
+
+    Raises PackingError if a group cannot be packed.
+    """
+    orders = sorted(orders, key=lambda order: _due_key(order.due_date))
+    owners: Dict[int, Tuple[Order, int]] = {}
+    groups: Dict[Tuple[str, float], List[Part]] = {}
+    for order in orders:
+        for part in order.parts:
+            part_id = len(owners) + 1
+            owners[part_id] = (order, part.id)
+            groups.setdefault((part.material, part.thickness), []).append(Part(
+                part_id, part.ref, part.name, part.material, part.thickness, part.width, part.height, part.qty))
+    sheets: List[Sheet] = []
+    jobs = list(groups.values())
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        results = (_pack_group(sheet_sizes, parts) for parts in jobs)
+        for index, group_sheets in enumerate(results, 1):
+            sheets.extend(group_sheets)
+            if progress_callback:
+                progress_callback((f"Опаковани {index} от {len(jobs)} групи", index / len(jobs) * 100))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_pack_group, sheet_sizes, parts) for parts in jobs]
+            for index, future in enumerate(futures, 1):
+                sheets.extend(future.result())
+                if progress_callback:
+                    progress_callback((f"Опаковани {index} от {len(jobs)} групи", index / len(jobs) * 100))
+    # Back to the ids of the orders, with the order on every placement
+    sheet_due = []
+    for sheet in sheets:
+        batch = sheet.batch
+        owned = [owners[part_id] for part_id in batch.part_ids]
+        batch.order_ids = [order.order_id for order, _ in owned]
+        for index, (_, part_id) in enumerate(owned):
+            batch.part_ids[index] = part_id
+        sheet.placements = batch
+        sheet_due.append(min((_due_key(order.due_date) for order, _ in owned), default=_due_key(None)))
+    order = sorted(range(len(sheets)), key=lambda index: sheet_due[index])
+    sheets = [sheets[index] for index in order]
+    return sheets, order_summary(orders, sheets)
+
+def numbered_sheets(sheets: List[Sheet]) -> Iterator[Tuple[range, Sheet]]:
+    """
+    Every sheet with the numbers of the physical sheets cut to it; a repeated pattern covers ``repeat`` of them.
+    """
+    number = 1
+    for sheet in sheets:
+        yield range(number, number + sheet.repeat), sheet
+        number += sheet.repeat
+
+def order_summary(orders: List[Order], sheets: List[Sheet]) -> List[Dict[str, Any]]:
+    summary = {
+        order.order_id: {'order_id': order.order_id, 'due_date': order.due_date,
+                         'pieces': sum(part.qty for part in order.parts), 'sheets': [], 'shared_sheets': 0}
+        for order in orders
+    }
+    for numbers, sheet in numbered_sheets(sheets):
+        owners = set(sheet.batch.order_ids)
+        for order_id in owners:
+            summary[order_id]['sheets'].extend(numbers)
+            if len(owners) > 1:
+                summary[order_id]['shared_sheets'] += len(numbers)
+    for row in summary.values():
+        row['last_sheet'] = max(row['sheets'], default=0)
+    return list(summary.values())
+
+def placements_by_order(sheets: List[Sheet]) -> Dict[str, List[Tuple[int, Any]]]:
+    """
+    The placements of every order as (sheet number, Placement), for sorting the parts after cutting.
+    """
+    result: Dict[str, List[Tuple[int, Any]]] = {}
+    for numbers, sheet in numbered_sheets(sheets):
+        for number in numbers:
+            for placement in sheet.batch:
+                result.setdefault(placement.order_id, []).append((number, placement))
+    return result
+
+def main():
+    import argparse
+    from packing.what_if import load_job, parse_sizes
+    parser = argparse.ArgumentParser(description="Общо разкрояване на няколко поръчки")
+    parser.add_argument("orders", nargs="+", help="Файлове с части (CSV или XLSX); името на файла е номерът на поръчката")
+    parser.add_argument("--due", action="append", default=[], help="Срок на поръчка, напр. 1043=2026-11-02")
+    parser.add_argument("--sizes", default=None, help="Размери на листове, напр. 2800x2070,2500x1250")
+    parser.add_argument("--output", default=None, help="Запис на плана (.dsplan)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    due_dates = {}
+    for item in args.due:
+        order_id, value = item.split("=")
+        due_dates[order_id] = date.fromisoformat(value)
+    orders = []
+    for path in args.orders:
+        order_id = os.path.splitext(os.path.basename(path))[0]
+        orders.append(Order(order_id, load_job(path), due_dates.get(order_id)))
+    sizes = parse_sizes(args.sizes) if args.sizes else list(DEFAULT_SHEET_SIZES)
+    sheets, summary = nest_orders(orders, sizes, args.workers, lambda progress: print(progress[0]))
+    for row in summary:
+        due = row['due_date'].isoformat() if row['due_date'] else "-"
+        print(f"{row['order_id']}: срок {due}, {row['pieces']} части, листове {row['sheets']} "
+              f"({row['shared_sheets']} общи)")
+    print(f"Общо листове: {sum(sheet.repeat for sheet in sheets)}")
+    if args.output:
+        from models.plan_file import save_plan
+        save_plan(args.output, sheets)
+
+if __name__ == "__main__":
+    main()
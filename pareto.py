@@ -0,0 +1,196 @@
+"""
+Multi-objective planning for the sheet cutting app.
+
+The engine normally keeps the single candidate with the best utilization.
+In this mode it also keeps, for every (material, thickness) group, the
+candidates that no other candidate beats on all of: sheet count, waste
+area, total cut length and planning time. Differences below the PARETO
+tolerances (absolute, or relative to the values) do not count, so
+near-identical candidates collapse into one. The groups are independent,
+so the plan front is the pruned sum of the group fronts.
+
+Usage:
+    python -m packing.pareto parts.csv --sizes 2800x2070,2500x1250
+"""
+from typing import List, Dict, Tuple, Optional, Any, Callable, Iterable
+from models.part import Part, Sheet
+from config import DEFAULT_SHEET_SIZES, PARETO
+
+OBJECTIVES = ('sheets', 'waste', 'cut_length', 'seconds')
+TOLERANCES = (0.0, PARETO['WASTE_TOLERANCE'], PARETO['CUT_TOLERANCE'], PARETO['TIME_TOLERANCE'])
+# Sheet counts are compared exactly
+RELATIVE = (0.0, PARETO['RELATIVE_TOLERANCE'], PARETO['RELATIVE_TOLERANCE'], PARETO['RELATIVE_TOLERANCE'])
+
+def _tolerance(x: float, y: float, absolute: float, relative: float) -> float:
+    return max(absolute, relative * max(abs(x), abs(y)))
+
+class Candidate:
+    """
+    One plan (or the plan of one group) with its objective values.
+
+    values follows OBJECTIVES; sheets holds the finished sheets once they
+    are built, solution whatever is needed to build them.
+    """
+    def __init__(self, values: Tuple[float, float, float, float], sheets: Optional[List[Sheet]] = None,
+                 solution: Any = None, algorithm: str = "", sort_method: str = ""):
+        self.values = tuple(values)
+        self.sheets = sheets
+        self.solution = solution
+        self.algorithm = algorithm
+        self.sort_method = sort_method
+        self.default = False
+
+    @property
+    def sheet_count(self) -> float:
+        return self.values[0]
+
+    @property
+    def waste(self) -> float:
+        return self.values[1]
+
+    @property
+    def cut_length(self) -> float:
+        return self.values[2]
+
+    @property
+    def seconds(self) -> float:
+        return self.values[3]
+
+    @property
+    def machine_time(self) -> float:
+        return sum(sheet.efficiency.get('machine_time', 0.0) * sheet.repeat for sheet in self.sheets or [])
+
+def dominates(a: Tuple[float, ...], b: Tuple[float, ...]) -> bool:
+    """
+    a is no worse than b on every objective and clearly better on one.
+    """
+    better = False
+    for x, y, absolute, relative in zip(a, b, TOLERANCES, RELATIVE):
+        tolerance = _tolerance(x, y, absolute, relative)
+        if x > y + tolerance:
+            return False
+        if x < y - tolerance:
+            better = True
+    return better
+
+def equivalent(a: Tuple[float, ...], b: Tuple[float, ...]) -> bool:
+    return all(abs(x - y) <= _tolerance(x, y, absolute, relative)
+               for x, y, absolute, relative in zip(a, b, TOLERANCES, RELATIVE))
+
+class ParetoFront:
+    def __init__(self, max_size: int = PARETO['MAX_CANDIDATES']):
+        self.max_size = max_size
+        self.candidates: List[Candidate] = []
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def __iter__(self):
+        return iter(self.candidates)
+
+    def add(self, candidate: Candidate) -> bool:
+        """
+        Add a candidate unless it is dominated by (or equivalent to) one already on the front.
+        """
+        # The plan the engine would pick on its own always stays on offer
+        if not candidate.default and any(dominates(other.values, candidate.values) or
+                                         equivalent(other.values, candidate.values) for other in self.candidates):
+            return False
+        self.candidates = [other for other in self.candidates if other.default or not (
+            dominates(candidate.values, other.values) or
+            (candidate.default and equivalent(candidate.values, other.values)))]
+        self.candidates.append(candidate)
+        if len(self.candidates) > self.max_size:
+            self.trim()
+        return True
+
+    def trim(self):
+        # Keep the best candidate on each objective, then the most balanced ones
+        lows = [min(candidate.values[i] for candidate in self.candidates) for i in range(len(OBJECTIVES))]
+        highs = [max(candidate.values[i] for candidate in self.candidates) for i in range(len(OBJECTIVES))]
+
+        def balance(candidate: Candidate) -> float:
+            return sum((value - low) / (high - low) if high > low else 0.0
+                       for value, low, high in zip(candidate.values, lows, highs))
+
+        keep = [candidate for candidate in self.candidates if candidate.default]
+        for i in range(len(OBJECTIVES)):
+            best = min(self.candidates, key=lambda candidate: (candidate.values[i], balance(candidate)))
+            if best not in keep:
+                keep.append(best)
+        for candidate in sorted(self.candidates, key=balance):
+            if len(keep) >= self.max_size:
+                break
+            if candidate not in keep:
+                keep.append(candidate)
+        self.candidates = [candidate for candidate in self.candidates if candidate in keep][:max(self.max_size, 1)]
+
+    def sorted(self) -> List[Candidate]:
+        return sorted(self.candidates, key=lambda candidate: candidate.values)
+
+def sheet_values(sheets: List[Sheet], seconds: float) -> Tuple[float, float, float, float]:
+    return (
+        sum(sheet.repeat for sheet in sheets),
+        sum(sheet.efficiency.get('waste_area', 0.0) * sheet.repeat for sheet in sheets),
+        sum(sheet.efficiency.get('cut_length', 0.0) * sheet.repeat for sheet in sheets),
+        seconds
+    )
+
+def combine(fronts: Iterable[List[Candidate]], max_size: int = PARETO['MAX_CANDIDATES']) -> List[Candidate]:
+    """
+    The front of whole plans made of one candidate per group.
+
+    Objectives add up over the groups, so the sum is pruned after every
+    group and never holds more than max_size plans.
+    """
+    plans = [Candidate((0.0, 0.0, 0.0, 0.0), sheets=[])]
+    plans[0].default = True
+    for group in fronts:
+        front = ParetoFront(max_size)
+        for plan in plans:
+            for candidate in group:
+                merged = Candidate(tuple(a + b for a, b in zip(plan.values, candidate.values)),
+                                   sheets=plan.sheets + candidate.sheets)
+                merged.default = plan.default and candidate.default
+                front.add(merged)
+        plans = front.candidates
+    return sorted(plans, key=lambda plan: plan.values)
+
+def pareto_plan(parts: List[Part], sheet_sizes: List[Tuple[int, int]] = DEFAULT_SHEET_SIZES,
+                progress_callback: Optional[Callable[[Tuple[str, float]], None]] = None,
+                engine: Any = None) -> List[Candidate]:
+    """
+    Pack the parts and return the non-dominated plans, best sheet count first.
+
+    The plan the engine picks in the normal mode is among them, marked
+    default. Raises PackingError if a group cannot be packed.
+    """
+    if engine is None:
+        from packing.engine import PackingEngine
+        engine = PackingEngine(sheet_sizes)
+    fronts: Dict[Tuple[str, float], List[Candidate]] = {}
+    for _ in engine.iter_plan(parts, progress_callback or (lambda progress: None), fronts=fronts):
+        pass
+    return combine(fronts.values())
+
+def format_table(plans: List[Candidate]) -> str:
+    lines = [f"{'#':>2} {'Листове':>8} {'Отпадък m²':>11} {'Рязане m':>9} {'Машина мин':>11} {'Време s':>8}"]
+    for index, plan in enumerate(plans, 1):
+        lines.append(f"{index:>2} {plan.sheet_count:>8.0f} {plan.waste / 1e6:>11.2f} {plan.cut_length / 1000:>9.1f} "
+                     f"{plan.machine_time / 60:>11.1f} {plan.seconds:>8.2f}{' *' if plan.default else ''}")
+    return "\n".join(lines)
+
+def main():
+    import argparse
+    from packing.what_if import load_job, parse_sizes
+    parser = argparse.ArgumentParser(description="Варианти на плана по листове, отпадък, дължина на рязане и време")
+    parser.add_argument("parts", help="Файл с части (CSV или XLSX)")
+    parser.add_argument("--sizes", default=None, help="Размери на листове, напр. 2800x2070,2500x1250")
+    args = parser.parse_args()
+    sizes = parse_sizes(args.sizes) if args.sizes else list(DEFAULT_SHEET_SIZES)
+    plans = pareto_plan(load_job(args.parts), sizes)
+    print(format_table(plans))
+    print("* планът, който се избира в обичайния режим")
+
+if __name__ == "__main__":
+    main()
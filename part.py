@@ -2,9 +2,12 @@
 Data models for the sheet cutting optimization app.
 """
 
-from typing import List, Dict, Any, Optional
+from array import array
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 
 class Part:
+    __slots__ = ('id', 'ref', 'name', 'material', 'thickness', 'width', 'height', 'qty')
+
     def __init__(self, part_id: int, ref: str, name: str, material: str, thickness: float, width: float, height: float, qty: int):
         self.id = part_id
         self.ref = ref
@@ -15,6 +18,11 @@ class Part:
         self.height = height
         self.qty = qty
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Part":
+        return cls(int(data['id']), data.get('ref', ""), data.get('name', ""), data['material'], float(data['thickness']),
+                   float(data['width']), float(data['height']), int(data['qty']))
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
@@ -28,7 +36,10 @@ class Part:
         }
 
 class Placement:
-    def __init__(self, part_id: int, ref: str, x: float, y: float, rotated: bool, width: float, height: float, spacing: Optional[Dict[str, float]] = None):
+    __slots__ = ('part_id', 'ref', 'x', 'y', 'rotated', 'width', 'height', '_spacing', 'order_id')
+
+    def __init__(self, part_id: int, ref: str, x: float, y: float, rotated: bool, width: float, height: float, spacing: Optional[Dict[str, float]] = None,
+                 order_id: str = ""):
         self.part_id = part_id
         self.ref = ref
         self.x = x
@@ -36,7 +47,33 @@ class Placement:
         self.rotated = rotated
         self.width = width
         self.height = height
-        self.spacing = spacing or {}
+        self.spacing = spacing
+        # Order the part belongs to when several orders are nested together
+        self.order_id = order_id
+
+    @property
+    def spacing(self) -> Dict[str, float]:
+        if self._spacing is None:
+            return {}
+        x, y, width, height = self._spacing
+        return {'x': x, 'y': y, 'width': width, 'height': height}
+
+    @spacing.setter
+    def spacing(self, spacing: Optional[Dict[str, float]]):
+        if spacing:
+            self._spacing = (spacing['x'], spacing['y'], spacing['width'], spacing['height'])
+        else:
+            self._spacing = None
+
+    def spacing_rect(self) -> Tuple[float, float, float, float]:
+        if self._spacing is None:
+            return (self.x - 5, self.y - 5, self.width + 10, self.height + 10)
+        return self._spacing
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Placement":
+        return cls(data['id'], data['ref'], data['x'], data['y'], data['rotated'], data['width'], data['height'],
+                   data.get('spacing'), data.get('order_id', ""))
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -47,11 +84,95 @@ class Placement:
             'rotated': self.rotated,
             'width': self.width,
             'height': self.height,
-            'spacing': self.spacing
+            'spacing': self.spacing,
+            'order_id': self.order_id
         }
 
+class PlacementBatch:
+    """
+    Struct-of-arrays storage for the placements of one sheet.
+
+    Each column is a typed array, so a sheet with thousands of parts costs a
+    few bytes per placement instead of a Python object and a dict each.
+    Spacing rectangles are always stored; placements without explicit spacing
+    get the default 5 mm border.
+    """
+    __slots__ = ('part_ids', 'refs', 'xs', 'ys', 'rotated', 'widths', 'heights',
+                 'spacing_xs', 'spacing_ys', 'spacing_widths', 'spacing_heights', 'order_ids')
+
+    def __init__(self):
+        self.part_ids = array('q')
+        self.refs = []
+        self.xs = array('d')
+        self.ys = array('d')
+        self.rotated = array('b')
+        self.widths = array('d')
+        self.heights = array('d')
+        self.spacing_xs = array('d')
+        self.spacing_ys = array('d')
+        self.spacing_widths = array('d')
+        self.spacing_heights = array('d')
+        self.order_ids = []
+
+    @classmethod
+    def from_placements(cls, placements) -> 'PlacementBatch':
+        if isinstance(placements, PlacementBatch):
+            return placements
+        batch = cls()
+        for p in placements:
+            sx, sy, sw, sh = p.spacing_rect()
+            batch.append(p.part_id, p.ref, p.x, p.y, p.rotated, p.width, p.height, sx, sy, sw, sh, p.order_id)
+        return batch
+
+    def append(self, part_id: int, ref: str, x: float, y: float, rotated: bool, width: float, height: float,
+               spacing_x: Optional[float] = None, spacing_y: Optional[float] = None,
+               spacing_width: Optional[float] = None, spacing_height: Optional[float] = None, order_id: str = ""):
+        self.part_ids.append(part_id)
+        self.refs.append(ref)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.rotated.append(1 if rotated else 0)
+        self.widths.append(width)
+        self.heights.append(height)
+        self.spacing_xs.append(x - 5 if spacing_x is None else spacing_x)
+        self.spacing_ys.append(y - 5 if spacing_y is None else spacing_y)
+        self.spacing_widths.append(width + 10 if spacing_width is None else spacing_width)
+        self.spacing_heights.append(height + 10 if spacing_height is None else spacing_height)
+        self.order_ids.append(order_id)
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def __getitem__(self, index: int) -> Placement:
+        return Placement(
+            self.part_ids[index],
+            self.refs[index],
+            self.xs[index],
+            self.ys[index],
+            bool(self.rotated[index]),
+            self.widths[index],
+            self.heights[index],
+            {
+                'x': self.spacing_xs[index],
+                'y': self.spacing_ys[index],
+                'width': self.spacing_widths[index],
+                'height': self.spacing_heights[index]
+            },
+            self.order_ids[index])
+
+    def __iter__(self) -> Iterator[Placement]:
+        for index in range(len(self.refs)):
+            yield self[index]
+
+    def used_area(self) -> float:
+        return sum(w * h for w, h in zip(self.widths, self.heights))
+
 class Sheet:
-    def __init__(self, size: tuple, material: str, thickness: float, placements: List[Placement], algorithm: str, sort_method: str, utilization: float, efficiency: Dict[str, float]):
+    __slots__ = ('size', 'material', 'thickness', '_placements', '_batch', 'algorithm', 'sort_method',
+                 'utilization', 'efficiency', 'repeat', '__weakref__')
+
+    def __init__(self, size: tuple, material: str, thickness: float, placements, algorithm: str, sort_method: str, utilization: float, efficiency: Dict[str, float],
+                 repeat: int = 1):
         self.size = size
         self.material = material
         self.thickness = thickness
@@ -60,6 +181,36 @@ class Sheet:
         self.sort_method = sort_method
         self.utilization = utilization
         self.efficiency = efficiency
+        # Number of identical sheets cut to this pattern
+        self.repeat = repeat
+
+    @property
+    def placements(self) -> Tuple[Placement, ...]:
+        # Read-only; assigning new placements is the only way to change them, and it drops the batch
+        if self._placements is None:
+            self._placements = tuple(self._batch)
+        return self._placements
+
+    @placements.setter
+    def placements(self, placements):
+        if isinstance(placements, PlacementBatch):
+            self._placements = None
+            self._batch = placements
+        else:
+            self._placements = tuple(placements)
+            self._batch = None
+
+    @property
+    def batch(self) -> PlacementBatch:
+        if self._batch is None:
+            self._batch = PlacementBatch.from_placements(self._placements)
+        return self._batch
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Sheet":
+        return cls(tuple(data['sheet_size']), data['material'], data['thickness'],
+                   [Placement.from_dict(p) for p in data['placements']], data['algorithm'], data['sort_method'],
+                   data['utilization'], data['efficiency'], data.get('repeat', 1))
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -70,5 +221,9 @@ class Sheet:
             'algorithm': self.algorithm,
             'sort_method': self.sort_method,
             'utilization': self.utilization,
-            'efficiency': self.efficiency
+            'efficiency': self.efficiency,
+            'repeat': self.repeat
         }
+
+def sheet_count(sheets: List[Sheet]) -> int:
+    return sum(sheet.repeat for sheet in sheets)
@@ -0,0 +1,202 @@
+"""
+Bulk import of parts from CSV, XLSX and Google Sheets for the sheet cutting app.
+
+Rows are read and validated one at a time, so large cutting lists never
+have to be held in memory as raw rows. Every row produces either a Part or
+an error message tied to its row number.
+"""
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from models.part import Part
+from config import IMPORT
+import csv
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+COLUMN_ALIASES = {
+    'ref': ('ref', 'reference', 'означение', 'код'),
+    'name': ('name', 'име', 'наименование', 'описание'),
+    'material': ('material', 'материал'),
+    'thickness': ('thickness', 'дебелина', 'дебелина (mm)'),
+    'width': ('width', 'ширина', 'широчина', 'ширина (mm)', 'широчина (mm)'),
+    'height': ('height', 'length', 'височина', 'дължина', 'височина (mm)', 'дължина (mm)'),
+    'qty': ('qty', 'quantity', 'count', 'количество', 'брой', 'бр', 'бр.')
+}
+REQUIRED_COLUMNS = ('width', 'height', 'qty')
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_CELL_REF = re.compile(r'([A-Z]+)')
+
+def iter_csv_rows(path: str) -> Iterator[Tuple[int, List[str]]]:
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for row_number, row in enumerate(csv.reader(f, dialect), 1):
+            yield row_number, row
+
+def _column_index(cell_ref: str) -> int:
+    letters = _CELL_REF.match(cell_ref).group(1)
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+def iter_xlsx_rows(path: str) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Stream the rows of the first worksheet of an .xlsx file.
+
+    Only the standard library is used: the shared string table is loaded
+    once and the worksheet XML is parsed incrementally.
+    """
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as f:
+                for _, elem in ET.iterparse(f):
+                    if elem.tag == _XLSX_NS + 'si':
+                        shared.append(''.join(t.text or '' for t in elem.iter(_XLSX_NS + 't')))
+                        elem.clear()
+        worksheets = sorted(
+            (name for name in names if name.startswith('xl/worksheets/sheet') and name.endswith('.xml')),
+            key=lambda name: int(re.sub(r'\D', '', name) or 0)
+        )
+        if not worksheets:
+            raise ValueError(f"{path} has no worksheets")
+        with archive.open(worksheets[0]) as f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag != _XLSX_NS + 'row':
+                    continue
+                row = []
+                for cell in elem.iter(_XLSX_NS + 'c'):
+                    cell_type = cell.get('t')
+                    if cell_type == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(_XLSX_NS + 't'))
+                    else:
+                        v = cell.find(_XLSX_NS + 'v')
+                        value = (v.text or '') if v is not None else ''
+                        if cell_type == 's' and value:
+                            value = shared[int(value)]
+                    index = _column_index(cell.get('r')) if cell.get('r') else len(row)
+                    row.extend([''] * (index - len(row)))
+                    row.append(value)
+                yield int(elem.get('r') or 0), row
+                elem.clear()
+
+def iter_google_sheet_rows(spreadsheet_id: str, tab: Optional[str] = None, session=None,
+                           block_rows: int = IMPORT['SHEETS_BLOCK_ROWS']) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Stream the rows of a Google Sheets tab in blocks of ``block_rows``.
+    """
+    if session is None:
+        from export.google_sheets import get_session
+        from config import SERVICE_ACCOUNT_FILE
+        session = get_session(SERVICE_ACCOUNT_FILE)
+    values_api = session.sheets().spreadsheets().values()
+    prefix = f"'{tab}'!" if tab else ""
+    start = 1
+    while True:
+        end = start + block_rows - 1
+        response = session.execute(values_api.get(
+            spreadsheetId=spreadsheet_id,
+            range=f"{prefix}A{start}:Z{end}",
+            valueRenderOption='UNFORMATTED_VALUE'
+        ))
+        rows = response.get('values', [])
+        for offset, row in enumerate(rows):
+            yield start + offset, [str(value) for value in row]
+        if len(rows) < block_rows:
+            break
+        start = end + 1
+
+def iter_file_rows(path: str) -> Iterator[Tuple[int, List[str]]]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        return iter_xlsx_rows(path)
+    if extension in ('.csv', '.txt', '.tsv'):
+        return iter_csv_rows(path)
+    raise ValueError(f"Неподдържан формат на файла: {extension}")
+
+def map_header(row: List[str]) -> Dict[str, int]:
+    columns = {}
+    for index, cell in enumerate(row):
+        label = cell.strip().lower()
+        for field, aliases in COLUMN_ALIASES.items():
+            if label in aliases and field not in columns:
+                columns[field] = index
+    return columns
+
+def _number(value: str) -> float:
+    return float(value.strip().replace(' ', '').replace(',', '.'))
+
+def iter_parts(rows: Iterable[Tuple[int, List[str]]], first_id: int = 1) -> Iterator[Tuple[int, Optional[Part], Optional[str]]]:
+    """
+    Validate rows as they are read and yield ``(row_number, part, error)``.
+
+    The first non-empty row is the header. Exactly one of ``part`` and
+    ``error`` is set for every data row; blank rows are skipped.
+    """
+    columns = None
+    next_id = first_id
+    for row_number, row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        if columns is None:
+            columns = map_header(row)
+            missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+            if missing:
+                yield row_number, None, f"Липсващи колони в заглавния ред: {', '.join(missing)}"
+                return
+            continue
+
+        def cell(field: str, default: str = "") -> str:
+            index = columns.get(field)
+            if index is None or index >= len(row):
+                return default
+            return row[index].strip()
+
+        try:
+            width = _number(cell('width'))
+            height = _number(cell('height'))
+        except ValueError:
+            yield row_number, None, f"Невалидни размери: '{cell('width')}' x '{cell('height')}'"
+            continue
+        try:
+            qty = _number(cell('qty'))
+        except ValueError:
+            yield row_number, None, f"Невалидно количество: '{cell('qty')}'"
+            continue
+        try:
+            thickness = _number(cell('thickness', "0") or "0")
+        except ValueError:
+            yield row_number, None, f"Невалидна дебелина: '{cell('thickness')}'"
+            continue
+        if width <= 0 or height <= 0:
+            yield row_number, None, "Размерите трябва да са положителни"
+            continue
+        if qty <= 0 or not qty.is_integer():
+            yield row_number, None, f"Количеството трябва да е цяло положително число: '{cell('qty')}'"
+            continue
+        ref = cell('ref') or f"P{next_id}"
+        yield row_number, Part(next_id, ref, cell('name') or ref, cell('material'), thickness, width, height, int(qty)), None
+        next_id += 1
+
+def iter_part_batches(rows: Iterable[Tuple[int, List[str]]], first_id: int = 1,
+                      batch_size: int = IMPORT['BATCH_SIZE']) -> Iterator[Tuple[List[Part], List[Tuple[int, str]]]]:
+    parts = []
+    errors = []
+    for row_number, part, error in iter_parts(rows, first_id):
+        if part is not None:
+            parts.append(part)
+        else:
+            errors.append((row_number, error))
+        if len(parts) + len(errors) >= batch_size:
+            yield parts, errors
+            parts = []
+            errors = []
+    if parts or errors:
+        yield parts, errors
@@ -0,0 +1,299 @@
+"""
+Parts list model and virtualized Treeview binding for the sheet cutting app.
+
+PartsListModel owns the parts in display order under stable item IDs and
+records every edit for undo/redo. Each edit, however many parts it
+touches, sends one notification with the first index and the item IDs in
+display order. PartsTreeview mirrors the model into a
+ttk.Treeview: short lists are kept in sync item by item, long lists are
+rendered as a window of the visible rows only.
+"""
+import tkinter as tk
+from typing import List, Dict, Callable, Iterator, Optional, Tuple, Any
+from models.part import Part
+from config import PARTS_LIST
+
+class PartsListModel:
+    def __init__(self):
+        self._parts: Dict[str, Part] = {}
+        self._order: List[str] = []
+        # iid -> position in _order; rebuilt once after an edit that shifts positions
+        self._positions: Optional[Dict[str, int]] = {}
+        self._listeners: List[Callable[[str, int, List[str]], None]] = []
+        self._undo: List[Tuple[Any, ...]] = []
+        self._redo: List[Tuple[Any, ...]] = []
+        self._next_iid = 1
+
+    def add_listener(self, callback: Callable[[str, int, List[str]], None]):
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, index: int, iids: List[str]):
+        for callback in self._listeners:
+            callback(event, index, iids)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[Part]:
+        for iid in self._order:
+            yield self._parts[iid]
+
+    def __contains__(self, iid: str) -> bool:
+        return iid in self._parts
+
+    def get(self, iid: str) -> Part:
+        return self._parts[iid]
+
+    def _position_map(self) -> Dict[str, int]:
+        if self._positions is None:
+            self._positions = {iid: index for index, iid in enumerate(self._order)}
+        return self._positions
+
+    def index(self, iid: str) -> int:
+        return self._position_map()[iid]
+
+    def iids(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        return self._order[start:stop]
+
+    def next_part_id(self) -> int:
+        return max((part.id for part in self._parts.values()), default=0) + 1
+
+    def _new_iid(self) -> str:
+        iid = f"part{self._next_iid}"
+        self._next_iid += 1
+        return iid
+
+    def _insert(self, index: int, iids: List[str], parts: List[Part]):
+        for iid, part in zip(iids, parts):
+            self._parts[iid] = part
+        if index == len(self._order) and self._positions is not None:
+            # Appending (e.g. an import) leaves the other positions as they are
+            self._positions.update((iid, index + offset) for offset, iid in enumerate(iids))
+        else:
+            self._positions = None
+        self._order[index:index] = iids
+        self._notify("insert", index, iids)
+
+    def _delete(self, iids: List[str]) -> List[Tuple[int, str, Part]]:
+        """
+        Remove the parts and return (original index, iid, part) in display order.
+        """
+        positions = self._position_map()
+        removed = sorted(((positions[iid], iid, self._parts.pop(iid)) for iid in dict.fromkeys(iids)),
+                         key=lambda entry: entry[0])
+        if not removed:
+            return removed
+        gone = {iid for _, iid, _ in removed}
+        self._order = [iid for iid in self._order if iid not in gone]
+        self._positions = None
+        self._notify("delete", removed[0][0], [iid for _, iid, _ in removed])
+        return removed
+
+    def _restore(self, removed: List[Tuple[int, str, Part]]):
+        # Indices are ascending and refer to the list before the delete, so merging in order puts each part back
+        remaining = iter(self._order)
+        order: List[str] = []
+        for index, iid, part in removed:
+            while len(order) < index:
+                order.append(next(remaining))
+            order.append(iid)
+            self._parts[iid] = part
+        order.extend(remaining)
+        self._order = order
+        self._positions = None
+        self._notify("insert", removed[0][0], [iid for _, iid, _ in removed])
+
+    def _record(self, entry: Tuple[Any, ...]):
+        self._undo.append(entry)
+        if len(self._undo) > PARTS_LIST['UNDO_LIMIT']:
+            del self._undo[0]
+        self._redo.clear()
+
+    def insert(self, part: Part, index: Optional[int] = None) -> str:
+        return self.insert_many([part], index)[0]
+
+    def insert_many(self, parts: List[Part], index: Optional[int] = None, group: Optional[object] = None) -> List[str]:
+        """
+        Insert a block of parts as one edit.
+
+        Consecutive calls with the same ``group`` (e.g. the batches of one
+        bulk import) are undone together.
+        """
+        if index is None:
+            index = len(self._order)
+        iids = [self._new_iid() for _ in parts]
+        self._insert(index, iids, list(parts))
+        if group is not None and self._undo and self._undo[-1][0] == "insert" and self._undo[-1][2] is group:
+            self._undo[-1][1].extend(iids)
+            self._redo.clear()
+        else:
+            self._record(("insert", iids, group))
+        return iids
+
+    def update(self, iid: str, part: Part):
+        old = self._parts[iid]
+        self._parts[iid] = part
+        self._record(("update", iid, old))
+        self._notify("update", self.index(iid), [iid])
+
+    def delete(self, iids: List[str]):
+        removed = self._delete([iid for iid in iids if iid in self._parts])
+        if removed:
+            self._record(("delete", removed))
+
+    def clear(self):
+        self.delete(list(self._order))
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def _apply(self, entry: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        kind = entry[0]
+        if kind == "insert":
+            return ("delete", self._delete(entry[1]))
+        if kind == "delete":
+            self._restore(entry[1])
+            return ("insert", [iid for _, iid, _ in entry[1]], None)
+        iid, part = entry[1], entry[2]
+        old = self._parts[iid]
+        self._parts[iid] = part
+        self._notify("update", self.index(iid), [iid])
+        return ("update", iid, old)
+
+    def undo(self) -> bool:
+        if not self._undo:
+            return False
+        self._redo.append(self._apply(self._undo.pop()))
+        return True
+
+    def redo(self) -> bool:
+        if not self._redo:
+            return False
+        self._undo.append(self._apply(self._redo.pop()))
+        return True
+
+class PartsTreeview:
+    """
+    Keeps a ttk.Treeview in sync with a PartsListModel.
+
+    Up to PARTS_LIST['VIRTUAL_THRESHOLD'] parts every model item has a
+    Treeview item with the same ID and edits are applied one item at a
+    time. Above that only the rows that fit in the widget are created and
+    the scrollbar drives which slice of the model they show.
+    """
+    def __init__(self, treeview, scrollbar, model: PartsListModel, row_values: Callable[[Part], tuple]):
+        self.treeview = treeview
+        self.scrollbar = scrollbar
+        self.model = model
+        self.row_values = row_values
+        self.virtual = False
+        self.first = 0
+        self.selection: List[str] = []
+        self.rendered_selection: Tuple[str, ...] = ()
+        model.add_listener(self.on_model_changed)
+        self.treeview.bind("<Configure>", lambda event: self.virtual and self.render_window())
+        self.treeview.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.treeview.bind("<Button-4>", lambda event: self.scroll_units(-3))
+        self.treeview.bind("<Button-5>", lambda event: self.scroll_units(3))
+        self.treeview.bind("<<TreeviewSelect>>", self.on_select, add="+")
+        self.refresh()
+
+    def page_size(self) -> int:
+        height = self.treeview.winfo_height()
+        if height <= 1:
+            return int(self.treeview.cget("height")) or PARTS_LIST['DEFAULT_PAGE']
+        # One row's worth of height goes to the column headings
+        return max(1, height // PARTS_LIST['ROW_HEIGHT'] - 1)
+
+    def refresh(self):
+        self.virtual = len(self.model) > PARTS_LIST['VIRTUAL_THRESHOLD']
+        self.treeview.delete(*self.treeview.get_children())
+        if self.virtual:
+            self.scrollbar.configure(command=self.on_scrollbar)
+            self.treeview.configure(yscrollcommand="")
+            self.render_window()
+        else:
+            self.scrollbar.configure(command=self.treeview.yview)
+            self.treeview.configure(yscrollcommand=self.scrollbar.set)
+            for iid in self.model.iids():
+                self.treeview.insert("", "end", iid=iid, values=self.row_values(self.model.get(iid)))
+
+    def render_window(self):
+        total = len(self.model)
+        page = self.page_size()
+        self.first = max(0, min(self.first, total - page))
+        iids = self.model.iids(self.first, self.first + page)
+        self.treeview.delete(*self.treeview.get_children())
+        for iid in iids:
+            self.treeview.insert("", "end", iid=iid, values=self.row_values(self.model.get(iid)))
+        visible = [iid for iid in self.selection if iid in iids]
+        self.rendered_selection = tuple(visible)
+        if visible:
+            self.treeview.selection_set(visible)
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + page) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def on_model_changed(self, event: str, index: int, iids: List[str]):
+        if self.virtual != (len(self.model) > PARTS_LIST['VIRTUAL_THRESHOLD']):
+            self.refresh()
+            return
+        if self.virtual:
+            if event == "update" and not self.treeview.exists(iids[0]):
+                return
+            self.render_window()
+            return
+        if event == "insert":
+            # The inserted items need not be contiguous (undo of a scattered delete); they come in display order
+            at_end = index + len(iids) == len(self.model)
+            for iid in iids:
+                self.treeview.insert("", "end" if at_end else self.model.index(iid), iid=iid,
+                                     values=self.row_values(self.model.get(iid)))
+        elif event == "delete":
+            self.treeview.delete(*[iid for iid in iids if self.treeview.exists(iid)])
+        elif event == "update":
+            self.treeview.item(iids[0], values=self.row_values(self.model.get(iids[0])))
+
+    def on_select(self, event=None):
+        current = tuple(self.treeview.selection())
+        if self.virtual and current == self.rendered_selection:
+            # Echo of our own re-render; keep the selection of rows scrolled out of view
+            return
+        self.selection = list(current)
+        self.rendered_selection = current
+
+    def selected(self) -> List[str]:
+        return [iid for iid in self.selection if iid in self.model]
+
+    def scroll_units(self, units: int):
+        if self.virtual:
+            self.first += units
+            self.render_window()
+            return "break"
+        return None
+
+    def on_mouse_wheel(self, event):
+        return self.scroll_units(-3 if event.delta > 0 else 3)
+
+    def on_scrollbar(self, *args):
+        page = self.page_size()
+        if args[0] == tk.MOVETO:
+            self.first = int(float(args[1]) * len(self.model))
+        elif args[0] == tk.SCROLL:
+            step = page if args[2] == tk.PAGES else 1
+            self.first += int(args[1]) * step
+        self.render_window()
+
+    def see(self, iid: str):
+        if not self.virtual:
+            self.treeview.see(iid)
+            return
+        index = self.model.index(iid)
+        page = self.page_size()
+        if not self.first <= index < self.first + page:
+            self.first = max(0, index - page // 2)
+            self.render_window()
@@ -0,0 +1,270 @@
+"""
+Binary save/load of cutting plans for the sheet cutting app.
+
+File layout (all integers little-endian):
+
+    header      magic, version, flags, sheet count, group count and the
+                offsets of the string table, group table and sheet index
+    sheets      one block per sheet: a fixed record (size, group, placement
+                count, utilization, metadata string, repeat count) followed
+                by the packed placement columns (part ids, ref ids, x, y,
+                width, height, spacing x/y/width/height, rotated flags, and
+                from version 2 the order id of every placement)
+    strings     deduplicated UTF-8 strings (refs, order ids, materials, sheet
+                metadata); from version 3 the count, an offset table and
+                the string bytes, before that length-prefixed strings
+    groups      (material, thickness) pairs referenced by the sheet blocks
+    index       offset, placement count and group of every sheet block
+
+The writer streams sheet blocks to disk and appends the tables on close.
+The reader memory-maps the file and only decodes the group and sheet
+tables up front. Strings are decoded on first use, so a single sheet can be
+read without touching the rest of the archive.
+"""
+from array import array
+from typing import List, Dict, Tuple, Iterator, Iterable, Optional
+from models.part import PlacementBatch, Sheet
+import json
+import mmap
+import struct
+import sys
+
+PLAN_MAGIC = b"DSAWPLAN"
+PLAN_VERSION = 3
+STRING_CACHE_SIZE = 4096
+
+_HEADER = struct.Struct('<8sHHIIQQQ')
+_SHEET = struct.Struct('<ddIIdII')
+_INDEX = struct.Struct('<QII')
+_GROUP = struct.Struct('<Id')
+_COUNT = struct.Struct('<I')
+_FLOAT_COLUMNS = ('xs', 'ys', 'widths', 'heights', 'spacing_xs', 'spacing_ys', 'spacing_widths', 'spacing_heights')
+_SWAP = sys.byteorder != 'little'
+
+def _column_bytes(values: array) -> bytes:
+    if _SWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _read_column(typecode: str, view: memoryview, offset: int, count: int) -> Tuple[array, int]:
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    values.frombytes(view[offset:end])
+    if _SWAP:
+        values.byteswap()
+    return values, end
+
+class PlanWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.groups: List[Tuple[int, float]] = []
+        self.group_ids: Dict[Tuple[str, float], int] = {}
+        self.index: List[Tuple[int, int, int]] = []
+        self.file.write(b"\0" * _HEADER.size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _string_id(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+        return string_id
+
+    def _group_id(self, material: str, thickness: float) -> int:
+        key = (material, thickness)
+        group_id = self.group_ids.get(key)
+        if group_id is None:
+            group_id = len(self.groups)
+            self.groups.append((self._string_id(material), float(thickness)))
+            self.group_ids[key] = group_id
+        return group_id
+
+    def write_sheet(self, sheet: Sheet):
+        batch = sheet.batch
+        count = len(batch)
+        group_id = self._group_id(sheet.material, sheet.thickness)
+        meta = json.dumps({
+            'algorithm': sheet.algorithm,
+            'sort_method': sheet.sort_method,
+            'efficiency': sheet.efficiency
+        }, ensure_ascii=False)
+        offset = self.file.tell()
+        self.file.write(_SHEET.pack(
+            float(sheet.size[0]), float(sheet.size[1]), group_id, count,
+            float(sheet.utilization), self._string_id(meta), sheet.repeat))
+        self.file.write(_column_bytes(array('q', batch.part_ids)))
+        self.file.write(_column_bytes(array('I', (self._string_id(ref) for ref in batch.refs))))
+        for name in _FLOAT_COLUMNS:
+            self.file.write(_column_bytes(getattr(batch, name)))
+        self.file.write(batch.rotated.tobytes())
+        self.file.write(_column_bytes(array('I', (self._string_id(order_id) for order_id in batch.order_ids))))
+        self.index.append((offset, count, group_id))
+
+    def close(self):
+        if self.file.closed:
+            return
+        strings_offset = self.file.tell()
+        encoded = [value.encode('utf-8') for value in self.strings]
+        # Offsets into the string bytes, with the end as the last entry
+        offsets = array('Q', [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        self.file.write(_COUNT.pack(len(self.strings)))
+        self.file.write(_column_bytes(offsets))
+        self.file.write(b"".join(encoded))
+        groups_offset = self.file.tell()
+        self.file.write(_COUNT.pack(len(self.groups)))
+        for material_id, thickness in self.groups:
+            self.file.write(_GROUP.pack(material_id, thickness))
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(_INDEX.pack(*entry))
+        self.file.seek(0)
+        self.file.write(_HEADER.pack(
+            PLAN_MAGIC, PLAN_VERSION, 0, len(self.index), len(self.groups),
+            strings_offset, groups_offset, index_offset))
+        self.file.close()
+
+class PlanReader:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is not a cutting plan file")
+        self.view = memoryview(self.map)
+        if len(self.view) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a cutting plan file")
+        magic, version, _, sheet_count, group_count, strings_offset, groups_offset, index_offset = \
+            _HEADER.unpack_from(self.view, 0)
+        if magic != PLAN_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a cutting plan file")
+        if version > PLAN_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported plan file version {version}")
+        self.version = version
+        self._string_cache: Dict[int, str] = {}
+        self._index_strings(strings_offset)
+        self.groups = [
+            (self.string(material_id), thickness)
+            for material_id, thickness in _GROUP.iter_unpack(
+                self.view[groups_offset + _COUNT.size:groups_offset + _COUNT.size + group_count * _GROUP.size])
+        ]
+        self.index = list(_INDEX.iter_unpack(self.view[index_offset:index_offset + sheet_count * _INDEX.size]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[Sheet]:
+        for index in range(len(self.index)):
+            yield self.read_sheet(index)
+
+    def _index_strings(self, offset: int):
+        (count,) = _COUNT.unpack_from(self.view, offset)
+        offset += _COUNT.size
+        if self.version >= 3:
+            self._string_offsets, self._string_base = _read_column('Q', self.view, offset, count + 1)
+            return
+        # Older files have length-prefixed strings; walk them once without decoding
+        offsets = array('Q', [0])
+        base = offset
+        for _ in range(count):
+            (length,) = _COUNT.unpack_from(self.view, offset)
+            offset += _COUNT.size + length
+            offsets.append(offset - base)
+        self._string_offsets = offsets
+        self._string_base = base
+
+    def string(self, string_id: int) -> str:
+        value = self._string_cache.get(string_id)
+        if value is None:
+            start = self._string_base + self._string_offsets[string_id]
+            end = self._string_base + self._string_offsets[string_id + 1]
+            if self.version < 3:
+                start += _COUNT.size
+            value = str(self.view[start:end], 'utf-8')
+            if len(self._string_cache) >= STRING_CACHE_SIZE:
+                self._string_cache.clear()
+            self._string_cache[string_id] = value
+        return value
+
+    def placement_count(self, index: Optional[int] = None) -> int:
+        if index is None:
+            return sum(entry[1] for entry in self.index)
+        return self.index[index][1]
+
+    def sheets_in_group(self, material: str, thickness: float) -> List[int]:
+        if (material, thickness) not in self.groups:
+            return []
+        group_id = self.groups.index((material, thickness))
+        return [i for i, entry in enumerate(self.index) if entry[2] == group_id]
+
+    def read_sheet(self, index: int) -> Sheet:
+        offset, count, _ = self.index[index]
+        width, height, group_id, _, utilization, meta_id, repeat = _SHEET.unpack_from(self.view, offset)
+        offset += _SHEET.size
+        batch = PlacementBatch()
+        batch.part_ids, offset = _read_column('q', self.view, offset, count)
+        ref_ids, offset = _read_column('I', self.view, offset, count)
+        batch.refs = [self.string(ref_id) for ref_id in ref_ids]
+        for name in _FLOAT_COLUMNS:
+            column, offset = _read_column('d', self.view, offset, count)
+            setattr(batch, name, column)
+        batch.rotated, offset = _read_column('b', self.view, offset, count)
+        if self.version >= 2:
+            order_ids, offset = _read_column('I', self.view, offset, count)
+            batch.order_ids = [self.string(order_id) for order_id in order_ids]
+        else:
+            batch.order_ids = [""] * count
+        material, thickness = self.groups[group_id]
+        meta = json.loads(self.string(meta_id))
+        return Sheet(
+            size=(int(width) if width.is_integer() else width, int(height) if height.is_integer() else height),
+            material=material,
+            thickness=thickness,
+            placements=batch,
+            algorithm=meta['algorithm'],
+            sort_method=meta['sort_method'],
+            utilization=utilization,
+            efficiency=meta['efficiency'],
+            # Files written before repeated patterns have 0 here
+            repeat=repeat or 1
+        )
+
+    def close(self):
+        if getattr(self, 'view', None) is not None:
+            self.view.release()
+            self.view = None
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+def save_plan(path: str, sheets: Iterable[Sheet]):
+    with PlanWriter(path) as writer:
+        for sheet in sheets:
+            writer.write_sheet(sheet)
+
+def load_plan(path: str) -> List[Sheet]:
+    with PlanReader(path) as reader:
+        return list(reader)
@@ -0,0 +1,315 @@
+"""
+Local planning service for the sheet cutting app.
+
+One service per shop packs the cutting lists of every workstation, so the
+CPU-heavy search runs once in a shared pool and identical lists are served
+from a cache. It speaks plain JSON over HTTP on localhost:
+
+    POST   /jobs        {"parts": [Part.to_dict()...], "sheet_sizes": [[w, h]...], "priority": 0}
+    GET    /jobs/<id>   job state; "sheets" holds Sheet.to_dict() records once done
+    DELETE /jobs/<id>   cancel a job that has not started yet
+    GET    /status      queue and worker counts
+
+Jobs with a higher priority are started first. Each worker process keeps
+one PackingEngine per set of sheet sizes.
+
+Usage:
+    python -m packing.service --port 8765 --workers 4
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from models.part import Part, Sheet
+from config import DEFAULT_SHEET_SIZES, PLANNING_SERVICE
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+# Engines of the current worker process, keyed by sheet sizes
+_engines: Dict[Tuple[Tuple[float, float], ...], Any] = {}
+
+def plan_parts(parts: List[Dict[str, Any]], sheet_sizes: List[Tuple[float, float]]) -> Dict[str, Any]:
+    from packing.engine import PackingEngine
+    key = tuple(tuple(size) for size in sheet_sizes)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = _engines[key] = PackingEngine([tuple(size) for size in sheet_sizes])
+    group_stats: Dict[Tuple[str, float], Dict[str, Any]] = {}
+    sheets = list(engine.iter_plan([Part.from_dict(part) for part in parts], lambda progress: None,
+                                   group_stats=group_stats))
+    bounds = [dict(group, material=material, thickness=thickness)
+              for (material, thickness), group in group_stats.items()]
+    return {'sheets': [sheet.to_dict() for sheet in sheets], 'bounds': bounds}
+
+class PlanJob:
+    def __init__(self, job_id: str, key: str, parts: List[Dict[str, Any]], sheet_sizes: List[Tuple[float, float]],
+                 priority: int = 0):
+        self.id = job_id
+        self.key = key
+        self.parts = parts
+        self.sheet_sizes = sheet_sizes
+        self.priority = priority
+        self.state = "queued"
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'state': self.state,
+            'priority': self.priority,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+        if self.result is not None:
+            data.update(self.result)
+        return data
+
+class PlanningService:
+    def __init__(self, host: str = PLANNING_SERVICE['HOST'], port: int = PLANNING_SERVICE['PORT'],
+                 workers: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.jobs: "OrderedDict[str, PlanJob]" = OrderedDict()
+        self.active: Dict[str, str] = {}
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.counter = itertools.count()
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.server = None
+        self.dispatchers: List[asyncio.Task] = []
+
+    async def start(self):
+        self.queue = asyncio.PriorityQueue()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.dispatchers = [asyncio.ensure_future(self.dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        # Port 0 picks a free port; report the real one
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Planning service on http://{self.host}:{self.port} with {self.workers} workers")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    def submit(self, parts: List[Dict[str, Any]], sheet_sizes: List[Tuple[float, float]], priority: int = 0) -> PlanJob:
+        """
+        Queue a cutting list, or answer it from the cache.
+
+        A list that is already queued or running returns the existing job.
+        """
+        # Validate here so a bad request fails at once instead of in a worker
+        for part in parts:
+            Part.from_dict(part)
+        sheet_sizes = [(float(w), float(h)) for w, h in sheet_sizes]
+        key = hashlib.sha256(json.dumps([parts, sheet_sizes], sort_keys=True).encode('utf-8')).hexdigest()
+        existing = self.jobs.get(self.active.get(key))
+        if existing is not None:
+            return existing
+        job = PlanJob(uuid.uuid4().hex, key, parts, sheet_sizes, priority)
+        self.jobs[job.id] = job
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            job.state = "done"
+            job.result = cached
+            job.started = job.finished = job.created
+        else:
+            self.active[key] = job.id
+            self.queue.put_nowait((-priority, next(self.counter), job.id))
+        self.prune_jobs()
+        return job
+
+    def cancel(self, job: PlanJob) -> bool:
+        if job.state != "queued":
+            return False
+        job.state = "cancelled"
+        job.parts = None
+        self.active.pop(job.key, None)
+        return True
+
+    def prune_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in ("done", "failed", "cancelled")]
+        for job_id in finished[:max(0, len(self.jobs) - PLANNING_SERVICE['KEEP_JOBS'])]:
+            del self.jobs[job_id]
+
+    async def dispatch(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            _, _, job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.state != "queued":
+                continue
+            job.state = "running"
+            job.started = time.time()
+            try:
+                job.result = await loop.run_in_executor(self.pool, plan_parts, job.parts, job.sheet_sizes)
+                job.state = "done"
+                self.cache[job.key] = job.result
+                if len(self.cache) > PLANNING_SERVICE['CACHE_SIZE']:
+                    self.cache.popitem(last=False)
+            except Exception as e:
+                job.state = "failed"
+                job.error = str(e) or type(e).__name__
+            job.finished = time.time()
+            job.parts = None
+            self.active.pop(job.key, None)
+
+    def status(self) -> Dict[str, Any]:
+        states = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {'workers': self.workers, 'jobs': states, 'cached': len(self.cache)}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, body = await self.route(reader)
+        except Exception as e:
+            status, body = 500, {'error': str(e)}
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        reason = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}.get(status, "")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode('ascii') + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def route(self, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any]]:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) < 2:
+            return 400, {'error': "Bad request line"}
+        method, path = request_line[0], request_line[1].split("?", 1)[0].rstrip("/")
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+        if length > PLANNING_SERVICE['MAX_BODY']:
+            return 413, {'error': "Request too large"}
+        body = await reader.readexactly(length) if length else b""
+        if path == "/status" and method == "GET":
+            return 200, self.status()
+        if path == "/jobs":
+            if method != "POST":
+                return 405, {'error': "Use POST"}
+            try:
+                request = json.loads(body.decode('utf-8'))
+                job = self.submit(request['parts'], request.get('sheet_sizes') or DEFAULT_SHEET_SIZES,
+                                  int(request.get('priority', 0)))
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {'error': f"Invalid job: {e}"}
+            return 202, job.to_dict()
+        if path.startswith("/jobs/"):
+            job = self.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                return 404, {'error': "Unknown job"}
+            if method == "GET":
+                return 200, job.to_dict()
+            if method == "DELETE":
+                if not self.cancel(job):
+                    return 409, {'error': f"Job is {job.state}"}
+                return 200, job.to_dict()
+            return 405, {'error': "Use GET or DELETE"}
+        return 404, {'error': "Not found"}
+
+class PlanningClient:
+    """
+    Blocking client for the planning service, safe to use from a worker thread.
+    """
+    def __init__(self, url: str = PLANNING_SERVICE['URL'], timeout: float = PLANNING_SERVICE['TIMEOUT']):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8')).get('error')
+            except ValueError:
+                message = None
+            raise RuntimeError(message or f"HTTP {e.code}") from e
+
+    def submit(self, parts: List[Part], sheet_sizes: List[Tuple[float, float]], priority: int = 0) -> str:
+        job = self.request("POST", "/jobs", {
+            'parts': [part.to_dict() for part in parts],
+            'sheet_sizes': [list(size) for size in sheet_sizes],
+            'priority': priority
+        })
+        return job['id']
+
+    def poll(self, job_id: str) -> Dict[str, Any]:
+        return self.request("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        return self.request("DELETE", f"/jobs/{job_id}")
+
+    def status(self) -> Dict[str, Any]:
+        return self.request("GET", "/status")
+
+    def wait(self, job_id: str, interval: float = PLANNING_SERVICE['POLL_SECONDS'], timeout: Optional[float] = None,
+             on_state: Optional[Callable[[str], None]] = None) -> List[Sheet]:
+        deadline = time.time() + timeout if timeout is not None else None
+        state = None
+        while True:
+            job = self.poll(job_id)
+            if on_state is not None and job['state'] != state:
+                state = job['state']
+                on_state(state)
+            if job['state'] == "done":
+                return [Sheet.from_dict(sheet) for sheet in job['sheets']]
+            if job['state'] in ("failed", "cancelled"):
+                raise RuntimeError(job['error'] or job['state'])
+            if deadline is not None and time.time() > deadline:
+                raise TimeoutError(f"Job {job_id} is still {job['state']}")
+            time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Локална услуга за изчисляване на планове за рязане")
+    parser.add_argument("--host", default=PLANNING_SERVICE['HOST'])
+    parser.add_argument("--port", type=int, default=PLANNING_SERVICE['PORT'])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    service = PlanningService(args.host, args.port, args.workers)
+    try:
+        asyncio.get_event_loop().run_until_complete(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
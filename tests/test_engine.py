@@ -0,0 +1,48 @@
+"""
+Exact solver gating in the packing engine.
+"""
+import random
+import pytest
+from models.part import Part
+from packing import engine as packing_engine
+from packing.engine import PackingEngine
+
+SHEET_SIZES = [(2800, 2070)]
+
+def make_group(seed, material="MDF", first_id=1):
+    generator = random.Random(seed)
+    return [Part(first_id + index, f"P{first_id + index}", f"Част {first_id + index}", material, 18.0,
+                 generator.randint(30, 140) * 10, generator.randint(25, 100) * 10, generator.randint(1, 5))
+            for index in range(generator.randint(1, 10))]
+
+@pytest.fixture
+def exact_calls(monkeypatch):
+    calls = []
+    exact_plan = PackingEngine.exact_plan
+
+    def counting_exact_plan(self, pieces, group_sheets, bounds, material, thickness, time_limit):
+        calls.append((material, time_limit))
+        return exact_plan(self, pieces, group_sheets, bounds, material, thickness, time_limit)
+
+    monkeypatch.setattr(PackingEngine, "exact_plan", counting_exact_plan)
+    return calls
+
+def test_exact_search_skipped_when_a_proof_is_implausible(exact_calls, monkeypatch):
+    # 27 pieces of 8 types, one sheet above the bound: the search never proves anything here
+    parts = make_group(0)
+    monkeypatch.setitem(packing_engine.EXACT, 'MAX_SEARCH_SIZE', 1000)
+    assert PackingEngine(SHEET_SIZES).calculate_plan(parts, lambda progress: None)
+    assert exact_calls == []
+
+def test_exact_budget_is_shared_by_the_groups_of_a_call(exact_calls, monkeypatch):
+    monkeypatch.setitem(packing_engine.EXACT, 'TIME_LIMIT', 0.5)
+    monkeypatch.setitem(packing_engine.EXACT, 'TOTAL_TIME', 0.8)
+    parts = []
+    for seed, material in ((9, "MDF"), (83, "ПДЧ"), (173, "Шперплат")):
+        parts.extend(make_group(seed, material, len(parts) + 1))
+    stats = {}
+    assert PackingEngine(SHEET_SIZES).calculate_plan(parts, lambda progress: None, group_stats=stats)
+    assert len(stats) == 3
+    assert exact_calls and all(limit <= 0.5 for _, limit in exact_calls)
+    assert sum(limit for _, limit in exact_calls) <= 0.8 + 0.5
+    assert len(exact_calls) < 3
@@ -0,0 +1,184 @@
+"""
+Google Sheets export against a local stand-in for the HTTP transport.
+"""
+import json
+import threading
+import httplib2
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from export import google_sheets
+from export.google_sheets import SheetsSession, GoogleSheetsExporter, SheetMetadataCache
+from models.part import Sheet, PlacementBatch
+
+class FakeHttp:
+    """
+    Scripted httplib2.Http: records every request and answers like the Sheets and Drive APIs.
+
+    ``failures`` maps the end of a request path to the statuses returned
+    for the next requests to it in turn (None lets a request through).
+    """
+    def __init__(self, tabs=None, failures=None):
+        self.tabs = tabs or {}
+        self.failures = {suffix: list(statuses) for suffix, statuses in (failures or {}).items()}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        path = uri.split("?")[0]
+        with self.lock:
+            self.requests.append((method, path, json.loads(body) if body else None))
+            pending = next((statuses for suffix, statuses in self.failures.items() if path.endswith(suffix)), None)
+            status = pending.pop(0) if pending else None
+        if status:
+            headers = {'status': status}
+            if status == 429:
+                headers['retry-after'] = "2"
+            return httplib2.Response(headers), json.dumps({'error': {'code': status, 'message': "injected"}}).encode()
+        if method == "POST" and path.endswith("/v4/spreadsheets"):
+            payload = {'spreadsheetId': "NEW", 'sheets': [{'properties': {'sheetId': 7}}]}
+        elif method == "GET" and "/v4/spreadsheets/" in path:
+            payload = {'sheets': [{'properties': {'sheetId': sheet_id, 'title': title}}
+                                  for title, sheet_id in self.tabs.items()]}
+        else:
+            payload = {}
+        return httplib2.Response({'status': 200}), json.dumps(payload).encode()
+
+    def close(self):
+        pass
+
+def make_sheets(count=2, placements=10):
+    sheets = []
+    for index in range(count):
+        batch = PlacementBatch()
+        for part_id in range(placements):
+            batch.append(part_id, f"P{part_id}", 10.0 * part_id, 20.0, part_id % 2 == 1, 300, 200)
+        sheets.append(Sheet((2800, 2070), "MDF", 18.0, batch, "MaxRects", "Площ", 0.75, {'waste_percent': 0.25}))
+    return sheets
+
+@pytest.fixture
+def loads(monkeypatch):
+    counts = {'credentials': 0, 'build': 0}
+
+    def from_service_account_file(path, scopes=None):
+        counts['credentials'] += 1
+        return AnonymousCredentials()
+
+    build = google_sheets.build
+
+    def counting_build(*args, **kwargs):
+        counts['build'] += 1
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(google_sheets.service_account.Credentials, "from_service_account_file",
+                        from_service_account_file)
+    monkeypatch.setattr(google_sheets, "build", counting_build)
+    return counts
+
+def exporter(http, tmp_path, spreadsheet_id=None, session=None):
+    session = session or SheetsSession("service_account.json", http_factory=http)
+    session.sleep = lambda delay: None
+    return GoogleSheetsExporter("service_account.json", session=session, spreadsheet_id=spreadsheet_id,
+                                metadata_cache=SheetMetadataCache(str(tmp_path / "metadata.json")))
+
+def test_session_loads_credentials_and_services_once(loads, tmp_path):
+    http = FakeHttp()
+    session = SheetsSession("service_account.json", http_factory=http)
+    for _ in range(3):
+        assert exporter(http, tmp_path, session=session).export_cutting_plan(make_sheets()) == "NEW"
+    assert loads['credentials'] == 1
+    # One discovery-based client each for Sheets and Drive
+    assert loads['build'] == 2
+
+def test_session_counts_requests_per_export(loads, tmp_path):
+    http = FakeHttp()
+    session = SheetsSession("service_account.json", http_factory=http)
+    exporter(http, tmp_path, session=session).export_cutting_plan(make_sheets())
+    first = session.request_count
+    exporter(http, tmp_path, session=session).export_cutting_plan(make_sheets())
+    assert session.request_count == 2 * first
+    assert len(http.requests) == session.request_count
+
+def test_warm_up_builds_services_before_export(loads, tmp_path):
+    http = FakeHttp()
+    session = SheetsSession("service_account.json", http_factory=http)
+    session.warm_up(background=False)
+    assert loads['build'] == 2 and loads['credentials'] == 1
+    exporter(http, tmp_path, session=session).export_cutting_plan(make_sheets())
+    assert loads['build'] == 2 and loads['credentials'] == 1
+
+def calls(http):
+    return [(method, path.rsplit("/", 1)[-1]) for method, path, _ in http.requests]
+
+def test_create_path_makes_four_requests(loads, tmp_path):
+    http = FakeHttp()
+    assert exporter(http, tmp_path).export_cutting_plan(make_sheets()) == "NEW"
+    # create, all values in one batchUpdate, formatting, public permission
+    assert len(http.requests) == 4
+    assert sorted(calls(http)) == sorted([("POST", "spreadsheets"), ("POST", "values:batchUpdate"),
+                                          ("POST", "NEW:batchUpdate"), ("POST", "permissions")])
+
+def test_append_path_makes_one_or_two_requests(loads, tmp_path):
+    http = FakeHttp(tabs={"Sheet1": 0})
+    assert exporter(http, tmp_path, "EX").export_cutting_plan(make_sheets()) == "EX"
+    # Cold metadata cache: fetch the tab titles, then one batchUpdate with tab, cells and formatting
+    assert calls(http) == [("GET", "EX"), ("POST", "EX:batchUpdate")]
+    http.requests.clear()
+    assert exporter(http, tmp_path, "EX").export_cutting_plan(make_sheets()) == "EX"
+    assert calls(http) == [("POST", "EX:batchUpdate")]
+    add_sheet = http.requests[0][2]['requests'][0]['addSheet']['properties']
+    assert add_sheet['sheetId'] == 2 and add_sheet['title'].endswith("(2)")
+
+def test_chunk_size_is_read_at_runtime(loads, tmp_path, monkeypatch):
+    monkeypatch.setitem(google_sheets.EXPORT, 'CHUNK_ROWS', 5)
+    http = FakeHttp()
+    exporter(http, tmp_path).export_cutting_plan(make_sheets(2, 10))
+    writes = [body for method, path, body in http.requests if path.endswith("values:batchUpdate")]
+    # 20 placement rows in chunks of 5
+    assert len(writes) == 4
+    assert sum(len(entry['values']) for body in writes for entry in body['data']) == 20 + 1 + 2 + 1
+
+def test_retries_rate_limits_and_server_errors(loads, tmp_path):
+    http = FakeHttp(failures={"/v4/spreadsheets": [429, 503]})
+    export = exporter(http, tmp_path)
+    delays = []
+    export.session.sleep = delays.append
+    assert export.export_cutting_plan(make_sheets()) == "NEW"
+    assert [path for _, path, _ in http.requests].count("https://sheets.googleapis.com/v4/spreadsheets") == 3
+    assert export.session.request_count == 4 + 2
+    # Retry-After is honoured; otherwise the delay is jittered below the exponential cap
+    assert delays[0] == 2.0
+    assert 0 <= delays[1] <= google_sheets.EXPORT['BACKOFF_BASE'] * 2
+    assert len(delays) == 2
+
+def test_gives_up_after_max_retries(loads, tmp_path):
+    http = FakeHttp(failures={"/v4/spreadsheets": [503] * 10})
+    export = exporter(http, tmp_path)
+    export.session.max_retries = 3
+    delays = []
+    export.session.sleep = delays.append
+    assert export.export_cutting_plan(make_sheets()) is False
+    assert len(http.requests) == 4 and len(delays) == 3
+    assert "503" in export.last_error
+
+def test_resumes_from_last_checkpoint(loads, tmp_path, monkeypatch):
+    monkeypatch.setitem(google_sheets.EXPORT, 'CHUNK_ROWS', 5)
+    sheets = make_sheets(2, 10)
+    http = FakeHttp(failures={"values:batchUpdate": [None, 400]})
+    export = exporter(http, tmp_path)
+    assert export.export_cutting_plan(sheets) is False
+    checkpoint = export.last_checkpoint
+    assert checkpoint['spreadsheet_id'] == "NEW"
+    assert checkpoint['rows_written'] == 5 and checkpoint['chunks_written'] == 1
+    assert checkpoint['shared'] is True
+    http.requests.clear()
+    assert export.export_cutting_plan(sheets, resume=checkpoint) == "NEW"
+    writes = [body for _, path, body in http.requests if path.endswith("values:batchUpdate")]
+    # The remaining 15 rows, below the placement header (row 5) and the 5 rows already written
+    assert len(writes) == 3
+    assert writes[0]['data'][0]['range'].endswith("!A11")
+    assert sum(len(body['data'][0]['values']) for body in writes) == 15
+    assert not any(path.endswith(("/v4/spreadsheets", "permissions")) for _, path, _ in http.requests)
+    assert export.last_checkpoint['rows_written'] == 20 and export.last_checkpoint['formatted']
@@ -0,0 +1,24 @@
+"""
+Order summaries of nested plans.
+"""
+from models.part import Part, Sheet, PlacementBatch
+from packing.nesting import Order, order_summary, placements_by_order
+
+def make_sheet(order_ids, repeat=1):
+    batch = PlacementBatch()
+    for index, order_id in enumerate(order_ids):
+        batch.append(index + 1, f"P{index + 1}", 10.0 + 300 * index, 10.0, False, 290, 200, order_id=order_id)
+    return Sheet((2800, 2070), "MDF", 18.0, batch, "MaxRects", "Площ", 0.5, {}, repeat)
+
+def test_repeated_sheets_are_numbered_as_physical_sheets():
+    orders = [Order("A", [Part(1, "P1", "Част 1", "MDF", 18.0, 290, 200, 8)]),
+              Order("B", [Part(1, "P1", "Част 1", "MDF", 18.0, 290, 200, 3)])]
+    sheets = [make_sheet(["A", "A"], repeat=3), make_sheet(["A", "B"], repeat=2), make_sheet(["B"])]
+    summary = {row['order_id']: row for row in order_summary(orders, sheets)}
+    assert summary["A"]['sheets'] == [1, 2, 3, 4, 5] and summary["A"]['last_sheet'] == 5
+    assert summary["B"]['sheets'] == [4, 5, 6] and summary["B"]['last_sheet'] == 6
+    assert summary["A"]['shared_sheets'] == summary["B"]['shared_sheets'] == 2
+    by_order = placements_by_order(sheets)
+    # One entry per piece cut
+    assert len(by_order["A"]) == 8 and len(by_order["B"]) == 3
+    assert sorted({number for number, _ in by_order["B"]}) == [4, 5, 6]
@@ -0,0 +1,86 @@
+"""
+Planning service and client on localhost.
+"""
+import asyncio
+import threading
+import pytest
+from models.part import Part
+from packing.engine import PackingEngine
+from packing.service import PlanningService, PlanningClient
+
+SHEET_SIZES = [(2800, 2070)]
+
+def make_parts(count, material="MDF"):
+    return [Part(index + 1, f"P{index + 1}", f"Част {index + 1}", material, 18.0,
+                 200 + (index * 37) % 500, 150 + (index * 53) % 400, 1 + index % 3)
+            for index in range(count)]
+
+@pytest.fixture
+def service():
+    loop = asyncio.new_event_loop()
+    # One worker, so a second job waits in the queue while the first one runs
+    service = PlanningService("127.0.0.1", 0, workers=1)
+    loop.run_until_complete(service.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield service
+    asyncio.run_coroutine_threadsafe(service.stop(), loop).result(60)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+@pytest.fixture
+def client(service):
+    return PlanningClient(f"http://127.0.0.1:{service.port}", timeout=10)
+
+def test_submit_and_poll(client):
+    parts = make_parts(12)
+    states = []
+    job_id = client.submit(parts, SHEET_SIZES)
+    sheets = client.wait(job_id, interval=0.05, timeout=120, on_state=states.append)
+    assert sum(len(sheet.batch) * sheet.repeat for sheet in sheets) == sum(part.qty for part in parts)
+    assert states[-1] == "done"
+    job = client.poll(job_id)
+    assert [group['material'] for group in job['bounds']] == ["MDF"]
+    assert job['bounds'][0]['sheets'] == sum(sheet.repeat for sheet in sheets)
+
+def test_cache_hit_and_merge(client):
+    parts = make_parts(12)
+    first = client.submit(parts, SHEET_SIZES)
+    # The same list while it is queued or running is the same job
+    assert client.submit(parts, SHEET_SIZES) == first
+    client.wait(first, interval=0.05, timeout=120)
+    second = client.submit(parts, SHEET_SIZES)
+    assert second != first
+    job = client.poll(second)
+    assert job['state'] == "done" and job['started'] == job['finished'] == job['created']
+    assert client.status()['cached'] == 1
+
+def test_cancel_queued_job(client):
+    running = client.submit(make_parts(80), SHEET_SIZES)
+    queued = client.submit(make_parts(10, "ПДЧ"), SHEET_SIZES)
+    assert client.cancel(queued)['state'] == "cancelled"
+    with pytest.raises(RuntimeError, match="cancelled"):
+        client.wait(queued, interval=0.05, timeout=10)
+    client.wait(running, interval=0.05, timeout=300)
+    # A job that has finished can no longer be cancelled
+    with pytest.raises(RuntimeError, match="done"):
+        client.cancel(running)
+    assert client.status()['jobs'] == {'done': 1, 'cancelled': 1}
+
+def test_invalid_job_is_rejected(client):
+    with pytest.raises(RuntimeError, match="Invalid job"):
+        client.request("POST", "/jobs", {'parts': [{'id': 1}]})
+    with pytest.raises(RuntimeError, match="Unknown job"):
+        client.poll("missing")
+
+def test_engine_keeps_group_stats_per_call():
+    engine = PackingEngine(SHEET_SIZES)
+    first, second = {}, {}
+    stream = engine.iter_plan(make_parts(6), lambda progress: None, group_stats=first)
+    # A second plan on the same engine while the first one is still streaming
+    next(stream)
+    list(engine.iter_plan(make_parts(6, "ПДЧ"), lambda progress: None, group_stats=second))
+    list(stream)
+    assert list(first) == [("MDF", 18.0)]
+    assert list(second) == [("ПДЧ", 18.0)]
@@ -2,20 +2,120 @@
 Visualization system for the sheet cutting app.
 """
 import tkinter as tk
-from tkinter import ttk, scrolledtext, Canvas, Frame, Scrollbar
-from typing import List
-from models.part import Sheet
+from tkinter import ttk, scrolledtext, messagebox, filedialog, Canvas, Frame, Scrollbar
+from typing import List, Iterable, Optional, Callable
+from models.part import PlacementBatch, Sheet, sheet_count
+from models.plan_file import save_plan
+from config import COLORS, THUMBNAIL, PLAN_FILE_TYPES, EXPORT_FILE_TYPES
+import threading
+import queue
+import weakref
+
+_thumbnail_cache = weakref.WeakKeyDictionary()
+_thumbnail_lock = threading.Lock()
+
+def render_thumbnail(sheet: Sheet, max_width: int = THUMBNAIL['WIDTH'], max_height: int = THUMBNAIL['HEIGHT']):
+    batch = sheet.batch
+    key = (max_width, max_height)
+    with _thumbnail_lock:
+        cached = _thumbnail_cache.get(sheet)
+    # The sheet gets a new batch whenever its placements change
+    if cached and cached[0] == key and cached[1] is batch:
+        return cached[2]
+    sheet_w, sheet_h = sheet.size
+    scale = min(max_width / sheet_w, max_height / sheet_h)
+    width = max(1, int(sheet_w * scale))
+    height = max(1, int(sheet_h * scale))
+    pixels = [[THUMBNAIL['BACKGROUND']] * width for _ in range(height)]
+    for px, py, pw, ph, rotated in zip(batch.xs, batch.ys, batch.widths, batch.heights, batch.rotated):
+        color = COLORS['ROTATED_PART'] if rotated else COLORS['NORMAL_PART']
+        if rotated:
+            pw, ph = ph, pw
+        x1 = min(width - 1, int(px * scale))
+        y1 = min(height - 1, int(py * scale))
+        x2 = min(width, max(x1 + 1, int((px + pw) * scale)))
+        y2 = min(height, max(y1 + 1, int((py + ph) * scale)))
+        run = [color] * (x2 - x1)
+        for row in pixels[y1:y2]:
+            row[x1:x2] = run
+    pixels[0] = pixels[-1] = [THUMBNAIL['BORDER']] * width
+    for row in pixels:
+        row[0] = row[-1] = THUMBNAIL['BORDER']
+    data = " ".join("{" + " ".join(row) + "}" for row in pixels)
+    thumbnail = (width, height, data)
+    with _thumbnail_lock:
+        _thumbnail_cache[sheet] = (key, batch, thumbnail)
+    return thumbnail
 
 class CuttingPlanVisualizer:
-    def __init__(self, root, sheets: List[Sheet]):
+    def __init__(self, root, sheets: Iterable[Sheet], export_queue=None):
         self.root = root
-        self.sheets = sheets
+        self.export_queue = export_queue
+        self.sheets = []
         self.current_hover_part = None
         self.zoom_level = 1.0
         self.pan_start_x = 0
         self.pan_start_y = 0
         self.panning = False
+        self.thumbnail_images = {}
+        self.thumbnail_queue = queue.Queue()
+        self.thumbnail_jobs = 0
+        self.overview = None
+        self.stream_queue = queue.Queue()
+        self.streaming = False
         self.create_window()
+        if isinstance(sheets, list):
+            self.add_sheets(sheets)
+        else:
+            self.consume(sheets)
+
+    def consume(self, sheets: Iterable[Sheet]):
+        """
+        Show sheets from an iterator (e.g. PackingEngine.iter_plan) as they are produced.
+
+        The iterator runs in a background thread; its sheets are added as
+        tabs from the Tk event loop.
+        """
+        def run():
+            try:
+                for sheet in sheets:
+                    self.stream_queue.put(("sheet", sheet))
+            except Exception as e:
+                self.stream_queue.put(("error", e))
+            self.stream_queue.put(("done", None))
+
+        self.streaming = True
+        self.update_title()
+        threading.Thread(target=run, daemon=True).start()
+        self.vis_window.after(50, self.poll_stream)
+
+    def poll_stream(self):
+        if not self.vis_window.winfo_exists():
+            return
+        arrived = []
+        while True:
+            try:
+                kind, value = self.stream_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "sheet":
+                arrived.append(value)
+                continue
+            self.streaming = False
+            if kind == "error":
+                messagebox.showerror("Грешка", f"Планът не можа да бъде изчислен: {value}", parent=self.vis_window)
+            break
+        if arrived:
+            self.add_sheets(arrived)
+        self.update_title()
+        if self.streaming:
+            self.vis_window.after(50, self.poll_stream)
+
+    def update_title(self):
+        title = "Визуализация на Плана на Разрязване"
+        if self.streaming:
+            title += f" (изчисляване... {sheet_count(self.sheets)} листа)"
+        self.vis_window.title(title)
 
     def create_window(self):
         self.vis_window = tk.Toplevel(self.root)
@@ -25,6 +125,8 @@ class CuttingPlanVisualizer:
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         notebook = ttk.Notebook(main_frame)
         notebook.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.notebook = notebook
+        self.sheet_tabs = []
         info_frame = ttk.LabelFrame(main_frame, text="Детайли за Частта", width=300)
         info_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
         self.part_info_text = scrolledtext.ScrolledText(
@@ -36,62 +138,224 @@ class CuttingPlanVisualizer:
             info_frame, wrap=tk.WORD, height=8, width=35)
         self.sheet_info_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.sheet_info_text.config(state=tk.DISABLED)
-        for i, sheet in enumerate(self.sheets, 1):
-            tab = ttk.Frame(notebook)
-            utilization = sheet.utilization * 100
-            waste_percent = sheet.efficiency['waste_percent'] * 100
-            notebook.add(tab, text=f"Лист {i} - {utilization:.1f}% използване")
-            canvas_container = Frame(tab)
-            canvas_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-            hscroll = Scrollbar(canvas_container, orient=tk.HORIZONTAL)
-            vscroll = Scrollbar(canvas_container, orient=tk.VERTICAL)
-            canvas = Canvas(
-                canvas_container,
-                bg="white",
-                xscrollcommand=hscroll.set,
-                yscrollcommand=vscroll.set
+        ttk.Button(info_frame, text="Запази плана", command=self.save_plan).pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(info_frame, text="Експорт към файл", command=self.export_file).pack(fill=tk.X, padx=5, pady=5)
+        if self.export_queue is not None:
+            ttk.Button(info_frame, text="Експорт към Google Sheets",
+                       command=self.export_to_google_sheets).pack(fill=tk.X, padx=5, pady=5)
+        notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def add_sheets(self, sheets: List[Sheet]):
+        first = len(self.sheets)
+        for sheet in sheets:
+            self.add_sheet_tab(sheet)
+        if not self.sheets:
+            return
+        if self.overview is None:
+            self.create_overview_tab(self.notebook)
+        else:
+            self.notebook.tab(self.overview, text=f"Преглед ({sheet_count(self.sheets)} листа)")
+        self.add_overview_cells(first)
+
+    def add_sheet_tab(self, sheet: Sheet):
+        notebook = self.notebook
+        self.sheets.append(sheet)
+        i = len(self.sheets)
+        tab = ttk.Frame(notebook)
+        utilization = sheet.utilization * 100
+        repeat = f" ×{sheet.repeat}" if sheet.repeat > 1 else ""
+        notebook.add(tab, text=f"Лист {i}{repeat} - {utilization:.1f}% използване")
+        canvas_container = Frame(tab)
+        canvas_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        hscroll = Scrollbar(canvas_container, orient=tk.HORIZONTAL)
+        vscroll = Scrollbar(canvas_container, orient=tk.VERTICAL)
+        canvas = Canvas(
+            canvas_container,
+            bg="white",
+            xscrollcommand=hscroll.set,
+            yscrollcommand=vscroll.set
+        )
+        hscroll.config(command=canvas.xview)
+        vscroll.config(command=canvas.yview)
+        canvas.grid(row=0, column=0, sticky="nsew")
+        vscroll.grid(row=0, column=1, sticky="ns")
+        hscroll.grid(row=1, column=0, sticky="ew")
+        canvas_container.grid_rowconfigure(0, weight=1)
+        canvas_container.grid_columnconfigure(0, weight=1)
+        tab.sheet = sheet
+        tab.canvas = canvas
+        tab.rendered = False
+        zoom_frame = Frame(tab)
+        zoom_frame.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Button(zoom_frame, text="Увеличи (1.2x)", 
+                  command=lambda t=tab: self.zoom(t, 1.2)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(zoom_frame, text="Намали (0.8x)", 
+                  command=lambda t=tab: self.zoom(t, 0.8)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(zoom_frame, text="Нулирай Изглед", 
+                  command=lambda t=tab: self.reset_view(t)).pack(side=tk.LEFT, padx=5)
+        status_bar = ttk.Label(tab, text="", relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        tab.status_bar = status_bar
+        tab.info_frame = self.part_info_text
+        tab.sheet_info = self.sheet_info_text
+        canvas.bind("<Motion>", lambda event, t=tab: self.on_canvas_motion(event, t))
+        canvas.bind("<ButtonPress-1>", lambda event, c=canvas: self.start_pan(event, c))
+        canvas.bind("<B1-Motion>", lambda event, c=canvas: self.pan(event, c))
+        canvas.bind("<ButtonRelease-1>", lambda event: self.end_pan(event))
+        canvas.bind("<Leave>", lambda event, t=tab: self.on_canvas_leave(t))
+        self.sheet_tabs.append(tab)
+
+    def create_overview_tab(self, notebook):
+        overview = ttk.Frame(notebook)
+        notebook.insert(0, overview, text=f"Преглед ({sheet_count(self.sheets)} листа)")
+        notebook.select(overview)
+        vscroll = Scrollbar(overview, orient=tk.VERTICAL)
+        canvas = Canvas(overview, bg="white", yscrollcommand=vscroll.set)
+        vscroll.config(command=canvas.yview)
+        vscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        canvas.bind("<MouseWheel>", lambda event: canvas.yview_scroll(-1 if event.delta > 0 else 1, "units"))
+        self.overview = overview
+        self.overview_canvas = canvas
+
+    def add_overview_cells(self, first):
+        canvas = self.overview_canvas
+        cell_w = THUMBNAIL['WIDTH'] + THUMBNAIL['PADDING']
+        cell_h = THUMBNAIL['HEIGHT'] + THUMBNAIL['PADDING'] + 20
+        columns = THUMBNAIL['COLUMNS']
+        for index, sheet in enumerate(self.sheets[first:], first):
+            x = THUMBNAIL['PADDING'] + (index % columns) * cell_w
+            y = THUMBNAIL['PADDING'] + (index // columns) * cell_h
+            tag = f"thumb{index}"
+            canvas.create_rectangle(
+                x, y, x + THUMBNAIL['WIDTH'], y + THUMBNAIL['HEIGHT'],
+                outline=COLORS['SPACING'], dash=(4, 2), tags=(tag,)
             )
-            hscroll.config(command=canvas.xview)
-            vscroll.config(command=canvas.yview)
-            canvas.grid(row=0, column=0, sticky="nsew")
-            vscroll.grid(row=0, column=1, sticky="ns")
-            hscroll.grid(row=1, column=0, sticky="ew")
-            canvas_container.grid_rowconfigure(0, weight=1)
-            canvas_container.grid_columnconfigure(0, weight=1)
-            tab.sheet = sheet
-            tab.canvas = canvas
-            self.generate_sheet_vector(canvas, sheet)
-            zoom_frame = Frame(tab)
-            zoom_frame.pack(fill=tk.X, padx=10, pady=5)
-            ttk.Button(zoom_frame, text="Увеличи (1.2x)", 
-                      command=lambda t=tab: self.zoom(t, 1.2)).pack(side=tk.LEFT, padx=5)
-            ttk.Button(zoom_frame, text="Намали (0.8x)", 
-                      command=lambda t=tab: self.zoom(t, 0.8)).pack(side=tk.LEFT, padx=5)
-            ttk.Button(zoom_frame, text="Нулирай Изглед", 
-                      command=lambda t=tab: self.reset_view(t)).pack(side=tk.LEFT, padx=5)
-            status_bar = ttk.Label(tab, text="", relief=tk.SUNKEN, anchor=tk.W)
-            status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-            overlap_status = self.validate_placements(sheet.placements)
-            eff = sheet.efficiency
-            status_text = (f"{overlap_status} | "
-                           f"Алгоритъм: {sheet.algorithm} | "
-                           f"Използване: {utilization:.1f}% | "
-                           f"Отпадък: {waste_percent:.1f}% | "
-                           f"Плътност: {eff['density']:.1f} части/m²")
-            status_bar.config(text=status_text)
-            tab.status_bar = status_bar
-            tab.info_frame = self.part_info_text
-            tab.sheet_info = self.sheet_info_text
-            canvas.bind("<Motion>", lambda event, t=tab: self.on_canvas_motion(event, t))
-            canvas.bind("<ButtonPress-1>", lambda event, c=canvas: self.start_pan(event, c))
-            canvas.bind("<B1-Motion>", lambda event, c=canvas: self.pan(event, c))
-            canvas.bind("<ButtonRelease-1>", lambda event: self.end_pan(event))
-            canvas.bind("<Leave>", lambda event, t=tab: self.on_canvas_leave(t))
+            canvas.create_text(
+                x, y + THUMBNAIL['HEIGHT'] + 4,
+                text=(f"Лист {index + 1}{f' ×{sheet.repeat}' if sheet.repeat > 1 else ''} - "
+                      f"{sheet.utilization * 100:.1f}% | {sheet.size[0]}x{sheet.size[1]}"),
+                anchor="nw", font=("Arial", 8), tags=(tag,)
+            )
+            canvas.tag_bind(tag, "<Button-1>", lambda event, t=self.sheet_tabs[index]: self.notebook.select(t))
+            canvas.tag_bind(tag, "<Enter>", lambda event: canvas.config(cursor="hand2"))
+            canvas.tag_bind(tag, "<Leave>", lambda event: canvas.config(cursor=""))
+        rows = (len(self.sheets) + columns - 1) // columns
+        canvas.config(scrollregion=(0, 0, columns * cell_w + THUMBNAIL['PADDING'], rows * cell_h + THUMBNAIL['PADDING']))
+        threading.Thread(target=self.render_thumbnails, args=(first, self.sheets[first:]), daemon=True).start()
+        self.thumbnail_jobs += 1
+        if self.thumbnail_jobs == 1:
+            self.vis_window.after(30, self.poll_thumbnails)
+
+    def render_thumbnails(self, first, sheets):
+        for index, sheet in enumerate(sheets, first):
+            try:
+                self.thumbnail_queue.put((index, render_thumbnail(sheet)))
+            except Exception as e:
+                print(f"Thumbnail {index + 1} failed: {e}")
+        self.thumbnail_queue.put(None)
+
+    def poll_thumbnails(self):
+        if not self.vis_window.winfo_exists():
+            return
+        canvas = self.overview_canvas
+        columns = THUMBNAIL['COLUMNS']
+        cell_w = THUMBNAIL['WIDTH'] + THUMBNAIL['PADDING']
+        cell_h = THUMBNAIL['HEIGHT'] + THUMBNAIL['PADDING'] + 20
+        budget = 50
+        while budget:
+            try:
+                item = self.thumbnail_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.thumbnail_jobs -= 1
+                if not self.thumbnail_jobs:
+                    return
+                continue
+            index, (width, height, data) = item
+            image = tk.PhotoImage(master=self.vis_window, width=width, height=height)
+            image.put(data, to=(0, 0))
+            self.thumbnail_images[index] = image
+            x = THUMBNAIL['PADDING'] + (index % columns) * cell_w
+            y = THUMBNAIL['PADDING'] + (index // columns) * cell_h
+            canvas.create_image(x, y, image=image, anchor="nw", tags=(f"thumb{index}",))
+            budget -= 1
+        self.vis_window.after(30, self.poll_thumbnails)
+
+    def on_tab_changed(self, event):
+        tab = self.notebook.nametowidget(self.notebook.select())
+        if getattr(tab, "sheet", None) is not None and not tab.rendered:
+            self.render_tab(tab)
+
+    def render_tab(self, tab):
+        sheet = tab.sheet
+        self.generate_sheet_vector(tab.canvas, sheet)
+        overlap_status = self.validate_placements(sheet.batch)
+        eff = sheet.efficiency
+        status_text = (f"{overlap_status} | "
+                       f"Алгоритъм: {sheet.algorithm} | "
+                       f"Използване: {sheet.utilization * 100:.1f}% | "
+                       f"Отпадък: {eff['waste_percent'] * 100:.1f}% | "
+                       f"Плътност: {eff['density']:.1f} части/m²")
+        if 'machine_time' in eff:
+            status_text += f" | Машинно време: {eff['machine_time'] / 60:.1f} мин"
+        tab.status_bar.config(text=status_text)
+        tab.rendered = True
+
+    def save_plan(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.vis_window,
+            defaultextension=".dsplan",
+            filetypes=PLAN_FILE_TYPES
+        )
+        if not path:
+            return
+        try:
+            save_plan(path, self.sheets)
+        except Exception as e:
+            messagebox.showerror("Грешка", f"Планът не можа да бъде запазен: {e}", parent=self.vis_window)
+
+    def export_to_google_sheets(self) -> bool:
+        if self.streaming or not self.sheets:
+            messagebox.showwarning("Предупреждение", "Изчакайте планът да бъде изчислен преди експортиране.",
+                                   parent=self.vis_window)
+            return False
+        # The queue spools the plan to disk and exports it in the background
+        try:
+            self.export_queue.submit(list(self.sheets))
+        except Exception as e:
+            messagebox.showerror("Грешка при експортиране", str(e), parent=self.vis_window)
+            return False
+        return True
+
+    def export_file(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.vis_window,
+            defaultextension=".dxf",
+            filetypes=EXPORT_FILE_TYPES
+        )
+        if not path:
+            return
+        from export.file_exporters import export_file
+        sheets = list(self.sheets)
+
+        def run():
+            try:
+                count = export_file(sheets, path)
+            except Exception as e:
+                self.vis_window.after(0, lambda: messagebox.showerror(
+                    "Грешка", f"Файлът не можа да бъде записан: {e}", parent=self.vis_window))
+                return
+            self.vis_window.after(0, lambda: messagebox.showinfo(
+                "Успех", f"{count} листа записани в {path}", parent=self.vis_window))
+
+        threading.Thread(target=run, daemon=True).start()
 
     def generate_sheet_vector(self, canvas, sheet, zoom_level=1.0):
         canvas.delete("all")
         sheet_w, sheet_h = sheet.size
-        placements = sheet.placements
+        batch = sheet.batch
         base_scale = 0.25 * zoom_level
         canvas_scale = base_scale
         canvas.config(scrollregion=(0, 0, sheet_w * canvas_scale, sheet_h * canvas_scale))
@@ -129,17 +393,16 @@ class CuttingPlanVisualizer:
             fill=eff_color
         )
         self.draw_waste_areas(canvas, sheet, canvas_scale)
-        for placement in placements:
-            x = placement.x * canvas_scale
-            y = placement.y * canvas_scale
-            w = placement.width * canvas_scale
-            h = placement.height * canvas_scale
-            sp = placement.spacing
-            sp_x = sp.get('x', placement.x - 5) * canvas_scale
-            sp_y = sp.get('y', placement.y - 5) * canvas_scale
-            sp_w = sp.get('width', placement.width + 10) * canvas_scale
-            sp_h = sp.get('height', placement.height + 10) * canvas_scale
-            color = '#3498db' if not placement.rotated else '#e74c3c'
+        for i in range(len(batch)):
+            x = batch.xs[i] * canvas_scale
+            y = batch.ys[i] * canvas_scale
+            w = batch.widths[i] * canvas_scale
+            h = batch.heights[i] * canvas_scale
+            sp_x = batch.spacing_xs[i] * canvas_scale
+            sp_y = batch.spacing_ys[i] * canvas_scale
+            sp_w = batch.spacing_widths[i] * canvas_scale
+            sp_h = batch.spacing_heights[i] * canvas_scale
+            color = '#3498db' if not batch.rotated[i] else '#e74c3c'
             canvas.create_rectangle(
                 sp_x, sp_y, sp_x + sp_w, sp_y + sp_h,
                 outline='#888', dash=(4, 2), width=1
@@ -151,7 +414,7 @@ class CuttingPlanVisualizer:
             )
             canvas.create_text(
                 x + w/2, y + h/2,
-                text=placement.ref, fill="black", 
+                text=batch.refs[i], fill="black", 
                 font=("Arial", 8)
             )
         legend_text = "Синьо: Нормално | Червено: Завъртяно | Пунктирана линия: 5мм разстояние"
@@ -167,17 +430,13 @@ class CuttingPlanVisualizer:
 
     def draw_waste_areas(self, canvas, sheet, canvas_scale):
         sheet_w, sheet_h = sheet.size
-        placements = sheet.placements
+        batch = sheet.batch
         grid_size = 50
         grid = []
         for x in range(0, sheet_w, grid_size):
             for y in range(0, sheet_h, grid_size):
                 grid.append({'x': x, 'y': y, 'covered': False})
-        for placement in placements:
-            px = placement.x
-            py = placement.y
-            pw = placement.width
-            ph = placement.height
+        for px, py, pw, ph in zip(batch.xs, batch.ys, batch.widths, batch.heights):
             for cell in grid:
                 cx, cy = cell['x'], cell['y']
                 if px <= cx < px + pw and py <= cy < py + ph:
@@ -198,13 +457,14 @@ class CuttingPlanVisualizer:
         x, y = canvas.canvasx(event.x), canvas.canvasy(event.y)
         scale = getattr(canvas, "zoom_level", 1.0) * 0.25
         found_part = None
-        for placement in tab.sheet.placements:
-            px = placement.x * scale
-            py = placement.y * scale
-            pw = placement.width * scale
-            ph = placement.height * scale
+        batch = tab.sheet.batch
+        for i in range(len(batch)):
+            px = batch.xs[i] * scale
+            py = batch.ys[i] * scale
+            pw = batch.widths[i] * scale
+            ph = batch.heights[i] * scale
             if px <= x <= px + pw and py <= y <= py + ph:
-                found_part = placement
+                found_part = batch[i]
                 break
         if found_part:
             self.current_hover_part = found_part
@@ -226,6 +486,8 @@ class CuttingPlanVisualizer:
             f"Ориентация: {'Завъртяна' if part.rotated else 'Нормална'}\n"
             f"Позиция: ({part.x:.1f}, {part.y:.1f}) мм\n"
             f"Площ: {part.width * part.height / 10000:.2f} cm²\n")
+        if part.order_id:
+            self.part_info_text.insert(tk.END, f"Поръчка: {part.order_id}\n")
         self.part_info_text.config(state=tk.DISABLED)
         self.update_sheet_info(tab)
 
@@ -241,9 +503,19 @@ class CuttingPlanVisualizer:
             f"Използвана площ: {eff['used_area'] / 10000:.2f} cm²\n"
             f"Отпадък: {eff['waste_area'] / 10000:.2f} cm²\n"
             f"Ефективност: {eff['efficiency']:.1f}%\n"
-            f"Брой части: {len(sheet.placements)}\n"
+            f"Брой части: {len(sheet.batch)}\n"
+            f"Брой листове по тази схема: {sheet.repeat}\n"
             f"Алгоритъм: {sheet.algorithm}\n"
             f"Метод на сортиране: {sheet.sort_method}")
+        if eff.get('optimality_gap') is not None:
+            self.sheet_info_text.insert(tk.END,
+                f"\nДолна граница: {eff['lower_bound']} листа за групата\n"
+                f"Отклонение от оптимума: до {eff['optimality_gap'] * 100:.1f}%")
+        if 'machine_time' in eff:
+            self.sheet_info_text.insert(tk.END,
+                f"\nРезове: {eff['cut_count']} ({eff['cut_length'] / 1000:.1f} м)\n"
+                f"Празен ход: {eff['travel_length'] / 1000:.1f} м, завъртания: {eff['rotations']}\n"
+                f"Машинно време: {eff['machine_time'] / 60:.1f} мин")
         self.sheet_info_text.config(state=tk.DISABLED)
 
     def zoom(self, tab, factor):
@@ -276,19 +548,16 @@ class CuttingPlanVisualizer:
         self.panning = False
 
     def validate_placements(self, placements):
+        batch = PlacementBatch.from_placements(placements)
         rectangles = []
-        for placement in placements:
-            sp = placement.spacing
-            x = sp.get('x', placement.x - 5)
-            y = sp.get('y', placement.y - 5)
-            w = sp.get('width', placement.width + 10)
-            h = sp.get('height', placement.height + 10)
+        for x, y, w, h, ref in zip(batch.spacing_xs, batch.spacing_ys, batch.spacing_widths,
+                                   batch.spacing_heights, batch.refs):
             rectangles.append({
                 'x1': x,
                 'y1': y,
                 'x2': x + w,
                 'y2': y + h,
-                'ref': placement.ref
+                'ref': ref
             })
         overlaps = []
         for i in range(len(rectangles)):
@@ -308,3 +577,72 @@ class CuttingPlanVisualizer:
                    r1['x1'] > r2['x2'] or 
                    r1['y2'] < r2['y1'] or 
                    r1['y1'] > r2['y2'])
+
+class PlanCandidatesWindow:
+    """
+    The plans of the multi-objective mode side by side (see packing.pareto).
+
+    Each column shows the first sheets of a plan and its sheet count,
+    waste, cut length, machine time and planning time; the best value of
+    each is marked. Choosing a plan opens it in the visualizer.
+    """
+    PREVIEW_SHEETS = 3
+
+    def __init__(self, root, plans, on_pick: Optional[Callable] = None, show_plan: Optional[Callable] = None):
+        self.root = root
+        self.plans = plans
+        self.on_pick = on_pick
+        self.show_plan = show_plan or (lambda sheets: CuttingPlanVisualizer(root, sheets))
+        self.images = []
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Варианти на плана ({len(plans)})")
+        self.window.geometry(f"{min(1300, 60 + len(plans) * (THUMBNAIL['WIDTH'] + 40))}x620")
+        hscroll = Scrollbar(self.window, orient=tk.HORIZONTAL)
+        canvas = Canvas(self.window, xscrollcommand=hscroll.set, highlightthickness=0)
+        hscroll.config(command=canvas.xview)
+        hscroll.pack(side=tk.BOTTOM, fill=tk.X)
+        canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        columns = ttk.Frame(canvas)
+        canvas.create_window(0, 0, window=columns, anchor="nw")
+        columns.bind("<Configure>", lambda event: canvas.config(scrollregion=canvas.bbox("all")))
+        best = {
+            'sheet_count': min(plan.sheet_count for plan in plans),
+            'waste': min(plan.waste for plan in plans),
+            'cut_length': min(plan.cut_length for plan in plans),
+            'machine_time': min(plan.machine_time for plan in plans),
+            'seconds': min(plan.seconds for plan in plans)
+        }
+        for index, plan in enumerate(plans):
+            self.add_column(columns, index, plan, best)
+
+    def add_column(self, parent, index, plan, best):
+        title = f"Вариант {index + 1}" + (" (стандартен)" if plan.default else "")
+        frame = ttk.LabelFrame(parent, text=title)
+        frame.grid(row=0, column=index, sticky="n", padx=5, pady=5)
+        for sheet in plan.sheets[:self.PREVIEW_SHEETS]:
+            width, height, data = render_thumbnail(sheet)
+            image = tk.PhotoImage(master=self.window, width=width, height=height)
+            image.put(data, to=(0, 0))
+            self.images.append(image)
+            ttk.Label(frame, image=image).pack(padx=5, pady=2)
+        if len(plan.sheets) > self.PREVIEW_SHEETS:
+            ttk.Label(frame, text=f"... още {len(plan.sheets) - self.PREVIEW_SHEETS} листа").pack()
+        rows = [
+            ("Листове", f"{plan.sheet_count:.0f}", plan.sheet_count <= best['sheet_count']),
+            ("Отпадък", f"{plan.waste / 1e6:.2f} m²", plan.waste <= best['waste']),
+            ("Дължина на рязане", f"{plan.cut_length / 1000:.1f} m", plan.cut_length <= best['cut_length']),
+            ("Машинно време", f"{plan.machine_time / 60:.1f} мин", plan.machine_time <= best['machine_time']),
+            ("Време за изчисление", f"{plan.seconds:.2f} с", plan.seconds <= best['seconds'])
+        ]
+        table = ttk.Frame(frame)
+        table.pack(fill=tk.X, padx=5, pady=5)
+        for row, (label, value, is_best) in enumerate(rows):
+            ttk.Label(table, text=label + ":").grid(row=row, column=0, sticky="w")
+            ttk.Label(table, text=value + (" ★" if is_best else "")).grid(row=row, column=1, sticky="e", padx=(10, 0))
+        ttk.Button(frame, text="Избери", command=lambda: self.pick(plan)).pack(fill=tk.X, padx=5, pady=5)
+
+    def pick(self, plan):
+        self.window.destroy()
+        self.show_plan(list(plan.sheets))
+        if self.on_pick is not None:
+            self.on_pick(plan)
@@ -0,0 +1,148 @@
+"""
+Stock-size what-if analysis for the sheet cutting app.
+
+Runs a set of jobs against several candidate combinations of sheet sizes
+and compares sheets used, utilization and cost per scenario. The jobs are
+read and grouped once; every (scenario, job, material group) pair is then
+packed in its own worker process.
+
+Usage:
+    python -m packing.what_if jobs/*.csv --scenario 2000x1000,2500x1250 --scenario 2000x1000,2800x2070
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Optional, Any
+from models.part import Part
+from config import DEFAULT_SHEET_SIZES, WHAT_IF
+import argparse
+import os
+
+# Jobs as seen by the worker processes, set once per process by _init_worker
+_jobs: List[Dict[Tuple[str, float], List[Part]]] = []
+
+class Scenario:
+    def __init__(self, name: str, sheet_sizes: List[Tuple[int, int]], prices: Optional[Dict[Tuple[int, int], float]] = None):
+        self.name = name
+        self.sheet_sizes = sheet_sizes
+        self.prices = prices or {}
+
+    def sheet_cost(self, size: Tuple[int, int]) -> float:
+        price = self.prices.get(tuple(size))
+        if price is None:
+            price = size[0] * size[1] / 1000000 * WHAT_IF['PRICE_PER_M2']
+        return price
+
+def group_job(parts: List[Part]) -> Dict[Tuple[str, float], List[Part]]:
+    groups = {}
+    for part in parts:
+        groups.setdefault((part.material, part.thickness), []).append(part)
+    for group_parts in groups.values():
+        group_parts.sort(key=lambda p: p.width * p.height, reverse=True)
+    return groups
+
+def _init_worker(jobs: List[Dict[Tuple[str, float], List[Part]]]):
+    global _jobs
+    _jobs = jobs
+
+def _pack(task: Tuple[int, List[Tuple[int, int]], int, Tuple[str, float]]) -> Dict[str, Any]:
+    scenario_index, sheet_sizes, job_index, group_key = task
+    from packing.engine import PackingEngine
+    parts = _jobs[job_index][group_key]
+    sheets = PackingEngine(sheet_sizes).calculate_plan(parts, lambda message: None)
+    if sheets is None:
+        return {'scenario': scenario_index, 'job': job_index, 'group': group_key, 'failed': True, 'sheets': {}}
+    counts = {}
+    for sheet in sheets:
+        counts[tuple(sheet.size)] = counts.get(tuple(sheet.size), 0) + sheet.repeat
+    return {'scenario': scenario_index, 'job': job_index, 'group': group_key, 'failed': False, 'sheets': counts}
+
+def run_what_if(jobs: List[List[Part]], scenarios: List[Scenario], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Pack every job under every scenario and return one summary row per scenario.
+    """
+    grouped = [group_job(parts) for parts in jobs]
+    part_area = sum(part.width * part.height * part.qty for parts in jobs for part in parts)
+    tasks = [
+        (scenario_index, scenario.sheet_sizes, job_index, group_key)
+        for scenario_index, scenario in enumerate(scenarios)
+        for job_index, groups in enumerate(grouped)
+        for group_key in groups
+    ]
+    # Biggest groups first, so the slowest packs do not end up last
+    tasks.sort(key=lambda task: sum(p.qty for p in grouped[task[2]][task[3]]), reverse=True)
+    results = [{'sheets': {}, 'failed': 0} for _ in scenarios]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(grouped,)) as pool:
+        for result in pool.map(_pack, tasks):
+            summary = results[result['scenario']]
+            if result['failed']:
+                summary['failed'] += 1
+            for size, count in result['sheets'].items():
+                summary['sheets'][size] = summary['sheets'].get(size, 0) + count
+    rows = []
+    for scenario, summary in zip(scenarios, results):
+        sheet_area = sum(size[0] * size[1] * count for size, count in summary['sheets'].items())
+        rows.append({
+            'scenario': scenario.name,
+            'sheet_sizes': scenario.sheet_sizes,
+            'sheets': sum(summary['sheets'].values()),
+            'sheets_by_size': summary['sheets'],
+            'sheet_area': sheet_area,
+            'utilization': part_area / sheet_area if sheet_area else 0.0,
+            'cost': sum(scenario.sheet_cost(size) * count for size, count in summary['sheets'].items()),
+            'failed_groups': summary['failed']
+        })
+    return rows
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    header = ["Сценарий", "Листове", "Площ (m²)", "Използване", "Цена", "По размери"]
+    lines = [header]
+    for row in rows:
+        by_size = ", ".join(f"{w}x{h}: {count}" for (w, h), count in sorted(row['sheets_by_size'].items()))
+        lines.append([
+            row['scenario'] + (f" ({row['failed_groups']} неуспешни групи)" if row['failed_groups'] else ""),
+            str(row['sheets']),
+            f"{row['sheet_area'] / 1000000:.2f}",
+            f"{row['utilization'] * 100:.1f}%",
+            f"{row['cost']:.2f}",
+            by_size
+        ])
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in lines)
+
+def parse_sizes(text: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for item in text.split(","):
+        width, height = item.lower().strip().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+def load_job(path: str) -> List[Part]:
+    from models.part_import import iter_file_rows, iter_parts
+    parts = []
+    for row_number, part, error in iter_parts(iter_file_rows(path)):
+        if part is not None:
+            parts.append(part)
+        else:
+            print(f"{path}, ред {row_number}: {error}")
+    return parts
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение на комбинации от размери на листове")
+    parser.add_argument("jobs", nargs="+", help="Файлове с части (CSV или XLSX), по един за поръчка")
+    parser.add_argument("--scenario", action="append", default=[],
+                        help="Размери на листове, напр. 2000x1000,2800x2070 (може да се повтаря)")
+    parser.add_argument("--price", action="append", default=[],
+                        help="Цена на лист, напр. 2800x2070=95.5 (може да се повтаря)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    prices = {}
+    for item in args.price:
+        size, value = item.split("=")
+        prices[parse_sizes(size)[0]] = float(value)
+    scenarios = [Scenario("Текущи размери", list(DEFAULT_SHEET_SIZES), prices)]
+    scenarios += [Scenario(text, parse_sizes(text), prices) for text in args.scenario]
+    jobs = [load_job(path) for path in args.jobs]
+    print(format_table(run_what_if(jobs, scenarios, args.workers)))
+
+if __name__ == "__main__":
+    main()